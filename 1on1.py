@@ -1,18 +1,23 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 from datetime import datetime
-import json
-import os
 import google.generativeai as genai
 from docx import Document
 from docx.shared import Pt
 from docx.oxml.ns import qn
 from io import BytesIO
 import re
-import random
 import time
+import sheet_index
+import sheet_sources
+import sheets_batch
+import sheets_cache
+import sheets_client
+import sheets_fanout
+import sheets_throttle
+import write_queue
+from sheets_client import get_google_sheets_client
+from sheets_retry import call as _sheets_call_with_retry, is_retryable_error as _is_retryable_error
 
 # 메인 컨텐츠 최대 너비 제한 (우측 영역)
 st.markdown(
@@ -105,12 +110,6 @@ setInterval(applyExpanderColors, 500);
 </script>
 """, unsafe_allow_html=True)
 
-# Google Sheets 연동을 위한 설정
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive"
-]
-
 # Gemini API 키 설정 (Streamlit secrets 사용)
 GEMINI_API_KEY = None
 try:
@@ -126,179 +125,37 @@ if GEMINI_API_KEY:
     except Exception:
         pass
 
-# Google Sheets 호출 재시도 유틸리티 (429 Quota 초과 완화)
-def _is_retryable_error(error_msg: str) -> bool:
-    """재시도 가능한 오류인지 확인합니다."""
-    msg_lower = error_msg.lower()
-    return ('429' in msg_lower) or ('quota' in msg_lower) or ('rate' in msg_lower and 'limit' in msg_lower)
-
-def _sheets_call_with_retry(callable_fn, *args, **kwargs):
-    """Google Sheets API 호출을 지수 백오프로 재시도합니다."""
-    # 즉시 1회 + 1s, 2s, 4s, 8s, 16s 지연 재시도 (총 6회) + 지터
-    delays = [0, 1, 2, 4, 8, 16]
-    last_error = None
-    for delay in delays:
-        if delay > 0:
-            time.sleep(delay + random.uniform(0, 0.5))
-        try:
-            return callable_fn(*args, **kwargs)
-        except Exception as e:
-            last_error = e
-            error_msg = str(e)
-            # 429 또는 쿼터/레이트리밋 문구가 있으면 재시도, 그 외 즉시 중단
-            if _is_retryable_error(error_msg):
-                continue
-            # 기타 오류는 즉시 전파
-            raise
-    # 재시도 모두 실패 시 마지막 오류 전파
-    if last_error:
-        raise last_error
-    raise RuntimeError("Google Sheets API 호출이 실패했습니다.")
-
-# 세션 단위 Google Sheets Read 레이트 리미터
-def _sheets_read_rate_limit_allow(max_reads_per_minute=8):
-    """세션 단위로 분당 읽기 호출 횟수를 제한합니다. 허용되면 0, 대기 필요 초를 반환."""
-    now = time.time()
-    key = '_sheets_read_timestamps'
-    ts_list = st.session_state.get(key) or []
-    # 60초 윈도우만 유지
-    ts_list = [t for t in ts_list if now - t < 60]
-    st.session_state[key] = ts_list
-    if len(ts_list) < max_reads_per_minute:
-        ts_list.append(now)
-        st.session_state[key] = ts_list
-        return 0.0
-    # 남은 대기 시간 계산
-    earliest = min(ts_list) if ts_list else now
-    wait = max(0.0, 60 - (now - earliest))
-    return wait
-
-# 앱 레벨 캐시: 시트 전체 레코드 조회 결과 캐싱 (다중 세션 완화)
-@st.cache_data(ttl=300, show_spinner=False)
+# 앱 레벨 캐시: 시트 전체 레코드 조회 결과를 시트 리비전이 바뀔 때까지 공유 (다중 세션 완화)
 def _cached_sheet_records(spreadsheet_id: str, worksheet_name: str):
     client = get_google_sheets_client()
     if not client:
         return []
-    spreadsheet = _sheets_call_with_retry(client.open_by_key, spreadsheet_id)
-    worksheet = _sheets_call_with_retry(spreadsheet.worksheet, worksheet_name)
-    records = _sheets_call_with_retry(worksheet.get_all_records)
-    return records or []
+    
+    def _fetch_records():
+        worksheet = _sheets_call_with_retry(sheets_client.get_worksheet, spreadsheet_id, worksheet_name, client=client)
+        return sheets_batch.drop_internal_columns(_sheets_call_with_retry(worksheet.get_all_records) or [])
+    
+    return sheets_cache.get((spreadsheet_id, worksheet_name), spreadsheet_id, _fetch_records, client=client)
 
 # 1on1 코칭 스프레드시트 ID는 함수에서 동적으로 가져옵니다 (안전성을 위해)
 def get_oneon1_spreadsheet_id():
-    """1on1 코칭 스프레드시트 ID를 안전하게 가져옵니다."""
-    try:
-        if hasattr(st, "secrets"):
-            secrets_obj = getattr(st, "secrets", None)
-            if secrets_obj and hasattr(secrets_obj, "get"):
-                try:
-                    google_sec = secrets_obj.get("google", {})
-                    if google_sec and isinstance(google_sec, dict):
-                        spreadsheet_id = google_sec.get("oneon1_spreadsheet_id")
-                        if spreadsheet_id:
-                            return str(spreadsheet_id)
-                except (AttributeError, TypeError):
-                    pass
-    except Exception:
-        pass
-    
-    # Streamlit secrets에서 가져오기 (추가 시크릿 위치 확인)
-    try:
-        if hasattr(st, "secrets"):
-            # 추가 secrets 위치 확인
-            direct_id = st.secrets.get("oneon1_spreadsheet_id") or st.secrets.get("ONEOONE_SPREADSHEET_ID")
-            if direct_id:
-                return str(direct_id)
-    except Exception:
-        pass
-    
-    return ""
+    """1on1 코칭 스프레드시트 ID를 안전하게 가져옵니다. (설정이 없으면 빈 문자열)"""
+    return sheet_sources.spreadsheet_id("oneon1")
 
 # 모듈 로드 시점에는 None으로 초기화, 실제 사용 시점에 함수 호출
 ONEOONE_SPREADSHEET_ID = None
 
-def get_google_sheets_client():
-    """Google Sheets 클라이언트를 반환합니다."""
-    try:
-        # 방법 0: Streamlit secrets에서 서비스 계정 정보 읽기 (최우선)
-        try:
-            google_sec = st.secrets.get("google") if hasattr(st, "secrets") else None
-        except Exception:
-            google_sec = None
-
-        if google_sec:
-            # 0-a) 전체 JSON 문자열 저장한 경우: google.credentials_json
-            if "credentials_json" in google_sec and google_sec["credentials_json"]:
-                raw = google_sec["credentials_json"]
-                creds_info = json.loads(raw) if isinstance(raw, str) else dict(raw)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-
-            # 0-b) TOML로 키를 중첩(dict) 저장한 경우: google.service_account = { ... }
-            if "service_account" in google_sec and google_sec["service_account"]:
-                creds_info = dict(google_sec["service_account"])  # MappingProxyType 대응
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-
-        # 방법 1: Streamlit secrets에서 직접 읽기 (추가 위치 확인)
-        try:
-            if hasattr(st, "secrets"):
-                direct_creds = st.secrets.get("GOOGLE_CREDENTIALS_JSON") or st.secrets.get("google_credentials_json")
-                if direct_creds:
-                    try:
-                        creds_info = json.loads(direct_creds) if isinstance(direct_creds, str) else dict(direct_creds)
-                        creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                        return gspread.authorize(creds)
-                    except json.JSONDecodeError:
-                        st.error("Streamlit secrets의 GOOGLE_CREDENTIALS_JSON이 올바른 JSON 형식이 아닙니다.")
-                        return None
-        except Exception:
-            pass
-        
-        # 방법 2: 서비스 계정 JSON 파일 읽기
-        service_account_file = "service_account.json"
-        if os.path.exists(service_account_file):
-            creds = Credentials.from_service_account_file(service_account_file, scopes=SCOPE)
-            return gspread.authorize(creds)
-        
-        # 방법 3: 세션 상태에서 서비스 계정 정보 읽기
-        if 'google_credentials' in st.session_state and st.session_state.google_credentials:
-            try:
-                creds_info = json.loads(st.session_state.google_credentials)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-            except json.JSONDecodeError:
-                st.error("저장된 서비스 계정 정보가 올바른 JSON 형식이 아닙니다.")
-                return None
-        
-        # 인증 정보가 없는 경우
-        st.warning("Google Sheets 연동을 위해 서비스 계정 인증 정보가 필요합니다.")
-        return None
-        
-    except Exception as e:
-        st.error(f"Google Sheets 연동 오류: {e}")
-        return None
-
 def get_oneon1_dataframe():
     """1on1 코칭 데이터를 Google Sheets에서 가져옵니다."""
     try:
-        # 세션 캐시 활용(동일 사용자 반복 조회 시 과도한 호출 방지)
+        # 세션 캐시는 호출 제한/오류 시 대체용으로만 사용 (최신 여부는 시트 리비전으로 판단)
         cache = st.session_state.get('_oneon1_cache') or {}
-        cache_ttl_seconds = 300  # 5분 TTL
-        if cache and isinstance(cache, dict):
-            cached_ts = cache.get('ts')
-            cached_df = cache.get('df')
-            if cached_ts and (time.time() - float(cached_ts) < cache_ttl_seconds) and cached_df is not None:
-                return cached_df
-
-        # 세션 레이트 리미터: 분당 읽기 횟수 제한
-        wait_secs = _sheets_read_rate_limit_allow(max_reads_per_minute=6)
-        if wait_secs > 0:
-            # 캐시가 있으면 즉시 캐시 반환
+
+        # 프로세스 전역 읽기 버킷이 비어 있으면 만료된 캐시라도 즉시 반환
+        # (캐시가 없으면 버킷이 토큰을 줄 때까지 대기 후 진행)
+        if sheets_throttle.wait_seconds("read") > 0:
             if cache and cache.get('df') is not None:
                 return cache.get('df')
-            # 캐시가 없으면 최소 대기 후 진행
-            time.sleep(min(wait_secs, 2.0))
 
         spreadsheet_id = get_oneon1_spreadsheet_id()
         if not spreadsheet_id:
@@ -308,11 +165,12 @@ def get_oneon1_dataframe():
         if not client:
             return None
         
-        # 앱 레벨 캐시를 우선 사용해 호출 횟수 최소화
+        # 앱 레벨 캐시를 우선 사용해 호출 횟수 최소화 (시트가 바뀌지 않았으면 재사용)
         records = _cached_sheet_records(spreadsheet_id, "Sheet1")
         if not records:
             return pd.DataFrame()
-        df = pd.DataFrame(records)
+        # 아직 시트에 반영되지 않은 기록을 뒤에 붙임
+        df = write_queue.overlay(pd.DataFrame(records), "oneon1")
         # 캐시에 저장
         st.session_state['_oneon1_cache'] = {'ts': time.time(), 'df': df}
         return df
@@ -335,14 +193,8 @@ def save_oneon1_record(data):
             st.error("1on1 스프레드시트 ID가 설정되지 않았습니다.")
             return False
         
-        client = get_google_sheets_client()
-        if not client:
-            return False
-        
-        # 쓰기 전용은 캐시 우회하되 재시도 유지
-        spreadsheet = _sheets_call_with_retry(client.open_by_key, spreadsheet_id)
-        worksheet = _sheets_call_with_retry(spreadsheet.worksheet, "Sheet1")
-        _sheets_call_with_retry(worksheet.append_row, data)
+        # 로컬 선기록 로그에 남기고 바로 반환 (시트 반영은 백그라운드에서 일괄 처리)
+        write_queue.enqueue("oneon1", data)
         
         # 쓰기 성공 시 읽기 캐시 무효화
         if '_oneon1_cache' in st.session_state:
@@ -485,6 +337,21 @@ def get_current_viewing_user():
         return st.session_state.viewing_user_info
     return st.session_state.user_info
 
+def _partition_records(df, name_col):
+    """DataFrame을 이름 열 기준 group-by 한 번으로 나눕니다.
+
+    ({이름: 레코드 목록}, 목록에 없는 사용자의 기본값)을 반환합니다.
+    이름 열이 없으면 기존처럼 모든 사용자가 전체 레코드를 (하나의 목록으로) 공유합니다.
+    """
+    if df is None or df.empty:
+        return {}, []
+    if not name_col or name_col not in df.columns:
+        return {}, sheets_batch.to_records(df)
+    return {
+        name: sheets_batch.to_records(group)
+        for name, group in df.groupby(name_col, sort=False)
+    }, []
+
 def prefetch_all_users_cache():
     """관리자 로그인 시 모든 사용자의 캐시를 백그라운드에서 생성합니다."""
     try:
@@ -511,6 +378,52 @@ def prefetch_all_users_cache():
         
         prefetch_cache_by_user = st.session_state.prefetch_cache_by_user
         
+        # 공통 소스는 사용자 수와 관계없이 한 번씩만, 동시에 로드
+        import Archive
+        import cdp
+        import idp_usage
+        import organization
+        
+        def _load_archive_df():
+            archive_df = None
+            # Google Sheets에서 로드 시도
+            try:
+                from main import get_google_sheets_client, SPREADSHEET_ID
+                if st.session_state.get('google_sheets_connected', False):
+                    archive_df = Archive.get_recent_snippets(get_google_sheets_client, SPREADSHEET_ID)
+            except:
+                pass
+            # 실패 시 로컬 CSV에서 로드
+            if archive_df is None or (hasattr(archive_df, 'empty') and archive_df.empty):
+                archive_df = Archive.get_snippets_from_local_csv()
+            return archive_df
+        
+        frames = sheets_fanout.run_all(
+            {
+                'archive': _load_archive_df,
+                'cdp': lambda: cdp._fetch_cdp_dataframe(columns=cdp.PLAN_COLUMNS),
+                'idp': idp_usage.fetch_idp_dataframe,
+                'mission_kpi': lambda: organization.get_sheet_data(organization.MISSION_KPI_SHEET_ID),
+                'ground_rule': lambda: organization.get_sheet_data(organization.GROUND_RULE_SHEET_ID),
+            },
+            timeouts={'archive': 30},
+        )
+        # 시트마다 이름 기준 group-by 한 번으로 모든 사용자 몫을 나눔
+        archive_by_user, archive_default = _partition_records(frames.get('archive'), '이름')
+        cdp_df = frames.get('cdp')
+        cdp_name_col = sheet_index.name_column(cdp_df) if cdp_df is not None and not cdp_df.empty else None
+        cdp_by_user, cdp_default = _partition_records(cdp_df, cdp_name_col)
+        idp_by_user, idp_default = _partition_records(frames.get('idp'), '이름')
+        
+        # Mission & KPI, Ground Rule은 모든 사용자 공통이므로 한 번만 만들어 같은 목록을 참조
+        shared = {}
+        for key in ('mission_kpi', 'ground_rule'):
+            df = frames.get(key)
+            try:
+                shared[key] = sheets_batch.to_records(df)
+            except Exception:
+                shared[key] = []
+        
         # 각 사용자별로 캐시 생성
         for user_row in target_users:
             user_name = str(user_row.get('이름(본명)', '')).strip()
@@ -521,89 +434,13 @@ def prefetch_all_users_cache():
             if user_name in prefetch_cache_by_user:
                 continue
             
-            user_cache = {}
-            
-            # 1. Snippet 아카이브
-            try:
-                import Archive
-                archive_df = None
-                
-                # Google Sheets에서 로드 시도
-                try:
-                    from main import get_google_sheets_client, SPREADSHEET_ID
-                    if st.session_state.get('google_sheets_connected', False):
-                        archive_df = Archive.get_snippets_from_google_sheets(get_google_sheets_client, SPREADSHEET_ID)
-                except:
-                    pass
-                
-                # 실패 시 로컬 CSV에서 로드
-                if archive_df is None or (hasattr(archive_df, 'empty') and archive_df.empty):
-                    archive_df = Archive.get_snippets_from_local_csv()
-                
-                if archive_df is not None and not archive_df.empty:
-                    if '이름' in archive_df.columns:
-                        user_archive = archive_df[archive_df['이름'] == user_name]
-                        user_cache['archive'] = user_archive.to_dict('records') if not user_archive.empty else []
-                    else:
-                        user_cache['archive'] = archive_df.to_dict('records')
-                else:
-                    user_cache['archive'] = []
-            except:
-                user_cache['archive'] = []
-            
-            # 2. CDP
-            try:
-                import cdp
-                cdp_df = cdp._fetch_cdp_dataframe()
-                if cdp_df is not None and not cdp_df.empty:
-                    normalized = {c.strip(): c for c in cdp_df.columns}
-                    name_col = normalized.get("이름") or normalized.get("name") or list(cdp_df.columns)[0]
-                    user_cdp = cdp_df[cdp_df[name_col] == user_name]
-                    user_cache['cdp'] = user_cdp.to_dict('records') if not user_cdp.empty else []
-                else:
-                    user_cache['cdp'] = []
-            except:
-                user_cache['cdp'] = []
-            
-            # 3. IDP
-            try:
-                import idp_usage
-                idp_df = idp_usage.fetch_idp_dataframe()
-                if idp_df is not None and not idp_df.empty:
-                    if '이름' in idp_df.columns:
-                        user_idp = idp_df[idp_df['이름'] == user_name]
-                        user_cache['idp'] = user_idp.to_dict('records') if not user_idp.empty else []
-                    else:
-                        user_cache['idp'] = idp_df.to_dict('records')
-                else:
-                    user_cache['idp'] = []
-            except:
-                user_cache['idp'] = []
-            
-            # 4. Mission & KPI (모든 사용자 공통)
-            try:
-                import organization
-                mission_kpi_df = organization.get_sheet_data(organization.MISSION_KPI_SHEET_ID)
-                if mission_kpi_df is not None and not mission_kpi_df.empty:
-                    user_cache['mission_kpi'] = mission_kpi_df.to_dict('records')
-                else:
-                    user_cache['mission_kpi'] = []
-            except:
-                user_cache['mission_kpi'] = []
-            
-            # 5. Team Ground Rule (모든 사용자 공통)
-            try:
-                import organization
-                ground_rule_df = organization.get_sheet_data(organization.GROUND_RULE_SHEET_ID)
-                if ground_rule_df is not None and not ground_rule_df.empty:
-                    user_cache['ground_rule'] = ground_rule_df.to_dict('records')
-                else:
-                    user_cache['ground_rule'] = []
-            except:
-                user_cache['ground_rule'] = []
-            
-            # 사용자별 캐시 저장
-            prefetch_cache_by_user[user_name] = user_cache
+            prefetch_cache_by_user[user_name] = {
+                'archive': archive_by_user.get(user_name, archive_default),
+                'cdp': cdp_by_user.get(user_name, cdp_default),
+                'idp': idp_by_user.get(user_name, idp_default),
+                'mission_kpi': shared['mission_kpi'],
+                'ground_rule': shared['ground_rule'],
+            }
         
         # 세션에 저장
         st.session_state.prefetch_cache_by_user = prefetch_cache_by_user
@@ -1708,7 +1545,7 @@ def _get_spreadsheet_id():
     """스프레드시트 ID를 가져옵니다."""
     main_module = _get_main_module()
     spreadsheet_id = getattr(main_module, 'SPREADSHEET_ID', None) if main_module else None
-    return spreadsheet_id or "1THmwStR6p0_SUyLEV6-edT0kigANvTCPOkAzN7NaEQE"
+    return spreadsheet_id or sheet_sources.spreadsheet_id("snippets")
 
 def _load_archive_data(user_name: str, prefetch_cache: dict):
     """Snippet 아카이브 데이터를 로드합니다."""
@@ -1722,26 +1559,16 @@ def _load_archive_data(user_name: str, prefetch_cache: dict):
         
         archive_df = None
         
-        # 세션 캐시 확인 (5분 TTL)
-        arch_cache = st.session_state.get('_archive_all_cache') or {}
-        arch_ttl = 300
-        if arch_cache and isinstance(arch_cache, dict):
-            ats = arch_cache.get('ts')
-            adf = arch_cache.get('df')
-            if ats and (time.time() - float(ats) < arch_ttl) and adf is not None:
-                archive_df = pd.DataFrame(adf)
-        
-        # Google Sheets에서 로드
-        if get_client and spreadsheet_id and archive_df is None:
+        # Google Sheets에서 로드 (시트 리비전이 그대로면 앱 레벨 캐시 사용)
+        if get_client and spreadsheet_id:
             try:
                 if callable(get_client):
-                    archive_df = Archive.get_snippets_from_google_sheets(get_client, spreadsheet_id)
+                    archive_df = Archive.get_recent_snippets(get_client, spreadsheet_id)
                 else:
                     client = get_client() if callable(get_client) else get_client
                     if client:
-                        spreadsheet = client.open_by_key(spreadsheet_id)
-                        worksheet = spreadsheet.worksheet("Sheet1")
-                        records = worksheet.get_all_records()
+                        worksheet = sheets_client.get_worksheet(spreadsheet_id, "Sheet1", client=client)
+                        records = sheets_batch.drop_internal_columns(worksheet.get_all_records())
                         archive_df = pd.DataFrame(records)
             except Exception:
                 archive_df = None
@@ -1755,13 +1582,6 @@ def _load_archive_data(user_name: str, prefetch_cache: dict):
         
         # 사용자 데이터 필터링
         if archive_df is not None and not archive_df.empty:
-            # 전체 데이터 세션 캐시 저장 (메모리 효율을 위해 전체 저장은 선택적)
-            try:
-                st.session_state['_archive_all_cache'] = {'ts': time.time(), 'df': archive_df.to_dict('records')}
-            except Exception:
-                # 메모리 부족 시 캐시 저장 건너뛰기
-                pass
-            
             # 이름 컬럼 찾기
             name_column = None
             for col in archive_df.columns:
@@ -1771,7 +1591,7 @@ def _load_archive_data(user_name: str, prefetch_cache: dict):
                     break
             
             if name_column:
-                user_archive = archive_df[archive_df[name_column] == user_name]
+                user_archive = sheet_index.rows_for(archive_df, name_column, user_name)
                 if user_archive.empty:
                     # 부분 매칭 시도
                     user_name_clean = str(user_name).strip()
@@ -1780,89 +1600,94 @@ def _load_archive_data(user_name: str, prefetch_cache: dict):
                         if user_name_clean == row_name:
                             user_archive = archive_df[archive_df.index == idx]
                             break
-                prefetch_cache['archive'] = user_archive.to_dict('records') if not user_archive.empty else []
+                prefetch_cache['archive'] = sheets_batch.to_records(user_archive)
             else:
-                prefetch_cache['archive'] = archive_df.to_dict('records')
+                prefetch_cache['archive'] = sheets_batch.to_records(archive_df)
         else:
             prefetch_cache['archive'] = []
     except Exception:
         prefetch_cache['archive'] = []
 
-def _load_other_data(user_name: str, prefetch_cache: dict):
-    """CDP, IDP, Mission & KPI, Ground Rule 데이터를 로드합니다."""
-    # CDP 로딩
+def _load_cdp_data(user_name: str, prefetch_cache: dict):
+    """CDP 데이터를 로드합니다."""
     try:
         import cdp
-        cdp_df = cdp._fetch_cdp_dataframe()
+        cdp_df = cdp._fetch_cdp_dataframe(columns=cdp.PLAN_COLUMNS)
         if cdp_df is not None and not cdp_df.empty:
-            normalized = {c.strip(): c for c in cdp_df.columns}
-            name_col = normalized.get("이름") or normalized.get("name") or list(cdp_df.columns)[0]
-            user_cdp = cdp_df[cdp_df[name_col] == user_name]
-            prefetch_cache['cdp'] = user_cdp.to_dict('records') if not user_cdp.empty else []
+            name_col = sheet_index.name_column(cdp_df)
+            user_cdp = sheet_index.rows_for(cdp_df, name_col, user_name)
+            prefetch_cache['cdp'] = sheets_batch.to_records(user_cdp)
         else:
             prefetch_cache['cdp'] = []
     except Exception:
         prefetch_cache['cdp'] = []
-    
-    # IDP 로딩
+
+def _load_idp_data(user_name: str, prefetch_cache: dict):
+    """IDP 데이터를 로드합니다."""
     try:
         import idp_usage
         idp_df = idp_usage.fetch_idp_dataframe()
         if idp_df is not None and not idp_df.empty:
             if '이름' in idp_df.columns:
-                user_idp = idp_df[idp_df['이름'] == user_name]
-                prefetch_cache['idp'] = user_idp.to_dict('records') if not user_idp.empty else []
+                user_idp = sheet_index.rows_for(idp_df, '이름', user_name)
+                prefetch_cache['idp'] = sheets_batch.to_records(user_idp)
             else:
-                prefetch_cache['idp'] = idp_df.to_dict('records')
+                prefetch_cache['idp'] = sheets_batch.to_records(idp_df)
         else:
             prefetch_cache['idp'] = []
     except Exception:
         prefetch_cache['idp'] = []
-    
-    # Mission & KPI 로딩
+
+def _load_mission_kpi_data(user_name: str, prefetch_cache: dict):
+    """Mission & KPI 데이터를 로드합니다. (모든 사용자 공통)"""
     try:
         import organization
-        mk_cache = st.session_state.get('_mission_kpi_cache') or {}
-        mk_ttl = 300
-        mission_kpi_df = None
-        if mk_cache and isinstance(mk_cache, dict):
-            ts = mk_cache.get('ts')
-            df_cached = mk_cache.get('df')
-            if ts and (time.time() - float(ts) < mk_ttl) and df_cached is not None:
-                mission_kpi_df = pd.DataFrame(df_cached)
-        if mission_kpi_df is None:
-            mission_kpi_df = organization.get_sheet_data(organization.MISSION_KPI_SHEET_ID)
-            if mission_kpi_df is not None and not mission_kpi_df.empty:
-                st.session_state['_mission_kpi_cache'] = {'ts': time.time(), 'df': mission_kpi_df.to_dict('records')}
+        # 시트 리비전이 그대로면 앱 레벨 캐시 사용
+        mission_kpi_df = organization.get_sheet_data(organization.MISSION_KPI_SHEET_ID)
         if mission_kpi_df is not None and not mission_kpi_df.empty:
-            prefetch_cache['mission_kpi'] = mission_kpi_df.to_dict('records')
+            prefetch_cache['mission_kpi'] = sheets_batch.to_records(mission_kpi_df)
         else:
             prefetch_cache['mission_kpi'] = []
     except Exception:
         prefetch_cache['mission_kpi'] = []
-    
-    # Team Ground Rule 로딩
+
+def _load_ground_rule_data(user_name: str, prefetch_cache: dict):
+    """Team Ground Rule 데이터를 로드합니다. (모든 사용자 공통)"""
     try:
         import organization
-        gr_cache = st.session_state.get('_ground_rule_cache') or {}
-        gr_ttl = 300
-        ground_rule_df = None
-        if gr_cache and isinstance(gr_cache, dict):
-            ts = gr_cache.get('ts')
-            df_cached = gr_cache.get('df')
-            if ts and (time.time() - float(ts) < gr_ttl) and df_cached is not None:
-                ground_rule_df = pd.DataFrame(df_cached)
-        if ground_rule_df is None:
-            ground_rule_df = organization.get_sheet_data(organization.GROUND_RULE_SHEET_ID)
-            if ground_rule_df is not None and not ground_rule_df.empty:
-                st.session_state['_ground_rule_cache'] = {'ts': time.time(), 'df': ground_rule_df.to_dict('records')}
+        # 시트 리비전이 그대로면 앱 레벨 캐시 사용
+        ground_rule_df = organization.get_sheet_data(organization.GROUND_RULE_SHEET_ID)
         if ground_rule_df is not None and not ground_rule_df.empty:
-            prefetch_cache['ground_rule'] = ground_rule_df.to_dict('records')
+            prefetch_cache['ground_rule'] = sheets_batch.to_records(ground_rule_df)
         else:
             prefetch_cache['ground_rule'] = []
     except Exception:
         prefetch_cache['ground_rule'] = []
 
+# 1on1 캐시 로딩 소스: (키, 로더, 진행 상태 표시 문구, 제한 시간(초))
+_CACHE_SOURCES = [
+    ('archive', _load_archive_data, "📚 Snippet 아카이브", 30),
+    ('cdp', _load_cdp_data, "📊 CDP", 15),
+    ('idp', _load_idp_data, "📊 IDP", 15),
+    ('mission_kpi', _load_mission_kpi_data, "📊 Mission & KPI", 15),
+    ('ground_rule', _load_ground_rule_data, "📊 Ground Rule", 15),
+]
+
+# 1on1 캐시 키 -> sheet_sources 키 (리비전 확인용)
+_CACHE_SOURCE_SHEETS = {
+    'archive': 'snippets',
+    'cdp': 'cdp',
+    'idp': 'idp',
+    'mission_kpi': 'mission_kpi',
+    'ground_rule': 'ground_rule',
+}
+
+def _collect_source(loader, user_name: str) -> dict:
+    """작업자 스레드에서 로더를 실행하고 결과를 별도 딕셔너리로 반환합니다. (공유 캐시 동시 수정 방지)"""
+    result = {}
+    loader(user_name, result)
+    return result
+
 def ensure_cache_data():
     """필요한 캐시 데이터가 있는지 확인하고, 없으면 로드합니다."""
     # 빈번한 호출 가드: 최소 30초 간격
@@ -1885,8 +1710,7 @@ def ensure_cache_data():
     if not current_user_name:
         return False
     
-    # 관리자든 일반 사용자든 항상 새로 데이터를 로딩합니다 (미리 캐시된 데이터 재사용 안 함)
-    # prefetch_cache 초기화 (항상 새로 로딩하도록)
+    # 관리자든 일반 사용자든 시트 리비전이 바뀐 소스만 새로 로딩합니다
     if 'prefetch_cache' not in st.session_state:
         st.session_state.prefetch_cache = {}
     
@@ -1898,7 +1722,7 @@ def ensure_cache_data():
     # 캐시에 저장된 사용자 이름 확인 (다른 사용자의 데이터인지 체크)
     cached_user_name = prefetch_cache.get('_cached_user_name')
     
-    # 사용자가 변경되었거나, 항상 새로 로딩하기 위해 캐시 완전히 초기화
+    # 사용자가 변경되었으면 캐시 완전히 초기화
     if cached_user_name != current_user_name:
         st.session_state.prefetch_cache = {}
         prefetch_cache = {}
@@ -1909,26 +1733,50 @@ def ensure_cache_data():
     
     user_name = current_user_name
     
-    # 항상 새로 로딩 (캐시된 데이터 재사용 안 함)
-    # 1on1 코칭 버튼을 눌렀을 때마다 최신 데이터를 로딩하기 위해
-    # 기존 캐시가 있어도 무시하고 새로 로딩합니다
+    # 1on1 코칭 버튼을 눌렀을 때마다 최신 데이터를 보여주되,
+    # 마지막 로딩 이후 시트 리비전이 바뀌지 않은 소스는 기존 캐시를 재사용합니다
+    loaded_revisions = dict(prefetch_cache.get('_revisions') or {})
+    revisions = {
+        key: sheets_cache.revision(sheet_sources.spreadsheet_id(_CACHE_SOURCE_SHEETS[key]))
+        for key, _, _, _ in _CACHE_SOURCES
+    }
+    sources = [
+        source for source in _CACHE_SOURCES
+        if source[0] not in prefetch_cache
+        or revisions[source[0]] is None
+        or revisions[source[0]] != loaded_revisions.get(source[0])
+    ]
+    if not sources:
+        return True
     
     # 데이터 로딩
     status_text = st.empty()
     progress_bar = st.progress(0)
     
-    # 1. Snippet 아카이브 로딩
-    status_text.info("📚 Snippet 아카이브 데이터 로딩 중...")
+    # 아카이브, CDP, IDP, Mission & KPI, Ground Rule을 동시에 로딩하고 끝나는 대로 반영
+    status_text.info("📥 데이터 로딩 중...")
     progress_bar.progress(10)
-    _load_archive_data(user_name, prefetch_cache)
-    
-    # 2. CDP, IDP, Mission & KPI, Ground Rule 로딩
-    status_text.info("📊 기타 데이터 로딩 중...")
-    progress_bar.progress(30)
-    _load_other_data(user_name, prefetch_cache)
-    progress_bar.progress(90)
+    loaders = {
+        key: (lambda loader=loader: _collect_source(loader, user_name))
+        for key, loader, _, _ in sources
+    }
+    timeouts = {key: timeout for key, _, _, timeout in sources}
+    labels = {key: label for key, _, label, _ in sources}
+    fallbacks = {key: {key: []} for key in loaders}
+    done_count = 0
+    for key, result in sheets_fanout.iter_completed(loaders, timeouts=timeouts, fallbacks=fallbacks):
+        prefetch_cache.update(result or {key: []})
+        # 실패/시간 초과로 비어 있으면 다음 방문 때 다시 로딩하도록 리비전을 기록하지 않음
+        if (result or {}).get(key):
+            loaded_revisions[key] = revisions[key]
+        else:
+            loaded_revisions.pop(key, None)
+        done_count += 1
+        status_text.info(f"{labels[key]} 데이터 로딩 완료 ({done_count}/{len(loaders)})")
+        progress_bar.progress(10 + int(80 * done_count / len(loaders)))
     
     # 캐시 저장
+    prefetch_cache['_revisions'] = loaded_revisions
     st.session_state.prefetch_cache = prefetch_cache
     
     status_text.empty()
@@ -2,6 +2,14 @@ import streamlit as st
 import pandas as pd
 import os
 import html
+import sheet_index
+import sheets_batch
+import sheets_cache
+import sheets_mirror
+import snippet_partitions
+import snippet_sync
+import write_queue
+from sheets_retry import call as _sheets_call_with_retry, is_retryable_error as _is_retryable_error
 
 def _ensure_archive_styles():
     """Archive 페이지의 CSS 스타일을 매번 주입하여 다른 페이지의 CSS가 덮어쓰지 않도록 보장합니다."""
@@ -750,46 +758,53 @@ def _ensure_archive_styles():
     )
 
 
-def _is_retryable_error(error_msg: str) -> bool:
-    """재시도 가능한 오류인지 확인합니다."""
-    msg_lower = error_msg.lower()
-    return ('429' in msg_lower) or ('quota' in msg_lower) or ('rate' in msg_lower and 'limit' in msg_lower)
+def get_snippets_from_google_sheets(get_google_sheets_client, spreadsheet_id, since=None, until=None):
+    """Google Sheets에서 Snippet 데이터를 가져옵니다.
 
-def _sheets_call_with_retry(callable_fn, *args, **kwargs):
-    """Google Sheets API 호출을 지수 백오프로 재시도합니다."""
-    import time
-    import random
-    delays = [0, 1, 2, 4, 8, 16]
-    last_error = None
-    for delay in delays:
-        if delay > 0:
-            time.sleep(delay + random.uniform(0, 0.5))
-        try:
-            return callable_fn(*args, **kwargs)
-        except Exception as e:
-            last_error = e
-            error_msg = str(e)
-            if _is_retryable_error(error_msg):
-                continue
-            raise
-    if last_error:
-        raise last_error
-    raise RuntimeError("Google Sheets API 호출이 실패했습니다.")
-
-def get_snippets_from_google_sheets(get_google_sheets_client, spreadsheet_id):
-    """Google Sheets에서 Snippet 데이터를 가져옵니다."""
+    since/until('YYYY-MM-DD')이 있으면 그 기간에 걸치는 연도별 파티션(Snippets_YYYY)만 함께 읽습니다.
+    """
     try:
         client = get_google_sheets_client()
         if not client:
             return None
         
         def _fetch_records():
-            spreadsheet = client.open_by_key(spreadsheet_id)
-            worksheet = spreadsheet.worksheet("Sheet1")
-            records = worksheet.get_all_records()
-            return pd.DataFrame(records) if records else pd.DataFrame()
+            # 활성 시트는 마지막으로 반영한 행 이후의 새 행만 가져옵니다 (주기적으로 전체 검사)
+            return snippet_partitions.read(spreadsheet_id, since=since, until=until, client=client)
+        
+        # 시트 리비전이 바뀌었을 때만 동기화 (sheets_cache가 호출자마다 복사본 반환)
+        df = sheets_cache.get(
+            ("snippets", spreadsheet_id, "Sheet1", since, until), spreadsheet_id,
+            lambda: _sheets_call_with_retry(_fetch_records), client=client
+        )
+        # 아직 시트에 반영되지 않은 Snippet을 뒤에 붙임
+        return write_queue.overlay(df, "snippets")
+    except Exception as e:
+        error_msg = str(e).lower()
+        if _is_retryable_error(error_msg):
+            st.warning("Snippet 아카이브 로드 중 호출 제한이 발생했습니다. 잠시 후 다시 시도해주세요.")
+        else:
+            st.error(f"Google Sheets 데이터 가져오기 오류: {e}")
+        return None
+
+
+def get_recent_snippets(get_google_sheets_client, spreadsheet_id, rows=snippet_sync.DEFAULT_WINDOW_ROWS):
+    """Google Sheets에서 마지막 rows개 행의 Snippet만 가져옵니다. (최근 기록 보기용)
+
+    df.attrs["window_complete"]가 False이면 더 오래된 기록이 시트에 남아 있습니다.
+    """
+    try:
+        client = get_google_sheets_client()
+        if not client:
+            return None
+        
+        def _fetch_recent():
+            return snippet_sync.recent_frame(spreadsheet_id, "Sheet1", rows=rows, client=client)
         
-        return _sheets_call_with_retry(_fetch_records)
+        df = sheets_cache.get(
+            ("snippets_recent", spreadsheet_id, "Sheet1", rows), spreadsheet_id, lambda: _sheets_call_with_retry(_fetch_recent), client=client
+        )
+        return write_queue.overlay(df, "snippets")
     except Exception as e:
         error_msg = str(e).lower()
         if _is_retryable_error(error_msg):
@@ -813,11 +828,26 @@ def get_snippets_from_local_csv():
         return None
 
 
-def get_snippets_with_fallback(get_google_sheets_client, spreadsheet_id):
-    """Snippet 데이터를 가져옵니다. Google Sheets 실패 시 로컬 CSV에서 가져옵니다."""
+def get_snippets_with_fallback(get_google_sheets_client, spreadsheet_id, user_name=None, window_rows=None, since=None):
+    """Snippet 데이터를 가져옵니다.
+
+    로컬 미러가 최신이면 미러에서(user_name이 있으면 해당 사용자만) 조회하고, 아니면 Google Sheets에서 가져옵니다.
+    window_rows가 있으면 Google Sheets에서는 마지막 window_rows개 행만 읽습니다. (get_recent_snippets)
+    since가 있으면 활성 시트 전체와 since 이후 연도 파티션을 읽어 거르지 않은 채 반환합니다.
+    (미러에는 활성 시트만 있으므로 사용하지 않으며, 사용자별 필터는 화면에서 한 번만 합니다)
+    Google Sheets 실패 시 미러, 그마저 없으면 로컬 CSV에서 가져옵니다.
+    """
     # Google Sheets에서 가져오기 시도
-    if st.session_state.google_sheets_connected:
-        df = get_snippets_from_google_sheets(get_google_sheets_client, spreadsheet_id)
+    if st.session_state.google_sheets_connected and since:
+        df = get_snippets_from_google_sheets(get_google_sheets_client, spreadsheet_id, since=since)
+        if df is not None and not df.empty:
+            return df
+    elif st.session_state.google_sheets_connected:
+        if window_rows:
+            loader = lambda: get_recent_snippets(get_google_sheets_client, spreadsheet_id, rows=window_rows)
+        else:
+            loader = lambda: get_snippets_from_google_sheets(get_google_sheets_client, spreadsheet_id)
+        df = sheets_mirror.read("snippets", loader, name=user_name)
         if df is not None and not df.empty:
             return df
     
@@ -828,11 +858,15 @@ def get_snippets_with_fallback(get_google_sheets_client, spreadsheet_id):
 
 def _format_date_display(timestamp_str):
     """타임스탬프를 {YYYY년 MM월 DD일 HH:MM} 형식으로 변환합니다."""
-    if not timestamp_str:
-        return "날짜 없음", ""
-    
     from datetime import datetime
     
+    # 시트에서 이미 datetime으로 변환된 값은 문자열 형식을 시도하지 않음
+    if isinstance(timestamp_str, datetime) and pd.notna(timestamp_str):
+        dt = timestamp_str
+        return f"{dt.year}년 {dt.month:02d}월 {dt.day:02d}일 {dt.hour:02d}:{dt.minute:02d}", dt.strftime("%Y-%m-%d %H:%M:%S")
+    if not timestamp_str or (not isinstance(timestamp_str, str) and pd.isna(timestamp_str)):
+        return "날짜 없음", ""
+    
     timestamp_str = str(timestamp_str).strip()
     
     # 여러 날짜 형식 시도
@@ -972,6 +1006,32 @@ def get_current_viewing_user():
         return st.session_state.viewing_user_info
     return st.session_state.user_info
 
+def _older_partition_year(get_google_sheets_client, spreadsheet_id, since_year=None):
+    """아직 불러오지 않은 가장 최근 연도 파티션(since_year 이전)을 반환합니다. 없거나 확인할 수 없으면 None."""
+    try:
+        client = get_google_sheets_client()
+        if not client:
+            return None
+        years = [
+            year for year in snippet_partitions.partitions(spreadsheet_id, client=client)
+            if since_year is None or year < since_year
+        ]
+    except Exception:
+        return None
+    return max(years) if years else None
+
+def _render_older_button(window_rows, older_year=None):
+    """시트에서 읽는 범위를 넓혀 이전 기록까지 불러오는 버튼을 표시합니다.
+
+    활성 시트를 모두 읽었으면 older_year 파티션(지난 연도 시트)부터 불러옵니다.
+    """
+    if st.button("📜 이전 기록 더 보기", use_container_width=True, key="archive_load_older"):
+        if older_year is not None:
+            st.session_state['archive_since_year'] = int(older_year)
+        else:
+            st.session_state['archive_window_rows'] = int(window_rows) * 4
+        st.rerun()
+
 def render_archive_embedded(get_google_sheets_client, spreadsheet_id):
     """Snippet 아카이브 페이지 렌더링 (메인 앱 컨텍스트에서 사용)"""
     st.title("📚 Snippet 아카이브")
@@ -986,9 +1046,25 @@ def render_archive_embedded(get_google_sheets_client, spreadsheet_id):
     # Archive 페이지 스타일 보장 (제목 이후에 주입하여 우선순위 확보)
     _ensure_archive_styles()
     
-    # 데이터 가져오기 (Google Sheets 또는 로컬 CSV)
+    # 데이터 가져오기 (Google Sheets 또는 로컬 CSV) - 시트에서는 최근 행만 읽고, 요청 시 범위를 넓힘
+    window_rows = st.session_state.get('archive_window_rows', snippet_sync.DEFAULT_WINDOW_ROWS)
+    # 활성 시트를 모두 본 뒤에는 지난 연도 파티션을 한 해씩 더 불러옵니다
+    since_year = st.session_state.get('archive_since_year')
     with st.spinner("데이터를 불러오는 중..."):
-        df = get_snippets_with_fallback(get_google_sheets_client, spreadsheet_id)
+        df = get_snippets_with_fallback(
+            get_google_sheets_client, spreadsheet_id, user_name=user_name or None, window_rows=window_rows,
+            since=f"{since_year}-01-01" if since_year else None,
+        )
+    has_older = df is not None and df.attrs.get("window_complete") is False
+    older_year = None
+    if df is not None and not has_older and st.session_state.google_sheets_connected:
+        older_year = _older_partition_year(get_google_sheets_client, spreadsheet_id, since_year)
+        has_older = older_year is not None
+    
+    # 갱신 중인 이전 데이터를 보여주는 경우 기준 시각 표시
+    freshness = sheets_cache.freshness_caption(df)
+    if freshness:
+        st.caption(freshness)
     
     if df is not None and not df.empty:
         # 현재 조회 중인 사용자의 데이터만 필터링
@@ -996,7 +1072,7 @@ def render_archive_embedded(get_google_sheets_client, spreadsheet_id):
             viewing_user = get_current_viewing_user()
             if viewing_user:
                 user_name = viewing_user['name']
-                user_data = df[df['이름'] == user_name] if '이름' in df.columns else df
+                user_data = sheet_index.rows_for(df, '이름', user_name) if '이름' in df.columns else df
             else:
                 user_data = df
         else:
@@ -1036,61 +1112,18 @@ def render_archive_embedded(get_google_sheets_client, spreadsheet_id):
 
             st.markdown("---")
             st.success(f"총 {len(user_data)}개의 Snippet을 찾았습니다!")
+            if has_older:
+                st.caption("최근 기록만 표시하고 있습니다. 이전 기록은 아래 '이전 기록 더 보기'로 불러올 수 있습니다.")
             
-            # 날짜별로 정렬 (최신순) - 타임스탬프 파싱 후 내림차순
+            # 날짜별로 정렬 (최신순) - 타임스탬프 열을 한 번에 datetime으로 변환한 뒤 내림차순
             if date_col in user_data.columns:
                 try:
-                    from datetime import datetime
-                    
-                    def parse_timestamp(ts_str):
-                        """타임스탬프 문자열을 datetime 객체로 변환합니다."""
-                        if not ts_str or pd.isna(ts_str):
-                            return None
-                        
-                        ts_str = str(ts_str).strip()
-                        if not ts_str:
-                            return None
-                        
-                        # 여러 날짜 형식 시도
-                        date_formats = [
-                            "%Y. %m. %d %p %I:%M:%S",  # "2025. 10. 29 오전 09:57:00"
-                            "%Y. %m. %d %p %I:%M",      # "2025. 10. 29 오전 09:57"
-                            "%Y-%m-%d %H:%M:%S",        # "2025-10-29 09:57:00"
-                            "%Y-%m-%d %H:%M",           # "2025-10-29 09:57"
-                            "%Y/%m/%d %H:%M:%S",        # "2025/10/29 09:57:00"
-                            "%Y/%m/%d %H:%M",           # "2025/10/29 09:57"
-                            "%Y.%m.%d %H:%M:%S",        # "2025.10.29 09:57:00"
-                            "%Y.%m.%d %H:%M",           # "2025.10.29 09:57"
-                        ]
-                        
-                        # 오전/오후를 AM/PM으로 변환
-                        test_str = ts_str.replace("오전", "AM").replace("오후", "PM")
-                        
-                        for fmt in date_formats:
-                            try:
-                                return datetime.strptime(test_str, fmt)
-                            except (ValueError, AttributeError):
-                                continue
-                        
-                        # 추가 시도: pandas to_datetime 사용
-                        try:
-                            return pd.to_datetime(test_str, errors='coerce')
-                        except:
-                            pass
-                        
-                        return None
-                    
-                    # 타임스탬프를 datetime으로 변환
                     _tmp_sort = user_data.copy()
-                    _tmp_sort['__dt'] = _tmp_sort[date_col].apply(parse_timestamp)
-                    
-                    # datetime이 있는 항목과 없는 항목 분리
-                    has_dt = _tmp_sort['__dt'].notna()
+                    _tmp_sort['__dt'] = sheets_batch.to_datetime(_tmp_sort[date_col])
                     
-                    if has_dt.any():
-                        # datetime 기준으로 정렬 (내림차순: 최신순)
-                        sorted_df = _tmp_sort.sort_values('__dt', ascending=False, na_position='last')
-                        user_data = sorted_df.drop(columns=['__dt']).reset_index(drop=True)
+                    if _tmp_sort['__dt'].notna().any():
+                        # datetime 기준으로 정렬 (내림차순: 최신순), 카드 제목에도 변환된 값을 사용
+                        user_data = _tmp_sort.sort_values('__dt', ascending=False, na_position='last').reset_index(drop=True)
                     else:
                         # datetime 변환 실패 시 원본 문자열 기준 내림차순 정렬
                         user_data = user_data.sort_values(by=date_col, ascending=False, na_position='last').reset_index(drop=True)
@@ -1104,7 +1137,7 @@ def render_archive_embedded(get_google_sheets_client, spreadsheet_id):
             
             # 날짜별 카드 형식으로 표시
             for idx, row in user_data.iterrows():
-                timestamp = str(row.get(date_col, '')) if date_col in row else ''
+                timestamp = row.get('__dt') if pd.notna(row.get('__dt')) else (str(row.get(date_col, '')) if date_col in row else '')
                 date_display, _ = _format_date_display(timestamp)
                 
                 # 카드 헤더에 포맷팅된 타임스탬프 표시
@@ -2179,6 +2212,11 @@ def render_archive_embedded(get_google_sheets_client, spreadsheet_id):
                 """,
                 unsafe_allow_html=True
             )
+            if has_older:
+                _render_older_button(window_rows, older_year)
+        elif has_older:
+            st.info("최근 기록에서 Snippet을 찾지 못했습니다. 이전 기록을 불러와 확인해보세요.")
+            _render_older_button(window_rows, older_year)
         else:
             st.info("아직 작성한 Snippet이 없습니다. Daily Snippet 기록을 시작해보세요!")
     else:
@@ -1,9 +1,16 @@
 import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
-import json
-import os
 import pandas as pd
+from gspread.utils import ValueInputOption, rowcol_to_a1
+import sheet_index
+import sheet_sources
+import sheets_batch
+import sheets_cache
+import sheets_client
+import sheets_mirror
+import sheets_singleflight
+import sheets_throttle
+from sheets_client import get_google_sheets_client as _get_google_sheets_client
+from sheets_retry import call as _sheets_call_with_retry, call_write as _sheets_write_with_retry, is_retryable_error as _is_retryable_error
 
 # 메인 컨텐츠 최대 너비 제한 (우측 영역)
 st.markdown(
@@ -28,120 +35,40 @@ st.markdown(
 )
 
 # CDP 전용 스프레드시트 ID (우선순위: secrets > 기본값)
-CDP_SPREADSHEET_ID = (
-    (st.secrets.get("google", {}).get("cdp_spreadsheet_id") if hasattr(st, "secrets") else None)
-    or (st.secrets.get("CDP_SPREADSHEET_ID") if hasattr(st, "secrets") else None)
-    or "15eTye2j0QiwR6LbgseLhF_9hLxfW3GxVCJcdUUGWgLk"
-)
+CDP_SPREADSHEET_ID = sheet_sources.spreadsheet_id("cdp")
+# 프롬프트/캐시용으로 읽는 열 (이름 열 후보 + 계획 열)
+PLAN_COLUMNS = ["이름", "name", "중장기계획", "올해계획", "내년계획"]
 
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive",
-]
 
+def _fetch_cdp_dataframe(columns: list | None = None) -> pd.DataFrame | None:
+    """CDP 구글시트에서 전체 데이터를 DataFrame으로 반환합니다.
 
-def _get_google_sheets_client():
-    """CDP용 Google Sheets 클라이언트를 생성합니다.
-    main.py의 방식과 동일한 우선순위를 따릅니다.
+    columns를 주면 해당 열만 읽습니다. (수정 화면은 열 위치가 필요하므로 전체를 읽습니다)
     """
-    try:
-        # 0) Streamlit secrets
-        try:
-            google_sec = st.secrets.get("google") if hasattr(st, "secrets") else None
-        except Exception:
-            google_sec = None
-
-        if google_sec:
-            if "credentials_json" in google_sec and google_sec["credentials_json"]:
-                raw = google_sec["credentials_json"]
-                creds_info = json.loads(raw) if isinstance(raw, str) else dict(raw)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-            if "service_account" in google_sec and google_sec["service_account"]:
-                creds_info = dict(google_sec["service_account"])  # MappingProxyType 대응
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-
-        # 1) Streamlit secrets에서 직접 읽기 (추가 위치 확인)
-        try:
-            if hasattr(st, "secrets"):
-                direct_creds = st.secrets.get("GOOGLE_CREDENTIALS_JSON") or st.secrets.get("google_credentials_json")
-                if direct_creds:
-                    try:
-                        creds_info = json.loads(direct_creds) if isinstance(direct_creds, str) else dict(direct_creds)
-                        creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                        return gspread.authorize(creds)
-                    except json.JSONDecodeError:
-                        st.error("Streamlit secrets의 GOOGLE_CREDENTIALS_JSON이 올바른 JSON 형식이 아닙니다.")
-                        return None
-        except Exception:
-            pass
-
-        # 2) 로컬 파일
-        service_account_file = "service_account.json"
-        if os.path.exists(service_account_file):
-            creds = Credentials.from_service_account_file(service_account_file, scopes=SCOPE)
-            return gspread.authorize(creds)
-
-        # 3) 세션 상태
-        if "google_credentials" in st.session_state and st.session_state.google_credentials:
-            try:
-                creds_info = json.loads(st.session_state.google_credentials)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-            except json.JSONDecodeError:
-                st.error("저장된 서비스 계정 정보가 올바른 JSON 형식이 아닙니다.")
-                return None
-
-        st.warning("Google Sheets 연동을 위해 서비스 계정 인증 정보가 필요합니다.")
-        return None
-    except Exception as e:
-        st.error(f"Google Sheets 연동 오류: {e}")
-        return None
-
-
-def _is_retryable_error(error_msg: str) -> bool:
-    """재시도 가능한 오류인지 확인합니다."""
-    msg_lower = error_msg.lower()
-    return ('429' in msg_lower) or ('quota' in msg_lower) or ('rate' in msg_lower and 'limit' in msg_lower)
-
-def _sheets_call_with_retry(callable_fn, *args, **kwargs):
-    """Google Sheets API 호출을 지수 백오프로 재시도합니다."""
-    import time
-    import random
-    delays = [0, 1, 2, 4, 8, 16]
-    last_error = None
-    for delay in delays:
-        if delay > 0:
-            time.sleep(delay + random.uniform(0, 0.5))
-        try:
-            return callable_fn(*args, **kwargs)
-        except Exception as e:
-            last_error = e
-            error_msg = str(e)
-            if _is_retryable_error(error_msg):
-                continue
-            raise
-    if last_error:
-        raise last_error
-    raise RuntimeError("Google Sheets API 호출이 실패했습니다.")
-
-def _fetch_cdp_dataframe() -> pd.DataFrame | None:
-    """CDP 구글시트에서 전체 데이터를 DataFrame으로 반환합니다."""
     try:
         client = _get_google_sheets_client()
         if not client:
             return None
         
         def _fetch_records():
-            spreadsheet = client.open_by_key(CDP_SPREADSHEET_ID)
-            worksheet = spreadsheet.sheet1
-            records = worksheet.get_all_records()
+            if columns:
+                values = sheets_batch.projected_values(CDP_SPREADSHEET_ID, None, columns, client=client)
+                records = sheets_batch.records_from_values(values)
+            else:
+                worksheet = sheets_client.get_worksheet(CDP_SPREADSHEET_ID, client=client)
+                records = worksheet.get_all_records()
             if not records:
                 return pd.DataFrame()
-            return pd.DataFrame(records)
+            label = f"cdp:{','.join(columns)}" if columns else "cdp"
+            df = sheet_index.stamp(pd.DataFrame(records), label)
+            # 레코드 i번째 = 시트 i+2행 (헤더 1행)
+            df.attrs["sheet_rows"] = list(range(2, len(df) + 2))
+            return df
         
-        return _sheets_call_with_retry(_fetch_records)
+        # 여러 세션이 동시에 요청하면 진행 중인 한 번의 조회 결과를 함께 사용
+        return sheets_singleflight.do(
+            (CDP_SPREADSHEET_ID, None, "records", tuple(columns or ())), lambda: _sheets_call_with_retry(_fetch_records)
+        )
     except Exception as e:
         error_msg = str(e).lower()
         if _is_retryable_error(error_msg):
@@ -151,6 +78,36 @@ def _fetch_cdp_dataframe() -> pd.DataFrame | None:
         return None
 
 
+def _live_cells(worksheet, row_number: int, name_col, user_name: str, plan_values: dict) -> list:
+    """쓰기 직전에 시트의 헤더와 대상 행을 다시 읽어 [(열 번호, 값)]을 반환합니다.
+
+    화면의 DataFrame은 오래된 미러/캐시일 수 있으므로 대상 행의 이름이 user_name이 아니면(행이 밀린 경우)
+    다른 사람의 CDP를 덮어쓰지 않도록 ValueError로 중단합니다.
+    열 번호는 실제 헤더에서 찾습니다. (중복/빈 헤더는 records에서 첫 번째 열만 남으므로 같은 규칙으로 첫 번째 열)
+    """
+    header_values, row_values = worksheet.batch_get(["1:1", f"{row_number}:{row_number}"])
+    header = [str(cell).strip() for cell in (header_values[0] if header_values else [])]
+    row = list(row_values[0]) if row_values else []
+
+    def _column(name) -> int | None:
+        name = str(name).strip()
+        return header.index(name) + 1 if name in header else None
+
+    name_column = _column(name_col)
+    live_name = str(row[name_column - 1]).strip() if name_column and name_column <= len(row) else ""
+    if live_name != str(user_name).strip():
+        sheets_mirror.invalidate("cdp")
+        raise ValueError("시트의 행 위치가 바뀌어 저장하지 않았습니다. 새로고침한 뒤 다시 시도해주세요.")
+    cells = []
+    for col, value in plan_values.items():
+        column = _column(col)
+        if column is None:
+            sheets_mirror.invalidate("cdp")
+            raise ValueError(f"시트에서 '{col}' 열을 찾을 수 없어 저장하지 않았습니다. 새로고침한 뒤 다시 시도해주세요.")
+        cells.append((column, value))
+    return sorted(cells)
+
+
 def get_current_viewing_user():
     """현재 조회 중인 사용자 정보를 반환합니다.
     관리자가 다른 사용자를 선택한 경우 viewing_user_info를 반환하고,
@@ -175,7 +132,7 @@ def render_cdp_embedded():
     user_name = viewing_user.get("name")
 
     with st.spinner("CDP 데이터를 불러오는 중..."):
-        df = _fetch_cdp_dataframe()
+        df = sheets_mirror.read("cdp", _fetch_cdp_dataframe, name=user_name)
 
     if df is None:
         st.warning("CDP 데이터를 불러올 수 없습니다. Google Sheets 연동을 확인해주세요.")
@@ -187,13 +144,13 @@ def render_cdp_embedded():
 
     # 열 이름 정규화 (가능한 오타/공백 방지)
     normalized = {c.strip(): c for c in df.columns}
-    name_col = normalized.get("이름") or normalized.get("name") or list(df.columns)[0]
+    name_col = sheet_index.name_column(df)
     long_col = normalized.get("중장기계획")
     this_col = normalized.get("올해계획")
     next_col = normalized.get("내년계획")
 
     # 사용자 행 필터링
-    user_rows = df[df[name_col] == user_name]
+    user_rows = sheet_index.rows_for(df, name_col, user_name)
     if user_rows.empty:
         st.info(f"사용자 '{user_name}'에 해당하는 CDP 정보가 없습니다.")
         return
@@ -205,6 +162,10 @@ def render_cdp_embedded():
 
     # 헤더
     st.subheader(f"{user_name} 님의 CDP")
+    # 갱신 중인 이전 데이터를 보여주는 경우 기준 시각 표시
+    freshness = sheets_cache.freshness_caption(df)
+    if freshness:
+        st.caption(freshness)
 
     # 세로로 배열된 카드 스타일 출력
     st.markdown("**🧭 중장기 계획**")
@@ -260,56 +221,45 @@ def render_cdp_embedded():
                         if "cdp_pending_data" in st.session_state:
                             del st.session_state["cdp_pending_data"]
                     else:
+                        # 이름 인덱스로 찾아 둔 사용자 행 번호와 열 위치로 한 번에 기록
+                        user_row_number = sheet_index.sheet_row(df, row.name)
+                        plan_values = {
+                            col: value
+                            for col, value in ((long_col, edited_long_plan), (this_col, edited_this_plan), (next_col, edited_next_plan))
+                            if col
+                        }
+                        
                         def _update_cdp():
-                            spreadsheet = client.open_by_key(CDP_SPREADSHEET_ID)
-                            worksheet = spreadsheet.sheet1
-                            
-                            # 헤더 행 가져오기
-                            headers = worksheet.row_values(1)
-                            name_idx = None
-                            long_idx = None
-                            this_idx = None
-                            next_idx = None
-                            
-                            # 컬럼명 정규화 (공백 제거)
-                            name_col_stripped = name_col.strip() if name_col else ""
-                            long_col_stripped = long_col.strip() if long_col else ""
-                            this_col_stripped = this_col.strip() if this_col else ""
-                            next_col_stripped = next_col.strip() if next_col else ""
-                            
-                            for i, header in enumerate(headers, start=1):
-                                header_stripped = header.strip() if header else ""
-                                if header_stripped == name_col_stripped or header_stripped == name_col:
-                                    name_idx = i
-                                elif header_stripped == long_col_stripped or header_stripped == long_col:
-                                    long_idx = i
-                                elif header_stripped == this_col_stripped or header_stripped == this_col:
-                                    this_idx = i
-                                elif header_stripped == next_col_stripped or header_stripped == next_col:
-                                    next_idx = i
-                            
-                            # 사용자 행 찾기
-                            all_values = worksheet.get_all_values()
-                            user_row_idx = None
-                            for idx, row_values in enumerate(all_values[1:], start=2):  # 헤더 제외하고 2부터 시작
-                                if len(row_values) > name_idx - 1 and row_values[name_idx - 1] == user_name:
-                                    user_row_idx = idx
-                                    break
-                            
-                            if user_row_idx is None:
+                            if user_row_number is None:
                                 raise ValueError("사용자 행을 찾을 수 없습니다.")
-                            
-                            # 값 업데이트
-                            if long_idx:
-                                worksheet.update_cell(user_row_idx, long_idx, edited_long_plan)
-                            if this_idx:
-                                worksheet.update_cell(user_row_idx, this_idx, edited_this_plan)
-                            if next_idx:
-                                worksheet.update_cell(user_row_idx, next_idx, edited_next_plan)
+                            if not plan_values:
+                                return True
+                            worksheet = sheets_client.get_worksheet(CDP_SPREADSHEET_ID, client=client)
+                            # 행/열 위치는 화면의 DataFrame이 아니라 지금 시트에서 확인
+                            cells = _live_cells(worksheet, user_row_number, name_col, user_name, plan_values)
+                            first_col, last_col = cells[0][0], cells[-1][0]
+                            if last_col - first_col + 1 == len(cells):
+                                # 계획 열이 붙어 있으면 범위 하나로 기록
+                                cell_range = f"{rowcol_to_a1(user_row_number, first_col)}:{rowcol_to_a1(user_row_number, last_col)}"
+                                # gspread 5/6의 인자 순서가 달라 키워드로 전달
+                                worksheet.update(
+                                    values=[[value for _, value in cells]],
+                                    range_name=cell_range,
+                                    value_input_option=ValueInputOption.user_entered,
+                                )
+                            else:
+                                worksheet.batch_update(
+                                    [{"range": rowcol_to_a1(user_row_number, col), "values": [[value]]} for col, value in cells],
+                                    value_input_option=ValueInputOption.user_entered,
+                                )
+                            # 시트를 다시 읽지 않고 미러의 같은 행만 고침
+                            if not sheets_mirror.patch("cdp", user_row_number, plan_values):
+                                sheets_mirror.invalidate("cdp")
                             return True
                         
                         try:
-                            _sheets_call_with_retry(_update_cdp)
+                            with sheets_throttle.priority():
+                                _sheets_write_with_retry(_update_cdp)
                             
                             # 저장 성공 시 CDP 캐시 갱신
                             viewing_user = get_current_viewing_user()
@@ -321,16 +271,10 @@ def render_cdp_embedded():
                                     if 'prefetch_cache' not in st.session_state:
                                         st.session_state.prefetch_cache = {}
                                     
-                                    # 최신 CDP 데이터 가져오기
-                                    cdp_df = _fetch_cdp_dataframe()
-                                    if cdp_df is not None and not cdp_df.empty:
-                                        # 사용자 데이터만 필터링
-                                        normalized = {c.strip(): c for c in cdp_df.columns}
-                                        name_col = normalized.get("이름") or normalized.get("name") or list(cdp_df.columns)[0]
-                                        user_cdp = cdp_df[cdp_df[name_col] == user_name]
-                                        st.session_state.prefetch_cache['cdp'] = user_cdp.to_dict('records') if not user_cdp.empty else []
-                                    else:
-                                        st.session_state.prefetch_cache['cdp'] = []
+                                    # 시트를 다시 읽지 않고 저장한 값으로 사용자 행을 고쳐 캐시에 반영
+                                    user_cdp = row.to_dict()
+                                    user_cdp.update(plan_values)
+                                    st.session_state.prefetch_cache['cdp'] = [user_cdp]
                                     
                                     # 캐시 파일에 저장 (main.py의 touch_session_active 함수 사용 시도)
                                     try:
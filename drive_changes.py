@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import sheet_sources
+import sheets_cache
+import sheets_client
+import sheets_mirror
+
+DRIVE_CHANGES_URL = "https://www.googleapis.com/drive/v3/changes"
+# 변경 목록 확인 주기(초) - 시트 수와 관계없이 주기마다 changes.list 한 번(여러 페이지면 페이지 수만큼)
+POLL_INTERVAL_SECONDS = 60
+# 한 페이지에 받을 최대 변경 수
+PAGE_SIZE = 1000
+# 피드별 마지막 페이지 토큰 (재시작 후에도 그 이후 변경만 받습니다)
+STATE_PATH = "drive_changes.json"
+# 이 환경 변수에 파일 경로를 주면 Drive 대신 로컬 변경 피드(한 줄에 {"fileId": ...})를 읽습니다 (오프라인 테스트용)
+LOCAL_FEED_ENV = "DRIVE_CHANGES_LOCAL_FEED"
+# 토큰이 만료/무효일 때 Drive가 돌려주는 상태 코드
+EXPIRED_TOKEN_STATUS = {400, 404, 410}
+
+_lock = threading.Lock()
+_worker = None
+_status = {"feed": None, "last_poll": None, "polls": 0, "changed": 0, "errors": 0, "last_error": None}
+
+
+class TokenExpired(Exception):
+    """저장해 둔 페이지 토큰을 더 이상 쓸 수 없을 때 발생합니다. (새 토큰으로 다시 시작)"""
+
+
+def _load_state() -> dict:
+    try:
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(state: dict):
+    tmp_path = f"{STATE_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def _drive_get(session, url: str, params: dict) -> dict:
+    response = session.request("GET", url, params=params)
+    if response.status_code in EXPIRED_TOKEN_STATUS and "pageToken" in params:
+        raise TokenExpired(response.text)
+    if not response.ok:
+        raise RuntimeError(f"Drive changes 조회 실패 ({response.status_code}): {response.text[:200]}")
+    return response.json()
+
+
+def _drive_start_token(session) -> str:
+    data = _drive_get(session, f"{DRIVE_CHANGES_URL}/startPageToken", {"supportsAllDrives": "true"})
+    return str(data["startPageToken"])
+
+
+def _drive_changes(session, token: str) -> tuple:
+    """token 이후 바뀐 파일 ID 집합과 다음 토큰을 반환합니다. (모든 페이지를 따라갑니다)"""
+    file_ids = set()
+    while True:
+        data = _drive_get(session, DRIVE_CHANGES_URL, {
+            "pageToken": token,
+            "pageSize": PAGE_SIZE,
+            "fields": "nextPageToken,newStartPageToken,changes(fileId)",
+            "includeItemsFromAllDrives": "true",
+            "supportsAllDrives": "true",
+        })
+        file_ids.update(change.get("fileId") for change in data.get("changes", []) if change.get("fileId"))
+        if data.get("newStartPageToken"):
+            return file_ids, str(data["newStartPageToken"])
+        token = data.get("nextPageToken")
+        if not token:
+            raise RuntimeError("Drive changes 응답에 다음 토큰이 없습니다.")
+
+
+def _local_lines(path: str) -> list:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.readlines()
+    except OSError:
+        return []
+
+
+def _local_start_token(path: str) -> str:
+    return str(len(_local_lines(path)))
+
+
+def _local_changes(path: str, token: str) -> tuple:
+    """로컬 피드에서 token(읽은 줄 수) 이후 줄의 파일 ID 집합과 다음 토큰을 반환합니다."""
+    lines = _local_lines(path)
+    start = int(token)
+    if start > len(lines):
+        # 피드 파일이 새로 만들어졌으면 처음부터 다시
+        raise TokenExpired(f"{path}: {start} > {len(lines)}")
+    file_ids = set()
+    for line in lines[start:]:
+        try:
+            file_id = json.loads(line).get("fileId")
+        except (json.JSONDecodeError, AttributeError):
+            continue
+        if file_id:
+            file_ids.add(file_id)
+    return file_ids, str(len(lines))
+
+
+def record_local_change(spreadsheet_id: str, path: str | None = None):
+    """로컬 변경 피드에 변경 하나를 추가합니다. (오프라인에서 시트 수정을 흉내낼 때 사용)"""
+    path = path or os.environ.get(LOCAL_FEED_ENV)
+    if not path:
+        raise RuntimeError(f"{LOCAL_FEED_ENV} 환경 변수로 로컬 피드 경로를 지정하세요.")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"fileId": spreadsheet_id, "time": time.time()}) + "\n")
+
+
+def _feed(client=None) -> tuple:
+    """(피드 이름, 시작 토큰 함수, 변경 조회 함수)를 반환합니다. 로컬 피드가 지정되어 있으면 그것을 씁니다."""
+    path = os.environ.get(LOCAL_FEED_ENV)
+    if path:
+        return f"local:{os.path.abspath(path)}", lambda: _local_start_token(path), lambda token: _local_changes(path, token)
+    client = client or sheets_client.get_google_sheets_client()
+    session = sheets_client.http_session(client) if client else None
+    if session is None:
+        raise RuntimeError("Drive 변경 피드에 사용할 세션이 없습니다.")
+    return "drive", lambda: _drive_start_token(session), lambda token: _drive_changes(session, token)
+
+
+def watched() -> dict:
+    """앱이 읽는 스프레드시트 ID -> 소스 키 목록입니다. (같은 스프레드시트를 여러 소스가 쓸 수 있음)"""
+    sources: dict = {}
+    for key in sheet_sources.keys():
+        sources.setdefault(sheet_sources.spreadsheet_id(key), []).append(key)
+    return sources
+
+
+def _refresh(spreadsheet_ids: set) -> list:
+    """바뀐 스프레드시트의 공유 캐시 리비전을 다시 확인하게 하고 해당 소스의 미러만 다시 동기화합니다.
+
+    미러는 동기화에 성공할 때까지 오래된 것으로 표시되므로 다음 확인에서 touch로 신선해지지 않습니다.
+    """
+    sources = watched()
+    changed = []
+    for spreadsheet_id in sorted(spreadsheet_ids & set(sources)):
+        sheets_cache.note_change(spreadsheet_id)
+        for key in sources[spreadsheet_id]:
+            sheets_mirror.mark_stale(key)
+            changed.append(key)
+    return changed
+
+
+def poll_once(client=None) -> list:
+    """변경 피드를 한 번 확인하고 바뀐 소스 키 목록을 반환합니다.
+
+    처음 실행(저장된 토큰 없음)이면 시작 토큰만 저장합니다.
+    이전 토큰 이후 변경을 확인했으면 바뀌지 않은 소스의 미러 synced_at을 갱신합니다.
+    토큰이 만료되었으면 그 사이 변경을 알 수 없으므로 모든 소스를 바뀐 것으로 보고 새 토큰으로 다시 시작합니다.
+    """
+    name, start_token, list_changes = _feed(client)
+    state = _load_state()
+    token = state.get(name)
+    known = token is not None
+    try:
+        if token is None:
+            file_ids, token = set(), start_token()
+        else:
+            file_ids, token = list_changes(token)
+    except TokenExpired:
+        file_ids, token = set(watched()), start_token()
+    changed = _refresh(file_ids)
+    state[name] = token
+    _save_state(state)
+    sheets_cache.note_feed_poll()
+    if known:
+        # 바뀌지 않은 소스는 지금까지 최신이었으므로 미러 신선도를 갱신합니다 (FRESH_SECONDS가 지나도 전체 읽기를 하지 않음)
+        sheets_mirror.touch([key for keys in watched().values() for key in keys if key not in changed])
+    with _lock:
+        _status.update(feed=name, last_poll=time.time(), last_error=None)
+        _status["polls"] += 1
+        _status["changed"] += len(changed)
+    return changed
+
+
+def status() -> dict:
+    """피드 상태 {feed, last_poll, polls, changed, errors, last_error}를 반환합니다."""
+    with _lock:
+        return dict(_status)
+
+
+def _run():
+    while True:
+        try:
+            poll_once()
+        except Exception as e:
+            # 실패가 이어지면 sheets_cache.feed_alive()가 False가 되어 주기적 리비전 확인으로 돌아갑니다
+            with _lock:
+                _status["errors"] += 1
+                _status["last_error"] = str(e)
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def start():
+    """프로세스당 한 번 변경 피드 확인 스레드를 시작합니다."""
+    global _worker
+    with _lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_run, name="drive-changes", daemon=True)
+        _worker.start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive 변경 피드를 한 번 확인하거나 로컬 피드에 변경을 기록합니다.")
+    parser.add_argument("--touch", metavar="SOURCE", help=f"로컬 피드({LOCAL_FEED_ENV})에 소스 키의 변경을 기록")
+    args = parser.parse_args(argv)
+    if args.touch:
+        record_local_change(sheet_sources.spreadsheet_id(args.touch))
+        return 0
+    changed = poll_once()
+    print(f"바뀐 소스: {', '.join(changed) or '없음'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,18 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 from datetime import datetime, timezone, timedelta
 import json
-import os
 import re
+import sheet_decode
+import sheet_index
+import sheet_sources
+import sheets_batch
+import sheets_cache
+import sheets_client
+import sheets_mirror
+import sheets_singleflight
+import write_queue
+from sheets_client import get_google_sheets_client
 
 
 # 메인 컨텐츠 최대 너비 제한 (우측 영역)
@@ -76,74 +83,9 @@ USERS_DATA = {
 }
 
 
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive",
-]
-
 # IDP 사용 내역 구글시트
 # https://docs.google.com/spreadsheets/d/1ufWiqLPPxdmt95jqnJ2sTRy_nmsGASRQnZWmAEmI1C4/edit
-IDP_SPREADSHEET_ID = (
-    (st.secrets.get("google", {}).get("idp_spreadsheet_id") if hasattr(st, "secrets") else None)
-    or "1ufWiqLPPxdmt95jqnJ2sTRy_nmsGASRQnZWmAEmI1C4"
-)
-
-
-def get_google_sheets_client():
-    try:
-        try:
-            google_sec = st.secrets.get("google") if hasattr(st, "secrets") else None
-        except Exception:
-            google_sec = None
-
-        if google_sec:
-            if "credentials_json" in google_sec and google_sec["credentials_json"]:
-                raw = google_sec["credentials_json"]
-                creds_info = json.loads(raw) if isinstance(raw, str) else dict(raw)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-            if "service_account" in google_sec and google_sec["service_account"]:
-                creds_info = dict(google_sec["service_account"])  # MappingProxyType 대응
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-
-        # Streamlit secrets에서 직접 읽기 (추가 위치 확인)
-        try:
-            if hasattr(st, "secrets"):
-                direct_creds = st.secrets.get("GOOGLE_CREDENTIALS_JSON") or st.secrets.get("google_credentials_json")
-                if direct_creds:
-                    try:
-                        creds_info = json.loads(direct_creds) if isinstance(direct_creds, str) else dict(direct_creds)
-                        creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                        return gspread.authorize(creds)
-                    except json.JSONDecodeError:
-                        st.error("Streamlit secrets의 GOOGLE_CREDENTIALS_JSON이 올바른 JSON 형식이 아닙니다.")
-                        return None
-        except Exception:
-            pass
-
-        service_account_file = "service_account.json"
-        if os.path.exists(service_account_file):
-            creds = Credentials.from_service_account_file(service_account_file, scopes=SCOPE)
-            return gspread.authorize(creds)
-
-        if "google_credentials" in st.session_state and st.session_state.google_credentials:
-            try:
-                creds_info = json.loads(st.session_state.google_credentials)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-            except json.JSONDecodeError:
-                st.error("저장된 서비스 계정 정보가 올바른 JSON 형식이 아닙니다.")
-                return None
-
-        st.warning("Google Sheets 연동을 위해 서비스 계정 인증 정보가 필요합니다.")
-        return None
-    except (ValueError, KeyError, AttributeError) as e:
-        st.error(f"Google Sheets 연동 설정 오류: {e}")
-        return None
-    except Exception as e:
-        st.error(f"Google Sheets 연동 오류: {e}")
-        return None
+IDP_SPREADSHEET_ID = sheet_sources.spreadsheet_id("idp")
 
 
 def ensure_session():
@@ -175,25 +117,9 @@ def parse_currency(value: str) -> int:
 
 
 def parse_date(value: str) -> datetime | None:
-    if not value:
-        return None
-    s = str(value).strip()
-    # 지원 포맷: '2025. 9. 22', '2025-09-22', '2025/09/22', 'YYYY. M. D 오후 6:41:57'
-    fmts = [
-        "%Y. %m. %d",
-        "%Y-%m-%d",
-        "%Y/%m/%d",
-        "%Y. %m. %d %p %I:%M:%S",
-        "%Y.%m.%d",
-    ]
-    for f in fmts:
-        try:
-            dt = datetime.strptime(s.replace("AM", "오전").replace("PM", "오후"), f)
-            return dt
-        except Exception:
-            pass
-    # 구글시트가 날짜를 숫자로 반환하는 경우는 gspread에서 보통 문자열로 포맷됨. 실패시 None
-    return None
+    """날짜 값 하나를 datetime으로 바꿉니다. 여러 행은 sheets_batch.to_datetime으로 한 번에 변환하세요."""
+    parsed = sheets_batch.to_datetime([value]).iloc[0]
+    return None if pd.isna(parsed) else parsed.to_pydatetime()
 
 
 def fetch_idp_dataframe() -> pd.DataFrame | None:
@@ -201,12 +127,15 @@ def fetch_idp_dataframe() -> pd.DataFrame | None:
         client = get_google_sheets_client()
         if not client:
             return None
-        ss = client.open_by_key(IDP_SPREADSHEET_ID)
-        ws = ss.sheet1
-        records = ws.get_all_records()
-        if not records:
+        ws = sheets_client.get_worksheet(IDP_SPREADSHEET_ID, client=client)
+        # 여러 세션이 동시에 요청하면 진행 중인 한 번의 조회 결과를 함께 사용
+        values = sheets_singleflight.do((IDP_SPREADSHEET_ID, None, "values"), ws.get_all_values)
+        # 행마다 dict를 만들지 않고 열 단위로 바로 형식(신청비용 Int64, 이름 category 등)을 입힘
+        df = sheet_decode.frame_from_values(values, sheet_decode.SCHEMAS["idp"])
+        if df.empty:
             return pd.DataFrame()
-        return pd.DataFrame(records)
+        # 아직 시트에 반영되지 않은 등록 건을 뒤에 붙임
+        return write_queue.overlay(sheet_index.stamp(df, "idp"), "idp")
     except Exception as e:
         st.error(f"IDP 시트 로드 오류: {e}")
         return None
@@ -257,7 +186,7 @@ def render_login():
 def render_metric_and_cards(df: pd.DataFrame, user_name: str):
     # 사용자 필터
     if "이름" in df.columns:
-        df_user = df[df["이름"] == user_name].copy()
+        df_user = sheet_index.rows_for(df, "이름", user_name).copy()
     else:
         df_user = df.copy()
 
@@ -271,8 +200,11 @@ def render_metric_and_cards(df: pd.DataFrame, user_name: str):
     cost_col = "신청비용" if "신청비용" in df_user.columns else None
 
     # 파싱
-    df_user["_parsed_dt"] = df_user[date_col].apply(parse_date)
-    if cost_col:
+    # 날짜 열 전체를 한 번에 변환 ('2025. 9. 22', 'YYYY. M. D 오후 6:41:57', 일련번호 등)
+    df_user["_parsed_dt"] = sheets_batch.to_datetime(df_user[date_col])
+    if cost_col and pd.api.types.is_integer_dtype(df_user[cost_col]):
+        df_user["_cost"] = df_user[cost_col].fillna(0).astype("int64")
+    elif cost_col:
         df_user["_cost"] = df_user[cost_col].apply(parse_currency)
     else:
         df_user["_cost"] = 0
@@ -280,7 +212,7 @@ def render_metric_and_cards(df: pd.DataFrame, user_name: str):
     # 올해 누적 금액 (서울 시간 기준)
     kst = timezone(timedelta(hours=9))
     current_year = datetime.now(kst).year
-    df_this_year = df_user[df_user["_parsed_dt"].apply(lambda x: x.year == current_year if isinstance(x, datetime) else False)]
+    df_this_year = df_user[df_user["_parsed_dt"].dt.year == current_year]
     total_cost = int(df_this_year["_cost"].sum()) if not df_this_year.empty else 0
 
     # 상단 메트릭
@@ -300,7 +232,7 @@ def render_metric_and_cards(df: pd.DataFrame, user_name: str):
     # 한 줄 요약 + 클릭 시 상세(Expander) 렌더링
     for _, row in df_user.iterrows():
         dt = row.get("_parsed_dt")
-        date_str = dt.strftime("%Y-%m-%d") if isinstance(dt, datetime) else str(row.get(date_col, "-"))
+        date_str = dt.strftime("%Y-%m-%d") if pd.notna(dt) else str(row.get(date_col, "-"))
         title = str(row.get("신청명", "-"))
         cost_val = int(row.get("_cost", 0) or 0)
 
@@ -334,52 +266,13 @@ def render_metric_and_cards(df: pd.DataFrame, user_name: str):
                 st.markdown(f"[안내사이트 바로가기]({url})")
 
 
-def _is_retryable_error(error_msg: str) -> bool:
-    """재시도 가능한 오류인지 확인합니다."""
-    msg_lower = error_msg.lower()
-    return ('429' in msg_lower) or ('quota' in msg_lower) or ('rate' in msg_lower and 'limit' in msg_lower)
-
-def _sheets_call_with_retry(callable_fn, *args, **kwargs):
-    """Google Sheets API 호출을 지수 백오프로 재시도합니다."""
-    import time
-    import random
-    delays = [0, 1, 2, 4, 8, 16]
-    last_error = None
-    for delay in delays:
-        if delay > 0:
-            time.sleep(delay + random.uniform(0, 0.5))
-        try:
-            return callable_fn(*args, **kwargs)
-        except Exception as e:
-            last_error = e
-            error_msg = str(e)
-            if _is_retryable_error(error_msg):
-                continue
-            raise
-    if last_error:
-        raise last_error
-    raise RuntimeError("Google Sheets API 호출이 실패했습니다.")
-
 def save_idp_to_google_sheets(data):
-    """IDP 데이터를 Google Sheets에 저장합니다."""
+    """IDP 데이터를 쓰기 대기열에 넣습니다. (로컬 선기록 후 백그라운드에서 시트에 일괄 반영)"""
     try:
-        client = get_google_sheets_client()
-        if not client:
-            return False
-        
-        def _append_row():
-            spreadsheet = client.open_by_key(IDP_SPREADSHEET_ID)
-            worksheet = spreadsheet.sheet1
-            worksheet.append_row(data)
-            return True
-        
-        return _sheets_call_with_retry(_append_row)
+        write_queue.enqueue("idp", data)
+        return True
     except Exception as e:
-        error_msg = str(e).lower()
-        if _is_retryable_error(error_msg):
-            st.warning("IDP 저장 중 호출 제한이 발생했습니다. 잠시 후 다시 시도해주세요.")
-        else:
-            st.error(f"Google Sheets 저장 오류: {e}")
+        st.error(f"IDP 저장 오류: {e}")
         return False
 
 
@@ -517,9 +410,9 @@ def render_idp_registration_form(user_name: str):
                                 # 사용자 데이터만 필터링
                                 if '이름' in idp_df.columns:
                                     user_idp = idp_df[idp_df['이름'] == user_name_val]
-                                    st.session_state.prefetch_cache['idp'] = user_idp.to_dict('records') if not user_idp.empty else []
+                                    st.session_state.prefetch_cache['idp'] = sheets_batch.to_records(user_idp) if not user_idp.empty else []
                                 else:
-                                    st.session_state.prefetch_cache['idp'] = idp_df.to_dict('records')
+                                    st.session_state.prefetch_cache['idp'] = sheets_batch.to_records(idp_df)
                             else:
                                 st.session_state.prefetch_cache['idp'] = []
                             
@@ -593,13 +486,17 @@ def render_idp_usage_embedded():
     # 양식이 닫혀있을 때만 사용 내역 표시
     st.subheader(f"{user_name} 님의 IDP")
     with st.spinner("구글시트에서 데이터를 불러오는 중..."):
-        df = fetch_idp_dataframe()
+        df = sheets_mirror.read("idp", fetch_idp_dataframe, name=user_name or None)
     if df is None:
         st.error("데이터를 불러오지 못했습니다. Google 인증 정보를 확인해주세요.")
         return
     if df.empty:
         st.info("시트에 데이터가 없습니다.")
         return
+    # 갱신 중인 이전 데이터를 보여주는 경우 기준 시각 표시
+    freshness = sheets_cache.freshness_caption(df)
+    if freshness:
+        st.caption(freshness)
     render_metric_and_cards(df, user_name)
     
     # IDP 신규 등록 버튼 (하단에 위치)
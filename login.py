@@ -1,10 +1,8 @@
 import streamlit as st
 from datetime import datetime, timezone, timedelta
 import hashlib
-import gspread
-from google.oauth2.service_account import Credentials
-import json
-import os
+import sheet_sources
+import user_directory
 
 # 페이지 설정
 st.set_page_config(
@@ -13,113 +11,26 @@ st.set_page_config(
     layout="centered"
 )
 
-# Google Sheets 연동을 위한 설정
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive"
-]
-
 # 사용자 정보 시트 ID
-USERS_SPREADSHEET_ID = (
-    (st.secrets.get("google", {}).get("users_spreadsheet_id") if hasattr(st, "secrets") else None)
-    or "1fHSCgg6_97Z3JzOvrk3ElXQWhOWhVhl5IaITeA9pXmY"
-)
-
-def get_google_sheets_client():
-    """Google Sheets 클라이언트를 반환합니다."""
-    try:
-        # 방법 0: Streamlit secrets에서 서비스 계정 정보 읽기 (최우선)
-        try:
-            google_sec = st.secrets.get("google") if hasattr(st, "secrets") else None
-        except Exception:
-            google_sec = None
-
-        if google_sec:
-            # 0-a) 전체 JSON 문자열 저장한 경우: google.credentials_json
-            if "credentials_json" in google_sec and google_sec["credentials_json"]:
-                raw = google_sec["credentials_json"]
-                creds_info = json.loads(raw) if isinstance(raw, str) else dict(raw)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-
-            # 0-b) TOML로 키를 중첩(dict) 저장한 경우: google.service_account = { ... }
-            if "service_account" in google_sec and google_sec["service_account"]:
-                creds_info = dict(google_sec["service_account"])  # MappingProxyType 대응
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-
-        # 방법 1: Streamlit secrets에서 직접 읽기 (추가 위치 확인)
-        try:
-            if hasattr(st, "secrets"):
-                direct_creds = st.secrets.get("GOOGLE_CREDENTIALS_JSON") or st.secrets.get("google_credentials_json")
-                if direct_creds:
-                    try:
-                        creds_info = json.loads(direct_creds) if isinstance(direct_creds, str) else dict(direct_creds)
-                        creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                        return gspread.authorize(creds)
-                    except json.JSONDecodeError:
-                        st.error("Streamlit secrets의 GOOGLE_CREDENTIALS_JSON이 올바른 JSON 형식이 아닙니다.")
-                        return None
-        except Exception:
-            pass
-        
-        # 방법 2: 서비스 계정 JSON 파일 읽기
-        service_account_file = "service_account.json"
-        if os.path.exists(service_account_file):
-            creds = Credentials.from_service_account_file(service_account_file, scopes=SCOPE)
-            return gspread.authorize(creds)
-        
-        # 인증 정보가 없는 경우
-        st.warning("Google Sheets 연동을 위해 서비스 계정 인증 정보가 필요합니다.")
-        return None
-        
-    except Exception as e:
-        st.error(f"Google Sheets 연동 오류: {e}")
-        return None
-
-def _digits_only(value: str | int | None) -> str:
-    """숫자만 추출"""
-    s = str(value or "")
-    return "".join(ch for ch in s if ch.isdigit())
-
-def _phones_equal(a: str | None, b: str | None) -> bool:
-    """휴대폰번호 비교 (숫자만 추출하여 비교)"""
-    da = _digits_only(a).lstrip('0')
-    db = _digits_only(b).lstrip('0')
-    return bool(da and db and da == db)
+USERS_SPREADSHEET_ID = sheet_sources.spreadsheet_id("users")
 
 def fetch_users_records():
-    """사용자 정보 시트의 모든 레코드를 반환합니다."""
+    """사용자 정보 시트의 모든 레코드를 반환합니다. (프로세스 공용 사용자 디렉터리 사용)"""
     try:
-        client = get_google_sheets_client()
-        if not client:
-            return []
-        spreadsheet = client.open_by_key(USERS_SPREADSHEET_ID)
-        worksheet = spreadsheet.sheet1
-        records = worksheet.get_all_records()
-        return records
+        return user_directory.records()
     except Exception as e:
         st.error(f"사용자 데이터 로드 오류: {e}")
         return []
 
 def find_user_by_phone_and_password(phone: str, password: str):
     """휴대폰번호와 비밀번호로 사용자를 찾습니다."""
-    records = fetch_users_records()
-    for row in records:
-        row_phone = str(row.get('휴대폰번호', '')).strip()
-        row_pw = str(row.get('비밀번호', '')).strip()
-        if _phones_equal(row_phone, phone) and row_pw == str(password).strip():
-            # 통일된 키로 변환
-            return {
-                'phone': str(row.get('휴대폰번호', '')).strip(),
-                'password': str(row.get('비밀번호', '')).strip(),
-                'name': str(row.get('이름(본명)', '')).strip(),
-                'email': str(row.get('회사메일', '')).strip(),
-                'role': str(row.get('권한', 'user')).strip() or 'user',
-                'timestamp': str(row.get('타임스탬프', '')).strip(),
-                'display': str(row.get('표시여부', '')).strip(),
-            }
-    return None
+    try:
+        record = user_directory.find_by_phone(phone, password)
+    except Exception as e:
+        st.error(f"사용자 데이터 로드 오류: {e}")
+        return None
+    # 통일된 키로 변환
+    return user_directory.to_user_info(record) if record else None
 
 def login_user(phone, password):
     """사용자 로그인 검증: 구글시트에서 사용자 확인"""
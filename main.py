@@ -1,13 +1,24 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta, timezone
-import gspread
-from google.oauth2.service_account import Credentials
-import time
-import random
 import json
 import os
 import streamlit.components.v1 as components
+import drive_changes
+import sheet_index
+import sheet_sources
+import sheets_batch
+import sheets_breaker
+import sheets_cache
+import sheets_client
+import sheets_fanout
+import sheets_mirror
+import sheets_retry
+import snippet_reconcile
+import user_directory
+import write_queue
+from sheets_client import get_google_sheets_client
+from sheets_retry import call as _sheets_call_with_retry, call_write as _sheets_write_with_retry, is_retryable_error as _is_retryable_error
 
 # 페이지 설정
 st.set_page_config(
@@ -80,189 +91,46 @@ st.markdown(
 
 # 사용자 데이터는 더 이상 코드에 하드코딩하지 않습니다. 구글시트에서 조회합니다.
 
-# Google Sheets 연동을 위한 설정
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive"
-]
-
 # 스프레드시트 ID (secrets 우선)
-SPREADSHEET_ID = (
-    (st.secrets.get("google", {}).get("spreadsheet_id") if hasattr(st, "secrets") else None)
-    or "1THmwStR6p0_SUyLEV6-edT0kigANvTCPOkAzN7NaEQE"
-)
+SPREADSHEET_ID = sheet_sources.spreadsheet_id("snippets")
 
 # 사용자 정보 시트 ID (secrets 우선) - 기본값은 제공된 시트 사용
-USERS_SPREADSHEET_ID = (
-    (st.secrets.get("google", {}).get("users_spreadsheet_id") if hasattr(st, "secrets") else None)
-    or "1fHSCgg6_97Z3JzOvrk3ElXQWhOWhVhl5IaITeA9pXmY"
-)
+USERS_SPREADSHEET_ID = sheet_sources.spreadsheet_id("users")
 
 # 캐시 파일 설정
 CACHE_FILE = "user_cache.json"
 
-def _is_retryable_error(error_msg: str) -> bool:
-    """재시도 가능한 오류인지 확인합니다."""
-    msg_lower = error_msg.lower()
-    return ('429' in msg_lower) or ('quota' in msg_lower) or ('rate' in msg_lower and 'limit' in msg_lower)
-
-def _sheets_call_with_retry(callable_fn, *args, **kwargs):
-    """Google Sheets API 호출을 지수 백오프로 재시도합니다."""
-    delays = [0, 1, 2, 4, 8, 16]
-    last_error = None
-    for delay in delays:
-        if delay > 0:
-            time.sleep(delay + random.uniform(0, 0.5))
-        try:
-            return callable_fn(*args, **kwargs)
-        except Exception as e:
-            last_error = e
-            error_msg = str(e)
-            if _is_retryable_error(error_msg):
-                continue
-            raise
-    if last_error:
-        raise last_error
-    raise RuntimeError("Google Sheets API 호출이 실패했습니다.")
-
-def get_google_sheets_client():
-    """Google Sheets 클라이언트를 반환합니다."""
-    try:
-        # 방법 0: Streamlit secrets에서 서비스 계정 정보 읽기 (최우선)
-        try:
-            google_sec = st.secrets.get("google") if hasattr(st, "secrets") else None
-        except Exception:
-            google_sec = None
-
-        if google_sec:
-            # 0-a) 전체 JSON 문자열 저장한 경우: google.credentials_json
-            if "credentials_json" in google_sec and google_sec["credentials_json"]:
-                raw = google_sec["credentials_json"]
-                creds_info = json.loads(raw) if isinstance(raw, str) else dict(raw)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-
-            # 0-b) TOML로 키를 중첩(dict) 저장한 경우: google.service_account = { ... }
-            if "service_account" in google_sec and google_sec["service_account"]:
-                creds_info = dict(google_sec["service_account"])  # MappingProxyType 대응
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-
-        # 방법 1: Streamlit secrets에서 직접 읽기 (추가 위치 확인)
-        try:
-            if hasattr(st, "secrets"):
-                direct_creds = st.secrets.get("GOOGLE_CREDENTIALS_JSON") or st.secrets.get("google_credentials_json")
-                if direct_creds:
-                    try:
-                        creds_info = json.loads(direct_creds) if isinstance(direct_creds, str) else dict(direct_creds)
-                        creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                        return gspread.authorize(creds)
-                    except json.JSONDecodeError:
-                        st.error("Streamlit secrets의 GOOGLE_CREDENTIALS_JSON이 올바른 JSON 형식이 아닙니다.")
-                        return None
-        except Exception:
-            pass
-        
-        # 방법 2: 서비스 계정 JSON 파일 읽기
-        service_account_file = "service_account.json"
-        if os.path.exists(service_account_file):
-            creds = Credentials.from_service_account_file(service_account_file, scopes=SCOPE)
-            return gspread.authorize(creds)
-        
-        # 방법 3: 세션 상태에서 서비스 계정 정보 읽기
-        if 'google_credentials' in st.session_state and st.session_state.google_credentials:
-            try:
-                creds_info = json.loads(st.session_state.google_credentials)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-            except json.JSONDecodeError:
-                st.error("저장된 서비스 계정 정보가 올바른 JSON 형식이 아닙니다.")
-                return None
-        
-        # 인증 정보가 없는 경우
-        st.warning("Google Sheets 연동을 위해 서비스 계정 인증 정보가 필요합니다.")
-        return None
-        
-    except Exception as e:
-        st.error(f"Google Sheets 연동 오류: {e}")
-        return None
-
 def save_to_google_sheets(data):
-    """데이터를 Google Sheets에 저장합니다."""
+    """데이터를 쓰기 대기열에 넣습니다.
+
+    로컬 선기록 로그(fsync)에 먼저 기록하고 바로 반환하며, 시트 반영은 백그라운드에서 append_rows로 일괄 처리됩니다.
+    """
     try:
-        client = get_google_sheets_client()
-        if not client:
-            return False
-        
-        # 재시도 로직 적용
-        def _append_row():
-            spreadsheet = client.open_by_key(SPREADSHEET_ID)
-            worksheet = spreadsheet.sheet1
-            worksheet.append_row(data)
-            return True
-        
-        return _sheets_call_with_retry(_append_row)
+        write_queue.enqueue("snippets", data)
+        return True
     except Exception as e:
-        error_msg = str(e).lower()
-        if _is_retryable_error(error_msg):
-            st.warning("Google Sheets 저장 중 호출 제한이 발생했습니다. 잠시 후 다시 시도해주세요.")
-        else:
-            st.error(f"Google Sheets 저장 오류: {e}")
+        st.error(f"Snippet 저장 오류: {e}")
         return False
 
 def save_data_with_fallback(data):
-    """데이터를 저장합니다. Google Sheets 실패 시 로컬 CSV로 저장."""
-    # Google Sheets에 저장 시도
-    if st.session_state.google_sheets_connected:
-        if save_to_google_sheets(data):
-            # 저장 성공 시 아카이브 캐시 갱신
-            refresh_archive_cache()
-            return True
-    
-    # Google Sheets 실패 시 로컬 CSV로 저장
-    st.warning("Google Sheets 저장에 실패했습니다. 로컬 CSV 파일로 저장합니다.")
-    result = save_to_local_csv(data)
+    """데이터를 저장합니다.
+
+    선기록 로그에 먼저 남기므로 Google Sheets 연결/호출 제한과 관계없이 행이 유실되지 않습니다.
+    """
+    result = save_to_google_sheets(data)
     if result:
-        # 로컬 CSV 저장 성공 시에도 아카이브 캐시 갱신
+        # 저장 성공 시 아카이브 캐시 갱신 (반영 대기 중인 행 포함)
         refresh_archive_cache()
     return result
 
 def fetch_users_records():
-    """사용자 정보 시트의 모든 레코드를 반환합니다. (캐시 사용)"""
+    """사용자 정보 시트의 모든 레코드를 반환합니다. (프로세스 공용 사용자 디렉터리 사용)"""
     try:
-        return _users_records_cached(USERS_SPREADSHEET_ID)
+        return user_directory.records(retry=_sheets_call_with_retry)
     except Exception as e:
         st.error(f"사용자 데이터 로드 오류: {e}")
         return []
 
-# 앱 레벨 캐시: 사용자 시트 전체 레코드 (다중 세션 공유)
-@st.cache_data(ttl=300, show_spinner=False)
-def _users_records_cached(spreadsheet_id: str):
-    client = get_google_sheets_client()
-    if not client:
-        return []
-    
-    def _fetch_records():
-        spreadsheet = client.open_by_key(spreadsheet_id)
-        worksheet = spreadsheet.sheet1
-        records = worksheet.get_all_records()
-        return records or []
-    
-    try:
-        return _sheets_call_with_retry(_fetch_records)
-    except Exception as e:
-        # 재시도 실패 시 빈 리스트 반환 (에러 메시지는 상위에서 처리)
-        return []
-
-def _digits_only(value: str | int | None) -> str:
-    s = str(value or "")
-    return "".join(ch for ch in s if ch.isdigit())
-
-def _phones_equal(a: str | None, b: str | None) -> bool:
-    da = _digits_only(a).lstrip('0')
-    db = _digits_only(b).lstrip('0')
-    return bool(da and db and da == db)
-
 def _choose_display_phone(login_phone: str | None, sheet_phone: str | None) -> str:
     # 표시 우선순위: 로그인 입력값(0 보존) > 시트값 > 기타
     if login_phone:
@@ -277,79 +145,31 @@ def _choose_display_phone(login_phone: str | None, sheet_phone: str | None) -> s
 
 def find_user_by_phone_and_password(phone: str, password: str):
     """휴대폰번호와 비밀번호로 사용자를 찾습니다."""
-    records = fetch_users_records()
-    for row in records:
-        row_phone = str(row.get('휴대폰번호', '')).strip()
-        row_pw = str(row.get('비밀번호', '')).strip()
-        if _phones_equal(row_phone, phone) and row_pw == str(password).strip():
-            # 통일된 키로 변환
-            return {
-                'phone': str(row.get('휴대폰번호', '')).strip(),
-                'password': str(row.get('비밀번호', '')).strip(),
-                'name': str(row.get('이름(본명)', '')).strip(),
-                'email': str(row.get('회사메일', '')).strip(),
-                'role': str(row.get('권한', 'user')).strip() or 'user',
-                'timestamp': str(row.get('타임스탬프', '')).strip(),
-                'display': str(row.get('표시여부', '')).strip(),
-            }
-    return None
+    try:
+        record = user_directory.find_by_phone(phone, password, retry=_sheets_call_with_retry)
+    except Exception as e:
+        st.error(f"사용자 데이터 로드 오류: {e}")
+        return None
+    # 통일된 키로 변환
+    return user_directory.to_user_info(record) if record else None
 
 def get_user_info_by_phone(phone: str):
-    records = fetch_users_records()
-    for row in records:
-        if _phones_equal(str(row.get('휴대폰번호', '')).strip(), phone):
-            return {
-                'phone': str(row.get('휴대폰번호', '')).strip(),
-                'password': str(row.get('비밀번호', '')).strip(),
-                'name': str(row.get('이름(본명)', '')).strip(),
-                'email': str(row.get('회사메일', '')).strip(),
-                'role': str(row.get('권한', 'user')).strip() or 'user',
-                'timestamp': str(row.get('타임스탬프', '')).strip(),
-                'display': str(row.get('표시여부', '')).strip(),
-            }
-    return None
+    try:
+        record = user_directory.find_by_phone(phone, retry=_sheets_call_with_retry)
+    except Exception as e:
+        st.error(f"사용자 데이터 로드 오류: {e}")
+        return None
+    return user_directory.to_user_info(record) if record else None
 
 def update_user_in_sheet(phone: str, new_email: str | None = None, new_password: str | None = None) -> bool:
-    """구글시트에서 해당 휴대폰번호 행을 찾아 이메일/비밀번호를 업데이트합니다."""
+    """구글시트에서 해당 휴대폰번호 행을 찾아 이메일/비밀번호를 한 번에 업데이트합니다."""
+    values = {}
+    if new_email is not None:
+        values['email'] = new_email
+    if new_password is not None:
+        values['password'] = new_password
     try:
-        client = get_google_sheets_client()
-        if not client:
-            return False
-        
-        def _update_user():
-            spreadsheet = client.open_by_key(USERS_SPREADSHEET_ID)
-            worksheet = spreadsheet.sheet1
-            # 헤더와 행 전체를 가져와 인덱스 탐색
-            all_values = worksheet.get_all_values()
-            if not all_values:
-                return False
-            header = all_values[0]
-            phone_col = header.index('휴대폰번호') + 1 if '휴대폰번호' in header else None
-            email_col = header.index('회사메일') + 1 if '회사메일' in header else None
-            pw_col = header.index('비밀번호') + 1 if '비밀번호' in header else None
-            if not phone_col:
-                return False
-            target_row = None
-            for i in range(2, len(all_values) + 1):
-                if worksheet.cell(i, phone_col).value == str(phone):
-                    target_row = i
-                    break
-            if not target_row:
-                return False
-            updates = []
-            if new_email is not None and email_col:
-                updates.append({'range': f"R{target_row}C{email_col}", 'values': [[new_email]]})
-            if new_password is not None and pw_col:
-                updates.append({'range': f"R{target_row}C{pw_col}", 'values': [[new_password]]})
-            if not updates:
-                return True
-            worksheet.batch_update([{
-                'range': u['range'],
-                'values': u['values']
-            } for u in updates])
-            return True
-        
-        return _sheets_call_with_retry(_update_user)
+        return user_directory.update_user(phone, values, retry=_sheets_write_with_retry)
     except Exception as e:
         error_msg = str(e).lower()
         if _is_retryable_error(error_msg):
@@ -365,19 +185,8 @@ def get_user_phone_from_google_sheet(email: str | None = None, name: str | None
     - 휴대폰번호, 비밀번호, 이름(본명), 회사메일, 권한, 타임스탬프, 표시여부
     """
     try:
-        # 캐시된 사용자 목록 사용
-        records = _users_records_cached(USERS_SPREADSHEET_ID)
-        # 이메일로 우선 매칭
-        if email:
-            for row in records:
-                if str(row.get('회사메일', '')).strip() == str(email).strip():
-                    return str(row.get('휴대폰번호', '')).strip() or None
-        # 이름으로 보조 매칭
-        if name:
-            for row in records:
-                if str(row.get('이름(본명)', '')).strip() == str(name).strip():
-                    return str(row.get('휴대폰번호', '')).strip() or None
-        return None
+        # 사용자 디렉터리의 이메일/이름 인덱스 사용
+        return user_directory.find_phone(email=email, name=name, retry=_sheets_call_with_retry)
     except Exception as e:
         st.warning(f"사용자 시트 조회 실패: {e}")
         return None
@@ -627,13 +436,15 @@ def ensure_google_sheets_connection():
         return
     
     def _test_connection():
-        spreadsheet = client.open_by_key(SPREADSHEET_ID)
-        _ = spreadsheet.sheet1
+        _ = sheets_client.get_worksheet(SPREADSHEET_ID, client=client)
         return True
     
     try:
         _sheets_call_with_retry(_test_connection)
         st.session_state.google_sheets_connected = True
+    except (sheets_breaker.CircuitOpenError, sheets_retry.StillRunning):
+        # 회로가 열렸거나 응답이 늦을 뿐 인증/연결은 정상이므로 캐시/미러 데이터로 계속 진행 (재점검 반복 방지)
+        st.session_state.google_sheets_connected = True
     except Exception:
         st.session_state.google_sheets_connected = False
 
@@ -807,9 +618,9 @@ def _filter_user_archive(df, user_name):
     if df is None or df.empty:
         return []
     if '이름' in df.columns:
-        user_archive = df[df['이름'] == user_name]
-        return user_archive.to_dict('records') if not user_archive.empty else []
-    return df.to_dict('records')
+        user_archive = sheet_index.rows_for(df, '이름', user_name)
+        return sheets_batch.to_records(user_archive)
+    return sheets_batch.to_records(df)
 
 def refresh_archive_cache():
     """Snippet 아카이브 캐시를 갱신합니다."""
@@ -831,7 +642,7 @@ def refresh_archive_cache():
             # Google Sheets에서 가져오기 시도
             if st.session_state.get('google_sheets_connected', False):
                 try:
-                    archive_df = Archive.get_snippets_from_google_sheets(get_google_sheets_client, SPREADSHEET_ID)
+                    archive_df = Archive.get_recent_snippets(get_google_sheets_client, SPREADSHEET_ID)
                 except Exception:
                     archive_df = None
             
@@ -867,12 +678,11 @@ def refresh_cdp_cache():
         # CDP 데이터 갱신
         try:
             import cdp
-            cdp_df = cdp._fetch_cdp_dataframe()
+            cdp_df = cdp._fetch_cdp_dataframe(columns=cdp.PLAN_COLUMNS)
             if cdp_df is not None and not cdp_df.empty:
-                normalized = {c.strip(): c for c in cdp_df.columns}
-                name_col = normalized.get("이름") or normalized.get("name") or list(cdp_df.columns)[0]
-                user_cdp = cdp_df[cdp_df[name_col] == user_name]
-                st.session_state.prefetch_cache['cdp'] = user_cdp.to_dict('records') if not user_cdp.empty else []
+                name_col = sheet_index.name_column(cdp_df)
+                user_cdp = sheet_index.rows_for(cdp_df, name_col, user_name)
+                st.session_state.prefetch_cache['cdp'] = sheets_batch.to_records(user_cdp)
             else:
                 st.session_state.prefetch_cache['cdp'] = []
         except Exception:
@@ -902,10 +712,10 @@ def refresh_idp_cache():
             idp_df = idp_usage.fetch_idp_dataframe()
             if idp_df is not None and not idp_df.empty:
                 if '이름' in idp_df.columns:
-                    user_idp = idp_df[idp_df['이름'] == user_name]
-                    st.session_state.prefetch_cache['idp'] = user_idp.to_dict('records') if not user_idp.empty else []
+                    user_idp = sheet_index.rows_for(idp_df, '이름', user_name)
+                    st.session_state.prefetch_cache['idp'] = sheets_batch.to_records(user_idp) if not user_idp.empty else []
                 else:
-                    st.session_state.prefetch_cache['idp'] = idp_df.to_dict('records')
+                    st.session_state.prefetch_cache['idp'] = sheets_batch.to_records(idp_df)
             else:
                 st.session_state.prefetch_cache['idp'] = []
         except Exception:
@@ -917,6 +727,15 @@ def refresh_idp_cache():
         # IDP 캐시 갱신 실패해도 계속 진행
         pass
 
+# 로그인 Pre-fetching 소스별 제한 시간(초): 아카이브는 행 수가 많아 여유를 둡니다
+PREFETCH_TIMEOUTS = {
+    'archive': 30,
+    'cdp': 15,
+    'idp': 15,
+    'mission_kpi': 15,
+    'ground_rule': 15,
+}
+
 def prefetch_user_data():
     """로그인 성공 시 사용자 데이터를 Pre-fetching하여 캐시에 저장합니다."""
     try:
@@ -927,17 +746,41 @@ def prefetch_user_data():
         
         prefetch_data = {}
         
+        import Archive
+        import cdp
+        import idp_usage
+        import organization
+        
+        # 스프레드시트별 batchGet 한 번씩으로 모든 소스를 읽고, 실패한 소스만 기존 로더로 대체
+        sources = {
+            # CDP는 프롬프트에 쓰는 계획 열만 읽습니다
+            'cdp': lambda: cdp._fetch_cdp_dataframe(columns=cdp.PLAN_COLUMNS),
+            'idp': (idp_usage.IDP_SPREADSHEET_ID, None),
+            'mission_kpi': (organization.MISSION_KPI_SHEET_ID, None),
+            'ground_rule': (organization.GROUND_RULE_SHEET_ID, None),
+        }
+        if st.session_state.get('google_sheets_connected', False):
+            # 스니펫 시트는 최근 행만(이미 동기화했으면 새 행만) 다른 소스와 동시에 읽습니다
+            sources['archive'] = lambda: Archive.get_recent_snippets(get_google_sheets_client, SPREADSHEET_ID)
+        try:
+            frames = sheets_batch.fetch_frames(sources, retry=_sheets_call_with_retry)
+        except Exception:
+            frames = {}
+        
+        # batchGet이 실패한 소스만 기존 로더로 동시에 다시 읽기 (소스별 제한 시간 적용)
+        fallback_loaders = {
+            'cdp': lambda: cdp._fetch_cdp_dataframe(columns=cdp.PLAN_COLUMNS),
+            'idp': idp_usage.fetch_idp_dataframe,
+            'mission_kpi': lambda: organization.get_sheet_data(organization.MISSION_KPI_SHEET_ID),
+            'ground_rule': lambda: organization.get_sheet_data(organization.GROUND_RULE_SHEET_ID),
+        }
+        missing = {key: fn for key, fn in fallback_loaders.items() if frames.get(key) is None}
+        if missing:
+            frames.update(sheets_fanout.run_all(missing, timeouts=PREFETCH_TIMEOUTS))
+        
         # 1. Snippet 아카이브 데이터 Pre-fetching
         try:
-            import Archive
-            archive_df = None
-            
-            # Google Sheets에서 가져오기 시도
-            if st.session_state.get('google_sheets_connected', False):
-                try:
-                    archive_df = Archive.get_snippets_from_google_sheets(get_google_sheets_client, SPREADSHEET_ID)
-                except Exception:
-                    archive_df = None
+            archive_df = frames.get('archive')
             
             # 로컬 CSV에서 가져오기 (Google Sheets 실패 시 또는 미연결 시)
             if archive_df is None or (hasattr(archive_df, 'empty') and archive_df.empty):
@@ -952,14 +795,12 @@ def prefetch_user_data():
         
         # 2. CDP 데이터 Pre-fetching
         try:
-            import cdp
-            cdp_df = cdp._fetch_cdp_dataframe()
+            cdp_df = frames.get('cdp')
             if cdp_df is not None and not cdp_df.empty:
                 # 사용자 데이터만 필터링
-                normalized = {c.strip(): c for c in cdp_df.columns}
-                name_col = normalized.get("이름") or normalized.get("name") or list(cdp_df.columns)[0]
-                user_cdp = cdp_df[cdp_df[name_col] == user_name]
-                prefetch_data['cdp'] = user_cdp.to_dict('records') if not user_cdp.empty else []
+                name_col = sheet_index.name_column(cdp_df)
+                user_cdp = sheet_index.rows_for(cdp_df, name_col, user_name)
+                prefetch_data['cdp'] = sheets_batch.to_records(user_cdp)
             else:
                 prefetch_data['cdp'] = []
         except Exception as e:
@@ -967,15 +808,14 @@ def prefetch_user_data():
         
         # 3. IDP 데이터 Pre-fetching
         try:
-            import idp_usage
-            idp_df = idp_usage.fetch_idp_dataframe()
+            idp_df = frames.get('idp')
             if idp_df is not None and not idp_df.empty:
                 # 사용자 데이터만 필터링
                 if '이름' in idp_df.columns:
-                    user_idp = idp_df[idp_df['이름'] == user_name]
-                    prefetch_data['idp'] = user_idp.to_dict('records') if not user_idp.empty else []
+                    user_idp = sheet_index.rows_for(idp_df, '이름', user_name)
+                    prefetch_data['idp'] = sheets_batch.to_records(user_idp) if not user_idp.empty else []
                 else:
-                    prefetch_data['idp'] = idp_df.to_dict('records')
+                    prefetch_data['idp'] = sheets_batch.to_records(idp_df)
             else:
                 prefetch_data['idp'] = []
         except Exception as e:
@@ -983,10 +823,9 @@ def prefetch_user_data():
         
         # 4. Mission & KPI 데이터 Pre-fetching
         try:
-            import organization
-            mission_kpi_df = organization.get_sheet_data(organization.MISSION_KPI_SHEET_ID)
+            mission_kpi_df = frames.get('mission_kpi')
             if mission_kpi_df is not None and not mission_kpi_df.empty:
-                prefetch_data['mission_kpi'] = mission_kpi_df.to_dict('records')
+                prefetch_data['mission_kpi'] = sheets_batch.to_records(mission_kpi_df)
             else:
                 prefetch_data['mission_kpi'] = []
         except Exception as e:
@@ -994,10 +833,9 @@ def prefetch_user_data():
         
         # 5. Team Ground Rule 데이터 Pre-fetching
         try:
-            import organization
-            ground_rule_df = organization.get_sheet_data(organization.GROUND_RULE_SHEET_ID)
+            ground_rule_df = frames.get('ground_rule')
             if ground_rule_df is not None and not ground_rule_df.empty:
-                prefetch_data['ground_rule'] = ground_rule_df.to_dict('records')
+                prefetch_data['ground_rule'] = sheets_batch.to_records(ground_rule_df)
             else:
                 prefetch_data['ground_rule'] = []
         except Exception as e:
@@ -1855,18 +1693,16 @@ def render_profile_edit():
             # 검증 통과 시 변경 처리
             updated = False
             with st.spinner("변경 중..."):
-                # 이메일 변경
-                if email_changed and current_new_email:
-                    if update_user_in_sheet(phone, new_email=current_new_email):
-                        st.session_state.user_info['email'] = current_new_email
-                        updated = True
-
-                # 비밀번호 변경
-                if password_entered and current_new_password:
-                    if update_user_in_sheet(phone, new_password=current_new_password):
+                # 이메일/비밀번호 변경을 한 번의 요청으로 반영
+                new_email = current_new_email if email_changed and current_new_email else None
+                new_password = current_new_password if password_entered and current_new_password else None
+                if (new_email or new_password) and update_user_in_sheet(phone, new_email=new_email, new_password=new_password):
+                    if new_email:
+                        st.session_state.user_info['email'] = new_email
+                    if new_password:
                         # 세션의 비밀번호도 업데이트하여 이후 검증에 사용
-                        st.session_state.user_info['password'] = current_new_password
-                        updated = True
+                        st.session_state.user_info['password'] = new_password
+                    updated = True
 
             st.session_state.is_saving_profile = False
             
@@ -1924,6 +1760,63 @@ def render_google_settings():
     else:
         st.warning("⚠️ Google Sheets가 연결되지 않았습니다.")
     
+    # 재시도 지표 (프로세스 시작 이후 누적)
+    retry_metrics = sheets_retry.metrics()
+    if retry_metrics:
+        with st.expander("📈 Google Sheets 호출 재시도 현황"):
+            st.dataframe(
+                pd.DataFrame.from_dict(retry_metrics, orient="index").rename(columns={
+                    "calls": "호출",
+                    "retries": "재시도",
+                    "wait_seconds": "대기(초)",
+                    "failures": "실패",
+                    "deadline_exceeded": "기한 초과",
+                    "pending": "백그라운드 전환",
+                }),
+                use_container_width=True,
+            )
+    
+    # 시트 쓰기 대기열 (반영 대기 / 반영할 수 없어 보류한 항목)
+    dead_letters = write_queue.dead_letters()
+    pending_writes = write_queue.pending_count()
+    if dead_letters or pending_writes:
+        with st.expander(f"📮 시트 쓰기 대기열 (대기 {pending_writes}건, 보류 {len(dead_letters)}건)", expanded=bool(dead_letters)):
+            if dead_letters:
+                st.error("아래 항목은 시트 범위/권한/삭제 등 재시도로 해결되지 않는 오류로 보류되었습니다. 시트를 확인한 뒤 다시 시도하세요.")
+                st.dataframe(
+                    pd.DataFrame([
+                        {
+                            "소스": item["source"],
+                            "워크시트": item["worksheet"],
+                            "보류 시각": datetime.fromtimestamp(item["failed_at"], timezone(timedelta(hours=9))).strftime('%Y-%m-%d %H:%M:%S') if item["failed_at"] else "-",
+                            "오류": item["error"],
+                            "행": ", ".join(str(value) for value in item["row"][:3]),
+                        }
+                        for item in dead_letters
+                    ]),
+                    use_container_width=True,
+                )
+                retry_col, discard_col = st.columns(2)
+                with retry_col:
+                    if st.button("🔁 보류 항목 다시 시도", key="write_queue_retry_dead"):
+                        write_queue.retry_dead()
+                        st.rerun()
+                with discard_col:
+                    if st.button("🗑️ 보류 항목 버리기", key="write_queue_discard_dead"):
+                        write_queue.discard_dead()
+                        st.rerun()
+    
+    # 변경 피드 상태
+    feed_status = drive_changes.status()
+    if feed_status["feed"] or feed_status["errors"]:
+        with st.expander("🔔 Drive 변경 피드 현황"):
+            last_poll = feed_status["last_poll"]
+            st.write(f"피드: {feed_status['feed'] or '-'}")
+            st.write(f"마지막 확인: {datetime.fromtimestamp(last_poll, timezone(timedelta(hours=9))).strftime('%Y-%m-%d %H:%M:%S') if last_poll else '-'}")
+            st.write(f"확인 {feed_status['polls']}회, 갱신한 소스 {feed_status['changed']}건, 오류 {feed_status['errors']}회")
+            if feed_status["last_error"]:
+                st.caption(f"마지막 오류: {feed_status['last_error']}")
+    
     st.markdown("### 📋 설정 방법")
     
     # 방법 1: 서비스 계정 JSON 파일 업로드
@@ -1994,8 +1887,7 @@ def render_google_settings():
         client = get_google_sheets_client()
         if client:
             try:
-                spreadsheet = client.open_by_key(SPREADSHEET_ID)
-                worksheet = spreadsheet.sheet1
+                worksheet = sheets_client.get_worksheet(SPREADSHEET_ID, client=client)
                 # 간단한 테스트
                 test_data = worksheet.get_all_values()
                 st.success("✅ Google Sheets 연결이 성공적으로 확인되었습니다!")
@@ -2016,36 +1908,6 @@ def render_google_settings():
         st.success("로컬 CSV 저장 모드로 전환되었습니다!")
         st.rerun()
 
-def save_to_local_csv(data):
-    """데이터를 로컬 CSV 파일에 저장합니다."""
-    try:
-        import csv
-        from datetime import datetime
-        
-        # CSV 파일 경로
-        csv_file = "daily_snippets.csv"
-        
-        # 헤더 정의
-        headers = [
-            "타임스탬프", "이름", "몸상태", "마음상태", "상태이유", "개선방안",
-            "전일업무", "전일만족도", "좋았던점", "아쉬웠던점", "배웠던점",
-            "향후시도", "바라는점", "동료칭찬", "오늘할일"
-        ]
-        
-        # 파일이 존재하지 않으면 헤더 작성
-        file_exists = os.path.exists(csv_file)
-        
-        with open(csv_file, 'a', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            if not file_exists:
-                writer.writerow(headers)
-            writer.writerow(data)
-        
-        return True
-    except Exception as e:
-        st.error(f"로컬 CSV 저장 오류: {e}")
-        return False
-
 def main():
     """메인 함수"""
     # 세션 상태 초기화
@@ -2064,6 +1926,22 @@ def main():
     if st.session_state.logged_in and not st.session_state.get('google_sheets_connected', False):
         ensure_google_sheets_connection()
     
+    # 로컬 SQLite 미러 백그라운드 동기화 (프로세스당 한 번만 시작)
+    if st.session_state.get('google_sheets_connected', False):
+        sheets_mirror.start_background_sync()
+        # Drive 변경 피드로 바뀐 시트만 갱신 (동작 중에는 시트별 주기적 리비전 확인/전체 동기화를 생략)
+        drive_changes.start()
+    
+    # 지난 실행에서 시트에 반영되지 못한 저장 건을 복구해 백그라운드로 반영
+    write_queue.start()
+    
+    # 예전 로컬 CSV 저장분 중 시트에 없는 행을 반영 (할당량 회복 시마다 다시 확인)
+    if st.session_state.get('google_sheets_connected', False):
+        snippet_reconcile.start()
+    
+    # 디스크 스냅샷으로 공유 시트 캐시를 채움 (재시작 직후 첫 요청도 캐시에서 응답)
+    sheets_cache.hydrate()
+    
     # 백그라운드 prefetch 처리 (로그인 후 한 번만 실행, 페이지 렌더링 후)
     if st.session_state.get('prefetch_trigger', False) and st.session_state.logged_in:
         st.session_state.prefetch_trigger = False
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
-import json
-import os
+import sheet_sources
+import sheets_cache
+import sheets_client
+from sheets_client import get_google_sheets_client
+from sheets_retry import call as _sheets_call_with_retry, is_retryable_error as _is_retryable_error
 
 # 메인 컨텐츠 최대 너비 제한 및 아코디언 스타일
 st.markdown(
@@ -123,103 +124,9 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Google Sheets 연동을 위한 설정
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive"
-]
-
 # 스프레드시트 ID들
-MISSION_KPI_SHEET_ID = "16RmpF16SylJQe-ThbzA6C8KXzxtAWFDDSbb5mLWqUGI"
-GROUND_RULE_SHEET_ID = "1Bnur8Syu92y9aC-9gsEhA7Y97yFiqnnvR-OiODo8Vow"
-
-def get_google_sheets_client():
-    """Google Sheets 클라이언트를 반환합니다."""
-    try:
-        # 방법 0: Streamlit secrets에서 서비스 계정 정보 읽기 (최우선)
-        try:
-            google_sec = st.secrets.get("google") if hasattr(st, "secrets") else None
-        except Exception:
-            google_sec = None
-
-        if google_sec:
-            # 0-a) 전체 JSON 문자열 저장한 경우: google.credentials_json
-            if "credentials_json" in google_sec and google_sec["credentials_json"]:
-                raw = google_sec["credentials_json"]
-                creds_info = json.loads(raw) if isinstance(raw, str) else dict(raw)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-
-            # 0-b) TOML로 키를 중첩(dict) 저장한 경우: google.service_account = { ... }
-            if "service_account" in google_sec and google_sec["service_account"]:
-                creds_info = dict(google_sec["service_account"])  # MappingProxyType 대응
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-
-        # 방법 1: Streamlit secrets에서 직접 읽기 (추가 위치 확인)
-        try:
-            if hasattr(st, "secrets"):
-                direct_creds = st.secrets.get("GOOGLE_CREDENTIALS_JSON") or st.secrets.get("google_credentials_json")
-                if direct_creds:
-                    try:
-                        creds_info = json.loads(direct_creds) if isinstance(direct_creds, str) else dict(direct_creds)
-                        creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                        return gspread.authorize(creds)
-                    except json.JSONDecodeError:
-                        st.error("Streamlit secrets의 GOOGLE_CREDENTIALS_JSON이 올바른 JSON 형식이 아닙니다.")
-                        return None
-        except Exception:
-            pass
-        
-        # 방법 2: 서비스 계정 JSON 파일 읽기
-        service_account_file = "service_account.json"
-        if os.path.exists(service_account_file):
-            creds = Credentials.from_service_account_file(service_account_file, scopes=SCOPE)
-            return gspread.authorize(creds)
-        
-        # 방법 3: 세션 상태에서 서비스 계정 정보 읽기
-        if 'google_credentials' in st.session_state and st.session_state.google_credentials:
-            try:
-                creds_info = json.loads(st.session_state.google_credentials)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPE)
-                return gspread.authorize(creds)
-            except json.JSONDecodeError:
-                st.error("저장된 서비스 계정 정보가 올바른 JSON 형식이 아닙니다.")
-                return None
-        
-        # 인증 정보가 없는 경우
-        st.warning("Google Sheets 연동을 위해 서비스 계정 인증 정보가 필요합니다.")
-        return None
-        
-    except Exception as e:
-        st.error(f"Google Sheets 연동 오류: {e}")
-        return None
-
-def _is_retryable_error(error_msg: str) -> bool:
-    """재시도 가능한 오류인지 확인합니다."""
-    msg_lower = error_msg.lower()
-    return ('429' in msg_lower) or ('quota' in msg_lower) or ('rate' in msg_lower and 'limit' in msg_lower)
-
-def _sheets_call_with_retry(callable_fn, *args, **kwargs):
-    """Google Sheets API 호출을 지수 백오프로 재시도합니다."""
-    import time
-    import random
-    delays = [0, 1, 2, 4, 8, 16]
-    last_error = None
-    for delay in delays:
-        if delay > 0:
-            time.sleep(delay + random.uniform(0, 0.5))
-        try:
-            return callable_fn(*args, **kwargs)
-        except Exception as e:
-            last_error = e
-            error_msg = str(e)
-            if _is_retryable_error(error_msg):
-                continue
-            raise
-    if last_error:
-        raise last_error
-    raise RuntimeError("Google Sheets API 호출이 실패했습니다.")
+MISSION_KPI_SHEET_ID = sheet_sources.spreadsheet_id("mission_kpi")
+GROUND_RULE_SHEET_ID = sheet_sources.spreadsheet_id("ground_rule")
 
 def get_sheet_data(sheet_id, sheet_name=None):
     """Google Sheets에서 데이터를 가져옵니다."""
@@ -229,15 +136,14 @@ def get_sheet_data(sheet_id, sheet_name=None):
             return None
         
         def _fetch_data():
-            spreadsheet = client.open_by_key(sheet_id)
-            if sheet_name:
-                worksheet = spreadsheet.worksheet(sheet_name)
-            else:
-                worksheet = spreadsheet.sheet1
+            worksheet = sheets_client.get_worksheet(sheet_id, sheet_name or None, client=client)
             records = worksheet.get_all_records()
             return pd.DataFrame(records)
         
-        return _sheets_call_with_retry(_fetch_data)
+        # 시트 리비전이 바뀌었을 때만 다시 읽음
+        return sheets_cache.get(
+            ("organization", sheet_id, sheet_name or None), sheet_id, lambda: _sheets_call_with_retry(_fetch_data), client=client
+        )
     except Exception as e:
         error_msg = str(e).lower()
         if _is_retryable_error(error_msg):
@@ -558,6 +464,10 @@ def render_mission_kpi():
     # 레벨 1: # Mission & KPI 섹션 (접이식 없이 바로 표시)
     # 레벨 1 헤딩 표시 - 파란색 적용, '#' 기호 제거
     st.markdown('<h1 style="color: #1976D2; font-weight: 600;">📚 Mission & KPI</h1>', unsafe_allow_html=True)
+    # 갱신 중인 이전 데이터를 보여주는 경우 기준 시각 표시
+    freshness = sheets_cache.freshness_caption(df)
+    if freshness:
+        st.caption(freshness)
     
     if df is not None and not df.empty:
         # 조직명 컬럼 찾기 (조직, 조직명, 제목, 이름 등)
@@ -609,6 +519,10 @@ def render_ground_rules():
     # 레벨 1: # Team Ground Rule 섹션 (접이식 없이 바로 표시)
     # 레벨 1 헤딩 표시 - 파란색 적용, '#' 기호 제거
     st.markdown('<h1 style="color: #1976D2; font-weight: 600;">📋 Team Ground Rule</h1>', unsafe_allow_html=True)
+    # 갱신 중인 이전 데이터를 보여주는 경우 기준 시각 표시
+    freshness = sheets_cache.freshness_caption(df)
+    if freshness:
+        st.caption(freshness)
     
     if df is not None and not df.empty:
         # 구분 컬럼 찾기 (구분, 카테고리, 분류 등)
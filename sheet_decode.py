@@ -0,0 +1,120 @@
+import pandas as pd
+
+import sheets_batch
+
+# 소스별 열 형식 (스키마에 없는 열은 모든 값이 숫자일 때만 숫자 열, 아니면 읽은 값 그대로)
+# - "Int8"/"Int64": 정수 (빈 칸은 <NA>), "datetime": datetime64, "category": 반복되는 문자열
+SCHEMAS = {
+    "snippets": {
+        "타임스탬프": "datetime",
+        "이름": "category",
+        "몸상태": "Int8",
+        "마음상태": "Int8",
+        "전일만족도": "Int8",
+    },
+    "idp": {
+        "타임스탬프": "datetime",
+        "이름": "category",
+        "신청비용": "Int64",
+    },
+}
+
+INTEGER_TYPES = ("Int8", "Int64")
+
+
+def _integers(series: pd.Series, dtype: str) -> pd.Series:
+    """숫자 또는 '₩500,000' 같은 금액 문자열을 nullable 정수 열로 바꿉니다. (변환 실패는 <NA>)
+
+    문자열은 idp_usage.parse_currency와 같이 ₩와 쉼표를 뺀 뒤 첫 번째 정수만 씁니다.
+    ('₩100,000 (2회)' -> 100000, '100,000-150,000' -> 100000)
+    """
+    if not pd.api.types.is_numeric_dtype(series):
+        text = series.astype(str).str.replace("₩", "", regex=False).str.replace(",", "", regex=False)
+        series = text.str.extract(r"(-?\d+)", expand=False)
+    numbers = pd.to_numeric(series, errors="coerce").round()
+    if dtype == "Int8":
+        numbers = numbers.where(numbers.abs() <= 127)
+    return numbers.astype(dtype)
+
+
+def _text(series: pd.Series) -> pd.Series:
+    """결측을 빈 문자열로 채운 문자열 열로 바꿉니다. (get_all_records와 같이 빈 칸은 '')"""
+    return series.where(series.notna(), "").astype(str)
+
+
+def _infer(series: pd.Series) -> pd.Series:
+    """스키마에 없는 열: 모든 칸이 숫자면 숫자 열로, 빈 칸이나 문자가 섞여 있으면 원래 값 그대로 둡니다.
+
+    (빈 칸을 NaN으로 바꾸면 화면에 'nan', '20.0'처럼 보이므로 get_all_records처럼 ''를 유지합니다)
+    """
+    if pd.api.types.is_numeric_dtype(series) or series.empty:
+        return series
+    numbers = pd.to_numeric(series, errors="coerce")
+    if numbers.isna().any():
+        return series
+    return numbers
+
+
+def convert(series: pd.Series, kind: str | None) -> pd.Series:
+    """열 하나를 스키마 형식으로 한 번에 변환합니다."""
+    if kind == "datetime":
+        # 미러(SQLite TEXT)를 거친 일련번호는 '45678.5' 같은 문자열이므로 숫자로 바꿔 함께 변환합니다
+        numbers = pd.to_numeric(series, errors="coerce") if not pd.api.types.is_numeric_dtype(series) else series
+        return sheets_batch.to_datetime(numbers.astype(object).where(numbers.notna(), series))
+    if kind == "category":
+        return _text(series).str.strip().astype("category")
+    if kind in INTEGER_TYPES:
+        return _integers(series, kind)
+    return _infer(series)
+
+
+def apply_schema(frame: pd.DataFrame, schema: dict | None) -> pd.DataFrame:
+    """이미 만든 DataFrame의 열을 스키마 형식으로 바꿉니다. (제자리 변환 후 반환)"""
+    schema = schema or {}
+    for column in frame.columns:
+        frame[column] = convert(frame[column], schema.get(column))
+    return frame
+
+
+def frame_from_values(values: list, schema: dict | None = None) -> pd.DataFrame:
+    """첫 행을 헤더로 하는 값 목록(get_all_values / batchGet 결과)으로 DataFrame을 열 단위로 만듭니다.
+
+    행마다 dict를 만들지 않고 열별 리스트를 한 번에 만든 뒤 스키마 형식으로 변환합니다.
+    멱등 키 열은 버리며, 중복된 헤더는 get_all_records처럼 첫 번째 열만 씁니다.
+    """
+    if not values or not values[0]:
+        return pd.DataFrame()
+    header = [str(name) for name in values[0]]
+    width = len(header)
+    rows = [row if len(row) >= width else list(row) + [""] * (width - len(row)) for row in values[1:]]
+    columns = list(zip(*rows)) if rows else [()] * width
+    data = {}
+    for name, cells in zip(header, columns):
+        if name in data or name == sheets_batch.IDEMPOTENCY_COLUMN:
+            continue
+        data[name] = pd.Series(cells, dtype=object)
+    frame = pd.DataFrame(data) if rows else pd.DataFrame(columns=list(data))
+    return apply_schema(frame, schema)
+
+
+def conform(pending: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    """아직 반영되지 않은 행(문자열)을 시트에서 읽은 DataFrame과 같은 열 형식으로 맞춥니다. (concat 후에도 형식 유지)"""
+    for column in pending.columns:
+        if column not in like.columns:
+            continue
+        dtype = like[column].dtype
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            pending[column] = sheets_batch.to_datetime(pending[column])
+        elif isinstance(dtype, pd.CategoricalDtype):
+            pending[column] = _text(pending[column]).str.strip()
+        elif str(dtype) in INTEGER_TYPES:
+            pending[column] = _integers(pending[column], str(dtype))
+    return pending
+
+
+def restore_categories(merged: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    """concat으로 object가 된 범주 열을 다시 category로 바꿉니다."""
+    for column in like.columns:
+        if isinstance(like[column].dtype, pd.CategoricalDtype) and column in merged.columns:
+            merged[column] = merged[column].astype("category")
+    return merged
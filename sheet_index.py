@@ -0,0 +1,90 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# 보관할 인덱스 수 (시트 버전 × 이름 열 조합)
+MAX_INDEXES = 32
+
+_lock = threading.Lock()
+# (sheet_version, 이름 열) -> (인덱스를 만든 이름 열 값, {이름: 행 위치 배열})
+_indexes: OrderedDict = OrderedDict()
+
+
+def stamp(df: pd.DataFrame | None, label: str) -> pd.DataFrame | None:
+    """sheet_version이 없는 DataFrame에 내용 해시 기반 버전을 붙입니다. (로드 직후 한 번 호출)"""
+    if df is None or df.attrs.get("sheet_version"):
+        return df
+    try:
+        hashed = pd.util.hash_pandas_object(df.astype(str), index=False).values
+        digest = hashlib.sha1(hashed.tobytes())
+        digest.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+        df.attrs["sheet_version"] = f"{label}:{digest.hexdigest()}"
+    except Exception:
+        pass
+    return df
+
+
+def name_column(df: pd.DataFrame) -> str | None:
+    """이름 열을 찾습니다. ('이름' > 'name' > 첫 번째 열, 공백 무시)"""
+    if df is None or len(df.columns) == 0:
+        return None
+    normalized = {str(c).strip(): c for c in df.columns}
+    return normalized.get("이름") or normalized.get("name") or list(df.columns)[0]
+
+
+def _positions(df: pd.DataFrame, name_col) -> dict | None:
+    """버전별로 캐시된 {이름: 행 위치} 인덱스를 반환합니다. 버전이 없거나 다른 프레임의 인덱스면 None.
+
+    attrs(sheet_version)는 iloc/필터/정렬로 만든 프레임에도 그대로 복사되므로,
+    인덱스를 만든 프레임과 이름 열 값(순서 포함)이 같을 때만 캐시된 위치를 씁니다.
+    """
+    version = df.attrs.get("sheet_version")
+    if not version:
+        return None
+    key = (version, name_col)
+    names = df[name_col].reset_index(drop=True)
+    with _lock:
+        cached = _indexes.get(key)
+        if cached is not None:
+            _indexes.move_to_end(key)
+    if cached is not None:
+        return cached[1] if cached[0].equals(names) else None
+    # 한 번의 group-by로 모든 이름의 행 위치를 계산
+    index = df.groupby(name_col, sort=False).indices
+    with _lock:
+        _indexes[key] = (names, index)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def rows_for(df: pd.DataFrame, name_col, name) -> pd.DataFrame:
+    """df[df[name_col] == name]과 같은 결과를 인덱스로 조회합니다.
+
+    sheet_version이 없는 DataFrame(로컬 CSV 등)이나 부분/정렬된 DataFrame은 기존처럼 전체를 비교합니다.
+    """
+    if df is None or name_col is None or name_col not in df.columns:
+        return df.iloc[0:0] if df is not None else df
+    index = _positions(df, name_col)
+    if index is None:
+        return df[df[name_col] == name]
+    positions = index.get(name)
+    if positions is None:
+        return df.iloc[0:0]
+    return df.iloc[positions]
+
+
+def sheet_row(df: pd.DataFrame, label) -> int | None:
+    """df의 행(인덱스 라벨)이 원본 시트의 몇 번째 행인지 반환합니다. (헤더가 1행)
+
+    로더가 df.attrs["sheet_rows"]에 행 번호를 기록해 둔 경우에만 알 수 있으며, 없으면 None.
+    """
+    rows = df.attrs.get("sheet_rows") if df is not None else None
+    if rows is None or label not in df.index:
+        return None
+    position = df.index.get_loc(label)
+    if not isinstance(position, int) or position >= len(rows):
+        return None
+    return int(rows[position])
@@ -0,0 +1,91 @@
+import streamlit as st
+
+# 앱에서 사용하는 모든 구글시트 목록 (모듈별 *_SPREADSHEET_ID 상수는 여기서 가져갑니다)
+# 소스별: secrets 키, 기본 ID, 워크시트 이름(None이면 첫 시트), 미러에서 인덱스를 걸 이름/시각 열
+SOURCES = {
+    "snippets": {
+        "secret": "spreadsheet_id",
+        "extra_secrets": [],
+        "default_id": "1THmwStR6p0_SUyLEV6-edT0kigANvTCPOkAzN7NaEQE",
+        "worksheet": "Sheet1",
+        "name_column": "이름",
+        "time_column": "타임스탬프",
+    },
+    "users": {
+        "secret": "users_spreadsheet_id",
+        "extra_secrets": [],
+        "default_id": "1fHSCgg6_97Z3JzOvrk3ElXQWhOWhVhl5IaITeA9pXmY",
+        "worksheet": None,
+        "name_column": "이름(본명)",
+        "time_column": "타임스탬프",
+    },
+    "cdp": {
+        "secret": "cdp_spreadsheet_id",
+        "extra_secrets": ["CDP_SPREADSHEET_ID"],
+        "default_id": "15eTye2j0QiwR6LbgseLhF_9hLxfW3GxVCJcdUUGWgLk",
+        "worksheet": None,
+        "name_column": "이름",
+        "time_column": None,
+    },
+    "idp": {
+        "secret": "idp_spreadsheet_id",
+        "extra_secrets": [],
+        "default_id": "1ufWiqLPPxdmt95jqnJ2sTRy_nmsGASRQnZWmAEmI1C4",
+        "worksheet": None,
+        "name_column": "이름",
+        "time_column": "타임스탬프",
+    },
+    "mission_kpi": {
+        "secret": None,
+        "extra_secrets": [],
+        "default_id": "16RmpF16SylJQe-ThbzA6C8KXzxtAWFDDSbb5mLWqUGI",
+        "worksheet": None,
+        "name_column": None,
+        "time_column": None,
+    },
+    "ground_rule": {
+        "secret": None,
+        "extra_secrets": [],
+        "default_id": "1Bnur8Syu92y9aC-9gsEhA7Y97yFiqnnvR-OiODo8Vow",
+        "worksheet": None,
+        "name_column": None,
+        "time_column": None,
+    },
+    "oneon1": {
+        "secret": "oneon1_spreadsheet_id",
+        "extra_secrets": ["oneon1_spreadsheet_id", "ONEOONE_SPREADSHEET_ID"],
+        "default_id": "",
+        "worksheet": "Sheet1",
+        "name_column": None,
+        "time_column": None,
+    },
+}
+
+
+def spreadsheet_id(key: str) -> str:
+    """소스의 스프레드시트 ID를 반환합니다. (우선순위: secrets [google] > 최상위 secrets > 기본값)"""
+    source = SOURCES[key]
+    try:
+        if hasattr(st, "secrets"):
+            if source["secret"]:
+                google_sec = st.secrets.get("google", {}) or {}
+                value = google_sec.get(source["secret"]) if hasattr(google_sec, "get") else None
+                if value:
+                    return str(value)
+            for name in source["extra_secrets"]:
+                value = st.secrets.get(name)
+                if value:
+                    return str(value)
+    except Exception:
+        pass
+    return source["default_id"]
+
+
+def worksheet_name(key: str) -> str | None:
+    """소스의 워크시트 이름을 반환합니다. None이면 첫 번째 시트입니다."""
+    return SOURCES[key]["worksheet"]
+
+
+def keys() -> list:
+    """설정된(ID가 있는) 소스 키 목록을 반환합니다."""
+    return [key for key in SOURCES if spreadsheet_id(key)]
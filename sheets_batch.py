@@ -0,0 +1,285 @@
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+from gspread.exceptions import APIError
+from gspread.utils import fill_gaps, numericise_all, rowcol_to_a1
+
+import sheet_index
+import sheets_client
+import sheets_fanout
+import sheets_singleflight
+
+SHEETS_API_URL = "https://sheets.googleapis.com/v4/spreadsheets"
+# 쓰기 대기열(write_queue)이 행마다 붙이는 멱등 키 열 (시트에서는 숨기고 읽을 때는 버립니다)
+IDEMPOTENCY_COLUMN = "_idempotency_key"
+# 서식 없는 값으로 읽기: 숫자는 숫자로, 날짜/시각은 일련번호(1899-12-30 기준 일 수)로 받습니다
+UNFORMATTED_PARAMS = {"valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "SERIAL_NUMBER"}
+SERIAL_EPOCH = pd.Timestamp("1899-12-30")
+# 날짜 일련번호로 보는 범위 (대략 1927년~2447년, 이 밖의 숫자는 날짜가 아님)
+MIN_SERIAL = 10000
+MAX_SERIAL = 200000
+# 문자열로 저장된 날짜(앱이 RAW로 쓴 값, 예전 데이터)의 형식 - 오전/오후는 AM/PM으로 바꾼 뒤 비교
+DATE_FORMATS = [
+    "%Y. %m. %d %p %I:%M:%S",  # "2025. 10. 29 AM 09:57:00"
+    "%Y. %m. %d %p %I:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d %H:%M",
+    "%Y.%m.%d %H:%M:%S",
+    "%Y.%m.%d %H:%M",
+    "%Y. %m. %d",
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%Y.%m.%d",
+]
+# 열 선택 읽기(projected_values)에서 헤더 행을 다시 확인하지 않고 쓰는 시간(초)
+HEADER_TTL_SECONDS = 600
+
+_headers_lock = threading.Lock()
+# (스프레드시트 ID, 시트 범위) -> (확인 시각, 헤더 행)
+_headers: dict = {}
+
+
+def quote_title(title: str) -> str:
+    """A1 표기법용 시트 이름을 작은따옴표로 감쌉니다."""
+    return "'" + str(title).replace("'", "''") + "'"
+
+
+def sheet_range(spreadsheet_id: str, worksheet_name: str | None, client) -> str:
+    """워크시트 전체를 가리키는 범위를 반환합니다. 이름이 없으면 첫 번째 시트 제목을 캐시에서 찾습니다."""
+    if worksheet_name:
+        return quote_title(worksheet_name)
+    worksheet = sheets_client.get_worksheet(spreadsheet_id, client=client)
+    return quote_title(worksheet.title)
+
+
+def batch_get_values(spreadsheet_id: str, ranges: list, client=None, params: dict | None = None) -> list:
+    """한 번의 values:batchGet 호출로 여러 범위의 값을 가져옵니다.
+
+    요청한 범위 순서대로 2차원 값 목록을 반환합니다. (빈 범위는 [])
+    같은 범위를 동시에 요청하면 진행 중인 호출 하나의 결과를 함께 사용합니다.
+    """
+    client = client or sheets_client.get_google_sheets_client()
+    if not client:
+        return [None for _ in ranges]
+    session = sheets_client.http_session(client)
+    query = {"ranges": list(ranges), "majorDimension": "ROWS"}
+    query.update(params or {})
+
+    def _fetch():
+        response = session.request("GET", f"{SHEETS_API_URL}/{spreadsheet_id}/values:batchGet", params=query)
+        if not response.ok:
+            raise APIError(response)
+        value_ranges = response.json().get("valueRanges", [])
+        result = [vr.get("values", []) for vr in value_ranges]
+        # 응답 누락 대비 길이 보정
+        result += [[] for _ in range(len(ranges) - len(result))]
+        return result
+
+    key = (spreadsheet_id, None, tuple(ranges), tuple(sorted((params or {}).items())))
+    return sheets_singleflight.do(key, _fetch)
+
+
+def _column_letter(number: int) -> str:
+    """1부터 시작하는 열 번호를 열 문자로 바꿉니다. (예: 3 -> 'C')"""
+    return "".join(ch for ch in rowcol_to_a1(1, number) if ch.isalpha())
+
+
+def header_row(spreadsheet_id: str, worksheet_name: str | None, client=None, refresh: bool = False) -> list:
+    """워크시트의 헤더(1행)를 반환합니다. HEADER_TTL_SECONDS 동안은 다시 읽지 않습니다."""
+    title = sheet_range(spreadsheet_id, worksheet_name, client)
+    key = (spreadsheet_id, title)
+    with _headers_lock:
+        cached = _headers.get(key)
+    if cached is not None and not refresh and time.time() - cached[0] < HEADER_TTL_SECONDS:
+        return cached[1]
+    values = batch_get_values(spreadsheet_id, [f"{title}!1:1"], client=client)[0]
+    header = [str(name) for name in values[0]] if values else []
+    with _headers_lock:
+        _headers[key] = (time.time(), header)
+    return header
+
+
+def column_runs(header: list, columns: list) -> list:
+    """헤더에서 columns의 위치를 찾아 이어진 열끼리 묶은 (시작, 끝) 목록을 반환합니다. (0부터, 끝 포함)
+
+    헤더에 없는 이름은 무시하며 앞뒤 공백은 비교하지 않습니다. 예: 헤더 A~F 중 [B, C, E] -> [(1, 2), (4, 4)]
+    """
+    wanted = {str(name).strip() for name in columns}
+    positions = sorted({i for i, name in enumerate(header) if str(name).strip() in wanted})
+    runs = []
+    for position in positions:
+        if runs and runs[-1][1] == position - 1:
+            runs[-1] = (runs[-1][0], position)
+        else:
+            runs.append((position, position))
+    return runs
+
+
+def projected_values(spreadsheet_id: str, worksheet_name: str | None, columns: list, client=None,
+                     params: dict | None = None) -> list:
+    """필요한 열만 batchGet 한 번으로 읽어 헤더 행을 포함한 값 목록을 반환합니다. (열 순서는 시트 순서)
+
+    헤더에서 열 위치를 찾아 이어진 열끼리 하나의 범위(예: 'Sheet1'!B1:C, 'Sheet1'!E1:E)로 요청하므로
+    긴 서술형 열은 전송/변환하지 않습니다. 받은 1행이 기억한 헤더와 다르면(열 이동) 헤더를 다시 읽어 한 번 더 시도합니다.
+    """
+    title = sheet_range(spreadsheet_id, worksheet_name, client)
+    for attempt in range(2):
+        header = header_row(spreadsheet_id, worksheet_name, client=client, refresh=attempt > 0)
+        runs = column_runs(header, columns)
+        if not runs:
+            return []
+        ranges = [f"{title}!{_column_letter(start + 1)}1:{_column_letter(end + 1)}" for start, end in runs]
+        parts = batch_get_values(spreadsheet_id, ranges, client=client, params=params)
+        widths = [end - start + 1 for start, end in runs]
+        # 범위마다 끝의 빈 행/칸이 잘려 오므로 가장 긴 범위에 맞춰 채웁니다
+        height = max(len(part) for part in parts)
+        parts = [fill_gaps(part, rows=height, cols=width) if part else [[""] * width for _ in range(height)]
+                 for part, width in zip(parts, widths)]
+        values = [sum((part[i] for part in parts), []) for i in range(height)]
+        expected = [header[i] for start, end in runs for i in range(start, end + 1)]
+        if values and [str(name) for name in values[0]] == expected:
+            return values
+    return values
+
+
+def records_from_values(values: list) -> list:
+    """첫 행을 헤더로 하는 값 목록을 worksheet.get_all_records()와 같은 레코드 목록으로 변환합니다."""
+    if not values:
+        return []
+    rows = fill_gaps(values)
+    keys = rows[0]
+    if IDEMPOTENCY_COLUMN in keys:
+        keep = [i for i, key in enumerate(keys) if key != IDEMPOTENCY_COLUMN]
+        rows = [[row[i] for i in keep] for row in rows]
+        keys = rows[0]
+    return [dict(zip(keys, numericise_all(row))) for row in rows[1:]]
+
+
+def to_datetime(values) -> pd.Series:
+    """시트 날짜 값(일련번호, datetime, 한국어 오전/오후 문자열 등)을 datetime64 Series로 한 번에 변환합니다.
+
+    값마다 형식을 시도하지 않고, 종류별로 나눠 형식마다 한 번씩 벡터 연산으로 변환합니다. 실패한 값은 NaT입니다.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    series = series.astype(object)
+    result = pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+    if series.empty:
+        return result
+
+    is_number = series.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+    numbers = pd.to_numeric(series[is_number], errors="coerce")
+    numbers = numbers[(numbers >= MIN_SERIAL) & (numbers < MAX_SERIAL)]
+    if not numbers.empty:
+        result[numbers.index] = SERIAL_EPOCH + pd.to_timedelta(numbers, unit="D").dt.round("s")
+
+    is_datetime = series.map(lambda v: isinstance(v, datetime))
+    if is_datetime.any():
+        result[is_datetime] = pd.to_datetime(series[is_datetime], errors="coerce")
+
+    text = series[~is_number & ~is_datetime & series.notna()].astype(str).str.strip()
+    text = text[text != ""].str.replace("오전", "AM", regex=False).str.replace("오후", "PM", regex=False)
+    for fmt in DATE_FORMATS:
+        if text.empty:
+            break
+        parsed = pd.to_datetime(text, format=fmt, errors="coerce")
+        matched = parsed.notna()
+        result[parsed.index[matched]] = parsed[matched]
+        text = text[~matched]
+    return result
+
+
+def to_records(df: pd.DataFrame | None) -> list:
+    """DataFrame을 JSON으로 저장할 수 있는 레코드 목록으로 바꿉니다.
+
+    날짜 열은 'YYYY-MM-DD HH:MM:SS' 문자열(NaT는 ''), nullable 정수/범주 열은 int/str(빈 값은 '')로 바꿉니다.
+    """
+    if df is None or df.empty:
+        return []
+    datetime_columns = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+    typed_columns = [c for c in df.columns if isinstance(df[c].dtype, pd.api.extensions.ExtensionDtype)
+                     and c not in datetime_columns]
+    if datetime_columns or typed_columns:
+        df = df.copy()
+        for column in datetime_columns:
+            df[column] = df[column].dt.strftime("%Y-%m-%d %H:%M:%S").fillna("")
+        for column in typed_columns:
+            values = df[column].astype(object)
+            df[column] = values.where(values.notna(), "")
+    return df.to_dict("records")
+
+
+def drop_internal_columns(records: list) -> list:
+    """worksheet.get_all_records() 결과에서 내부용 열(멱등 키)을 뺍니다."""
+    if not records or IDEMPOTENCY_COLUMN not in records[0]:
+        return records
+    return [{k: v for k, v in record.items() if k != IDEMPOTENCY_COLUMN} for record in records]
+
+
+def _load_group(spreadsheet_id: str, entries: list, client, call) -> dict:
+    """한 스프레드시트의 여러 워크시트를 batchGet 한 번으로 읽어 {키: DataFrame}을 반환합니다."""
+    try:
+        ranges = [sheet_range(spreadsheet_id, name, client) for _, name in entries]
+        values_list = call(batch_get_values, spreadsheet_id, ranges, client=client)
+    except Exception:
+        # 시트 이름 변경/삭제 등으로 실패했을 수 있으므로 핸들 캐시를 비웁니다
+        sheets_client.invalidate_handles(spreadsheet_id)
+        return {key: None for key, _ in entries}
+    frames = {}
+    for (key, _), values in zip(entries, values_list):
+        if values is None:
+            frames[key] = None
+            continue
+        records = records_from_values(values)
+        frames[key] = sheet_index.stamp(pd.DataFrame(records), f"{spreadsheet_id}:{key}") if records else pd.DataFrame()
+    return frames
+
+
+def iter_frames(sources: dict, client=None, retry=None, timeout: float | None = None):
+    """여러 시트를 스프레드시트별 batchGet 한 번씩으로 동시에 읽어, 끝나는 순서대로 (키, DataFrame)을 반환합니다.
+
+    sources: {키: (스프레드시트 ID, 워크시트 이름 또는 None) 또는 DataFrame을 반환하는 함수}
+    해당 스프레드시트 읽기에 실패하거나 시간 초과되면 DataFrame 대신 None이므로
+    호출하는 쪽에서 기존 로더로 대체합니다.
+    """
+    client = client or sheets_client.get_google_sheets_client()
+    if not client:
+        for key in sources:
+            yield key, None
+        return
+
+    call = retry or (lambda fn, *args, **kwargs: fn(*args, **kwargs))
+
+    # 스프레드시트별로 범위를 묶어 한 번에 요청 (함수로 지정된 소스는 별도 작업으로 실행)
+    groups: dict = {}
+    loaders = {}
+    for key, source in sources.items():
+        if callable(source):
+            loaders[("call", key)] = source
+            continue
+        spreadsheet_id, worksheet_name = source
+        groups.setdefault(spreadsheet_id, []).append((key, worksheet_name))
+
+    for spreadsheet_id, entries in groups.items():
+        loaders[("sheet", spreadsheet_id)] = (
+            lambda sid=spreadsheet_id, entries=entries: _load_group(sid, entries, client, call)
+        )
+    fanout_kwargs = {"default_timeout": timeout} if timeout else {}
+    for (kind, name), result in sheets_fanout.iter_completed(loaders, **fanout_kwargs):
+        if kind == "call":
+            yield name, result
+            continue
+        for key, _ in groups[name]:
+            yield key, (result or {}).get(key)
+
+
+def fetch_frames(sources: dict, client=None, retry=None, timeout: float | None = None) -> dict:
+    """iter_frames의 결과를 모두 모아 {키: DataFrame 또는 None}으로 반환합니다."""
+    frames = {key: None for key in sources}
+    frames.update(iter_frames(sources, client=client, retry=retry, timeout=timeout))
+    return frames
@@ -0,0 +1,149 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+# 연속으로 이 횟수만큼 429를 받으면 회로를 엽니다
+FAILURE_THRESHOLD = 3
+# 회로를 연 뒤 첫 시험 요청까지 기다리는 시간(초) (Retry-After가 있으면 그 값 우선)
+OPEN_SECONDS = 30
+# 시험 요청이 다시 실패할 때마다 두 배씩 늘리는 대기 시간의 상한(초)
+MAX_OPEN_SECONDS = 300
+
+SHEETS_HOST = "sheets.googleapis.com"
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+_lock = threading.Lock()
+_state = {
+    "state": STATE_CLOSED,
+    "failures": 0,          # 연속 429 횟수
+    "opened_until": 0.0,    # 이 시각 이후 시험 요청 허용
+    "open_seconds": OPEN_SECONDS,
+    "probing": False,       # 반열림 상태에서 시험 요청이 진행 중인지
+}
+# 회로가 닫힐 때(할당량 회복) 호출할 함수 목록
+_on_close: list = []
+
+
+class CircuitOpenError(Exception):
+    """회로가 열려 있어 Google Sheets 요청을 보내지 않았을 때 발생합니다. (429 quota 상태)"""
+
+    def __init__(self, retry_in: float):
+        self.retry_in = max(0.0, retry_in)
+        super().__init__(
+            f"Google Sheets 호출 제한(429 quota)으로 요청을 잠시 중단했습니다. 약 {int(self.retry_in) + 1}초 후 다시 시도합니다."
+        )
+
+
+def state() -> str:
+    with _lock:
+        return _state["state"]
+
+
+def is_open() -> bool:
+    """지금 요청하면 곧바로 CircuitOpenError로 실패하는 상태인지 반환합니다.
+
+    대기 시간이 지나 시험 요청을 보낼 수 있으면 False입니다. (백그라운드 작업이 시험 요청을 보내도록)
+    """
+    with _lock:
+        if _state["state"] == STATE_OPEN:
+            return time.time() < _state["opened_until"]
+        if _state["state"] == STATE_HALF_OPEN:
+            return _state["probing"]
+        return False
+
+
+def on_close(callback):
+    """회로가 다시 닫힐 때 호출할 함수를 등록합니다. (중복 등록 무시)"""
+    with _lock:
+        if callback not in _on_close:
+            _on_close.append(callback)
+
+
+def before_request():
+    """요청을 보내도 되는지 확인합니다. 안 되면 CircuitOpenError를 발생시킵니다.
+
+    열린 상태에서 대기 시간이 지나면 반열림으로 바꾸고 시험 요청 하나만 통과시킵니다.
+    """
+    with _lock:
+        if _state["state"] == STATE_CLOSED:
+            return
+        now = time.time()
+        if _state["state"] == STATE_OPEN and now >= _state["opened_until"]:
+            _state["state"] = STATE_HALF_OPEN
+            _state["probing"] = False
+        if _state["state"] == STATE_HALF_OPEN and not _state["probing"]:
+            _state["probing"] = True
+            return
+        raise CircuitOpenError(_state["opened_until"] - now)
+
+
+def record_success():
+    """429가 아닌 응답을 받았을 때 호출합니다. 반열림 상태였으면 회로를 닫습니다."""
+    with _lock:
+        was_open = _state["state"] != STATE_CLOSED
+        _state.update(state=STATE_CLOSED, failures=0, probing=False, open_seconds=OPEN_SECONDS)
+        callbacks = list(_on_close) if was_open else []
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            continue
+
+
+def record_failure(retry_after: float | None = None):
+    """429 응답을 받았을 때 호출합니다. 연속 실패가 쌓이거나 시험 요청이 실패하면 회로를 엽니다."""
+    with _lock:
+        _state["failures"] += 1
+        if _state["state"] == STATE_HALF_OPEN:
+            # 시험 요청 실패: 대기 시간을 늘려 다시 엽니다
+            _state["open_seconds"] = min(MAX_OPEN_SECONDS, _state["open_seconds"] * 2)
+        elif _state["state"] == STATE_CLOSED and _state["failures"] < FAILURE_THRESHOLD:
+            return
+        open_seconds = max(retry_after or 0.0, _state["open_seconds"])
+        _state.update(state=STATE_OPEN, opened_until=time.time() + open_seconds, probing=False)
+
+
+def _retry_after_seconds(response) -> float | None:
+    try:
+        value = response.headers.get("Retry-After")
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def install(session):
+    """requests 세션의 Sheets API 요청이 회로 차단기를 거치도록 감쌉니다. (중복 설치 방지)
+
+    호출량 제한(sheets_throttle)보다 바깥에 설치해, 회로가 열려 있으면 토큰을 기다리지 않고 바로 실패합니다.
+    """
+    if session is None or getattr(session, "_sheets_breaker", False):
+        return
+    inner_request = session.request
+
+    def guarded_request(method, url, *args, **kwargs):
+        try:
+            is_sheets = (urlparse(url).hostname or "") == SHEETS_HOST
+        except Exception:
+            is_sheets = False
+        # 토큰 갱신 후 재요청(AuthorizedSession 내부 재귀)은 이미 통과한 요청입니다
+        if not is_sheets or "_credential_refresh_attempt" in kwargs:
+            return inner_request(method, url, *args, **kwargs)
+        before_request()
+        try:
+            response = inner_request(method, url, *args, **kwargs)
+        except Exception:
+            # 네트워크 오류는 할당량과 무관하므로 시험 요청 자리만 돌려놓습니다
+            with _lock:
+                _state["probing"] = False
+            raise
+        if response.status_code == 429:
+            record_failure(_retry_after_seconds(response))
+        else:
+            record_success()
+        return response
+
+    session.request = guarded_request
+    session._sheets_breaker = True
@@ -0,0 +1,385 @@
+import atexit
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+import sheets_client
+import sheets_retry
+import sheets_singleflight
+
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+# 같은 스프레드시트의 리비전 확인 최소 간격(초) (재실행마다 Drive를 조회하지 않도록)
+PROBE_INTERVAL_SECONDS = 15
+# 리비전을 확인할 수 없을 때(Drive 권한 없음 등) 캐시를 그대로 쓰는 시간(초)
+FALLBACK_TTL_SECONDS = 300
+# 보관할 캐시 항목 수
+MAX_ENTRIES = 64
+# 재시작 시 캐시를 바로 채우기 위한 디스크 스냅샷 (gzip 압축 JSON, 버전이 다르면 무시)
+SNAPSHOT_PATH = "sheets_cache.snapshot.json.gz"
+SNAPSHOT_VERSION = 2
+# 이전 형식(pickle) 스냅샷 경로 - 읽지 않고 지웁니다
+LEGACY_SNAPSHOT_PATH = "sheets_cache.snapshot"
+# 스냅샷에 남기지 않는 캐시 키의 첫 요소 (비밀번호 등 자격 정보가 담긴 사용자 시트)
+SNAPSHOT_EXCLUDED = {"users"}
+# 변경된 캐시를 스냅샷에 기록하는 최소 간격(초)
+SNAPSHOT_INTERVAL_SECONDS = 30
+# Drive 변경 피드(drive_changes)가 이 시간 안에 성공했으면 리비전 재확인을 피드에 맡깁니다
+FEED_STALE_SECONDS = 180
+
+_lock = threading.Lock()
+# 스프레드시트 ID -> (확인 시각, Drive 리비전 또는 None)
+_probes: dict = {}
+# 스프레드시트 ID -> 앱에서 직접 쓴 횟수 (Drive 리비전 반영 전에도 바로 무효화되도록)
+_bumps: dict = {}
+# 캐시 키 -> (스프레드시트 ID, 리비전, 저장 시각, 값)
+_entries: OrderedDict = OrderedDict()
+# 백그라운드에서 갱신 중인 캐시 키
+_refreshing: set = set()
+# 마지막 스냅샷 이후 캐시가 바뀌었는지 여부
+_dirty = False
+_snapshot_lock = threading.Lock()
+_snapshot_worker = None
+_hydrated = False
+# 변경 피드가 마지막으로 성공한 시각 (epoch 초)
+_feed_polled_at = 0.0
+
+KST = timezone(timedelta(hours=9))
+
+
+class LoadFailed(Exception):
+    """캐시에 없는 항목을 loader()가 불러오지 못했을 때(None 반환) 발생합니다."""
+
+    def __init__(self, key):
+        self.key = key
+        super().__init__(f"시트 데이터를 불러오지 못했습니다: {key}")
+
+
+def _probe(spreadsheet_id: str, client) -> str | None:
+    """Drive files.get으로 파일의 version(없으면 modifiedTime)을 조회합니다."""
+    session = sheets_client.http_session(client)
+    if session is None:
+        return None
+    response = session.request(
+        "GET",
+        f"{DRIVE_FILES_URL}/{spreadsheet_id}",
+        params={"fields": "modifiedTime,version", "supportsAllDrives": "true"},
+    )
+    if not response.ok:
+        return None
+    data = response.json()
+    return str(data.get("version") or data.get("modifiedTime") or "") or None
+
+
+def revision(spreadsheet_id: str, client=None) -> str | None:
+    """스프레드시트의 현재 리비전을 반환합니다. 확인할 수 없으면 None.
+
+    Drive 조회는 스프레드시트마다 PROBE_INTERVAL_SECONDS에 한 번만 하며, 앱에서 쓴 직후(bump)에는 바로 다시 조회합니다.
+    변경 피드가 동작 중이면 주기적으로 다시 조회하지 않고, 피드가 변경을 알린 시트(note_change)만 다시 조회합니다.
+    """
+    if not spreadsheet_id:
+        return None
+    now = time.time()
+    with _lock:
+        probe = _probes.get(spreadsheet_id)
+    if probe is None or (now - probe[0] >= PROBE_INTERVAL_SECONDS and not feed_alive()):
+        client = client or sheets_client.get_google_sheets_client()
+        try:
+            remote = _probe(spreadsheet_id, client) if client else None
+        except Exception:
+            remote = None
+        with _lock:
+            _probes[spreadsheet_id] = (now, remote)
+    else:
+        remote = probe[1]
+    if remote is None:
+        return None
+    with _lock:
+        return f"{remote}+{_bumps.get(spreadsheet_id, 0)}"
+
+
+def bump(spreadsheet_id: str):
+    """앱에서 스프레드시트에 쓴 직후 호출합니다. 해당 시트의 캐시를 버려 다음 조회가 새로 읽도록 합니다."""
+    if not spreadsheet_id:
+        return
+    with _lock:
+        _bumps[spreadsheet_id] = _bumps.get(spreadsheet_id, 0) + 1
+        _probes.pop(spreadsheet_id, None)
+        # 쓰기 이전 값을 오래된 값으로 보여주지 않도록 항목을 버립니다 (다음 조회는 바로 로드)
+        for key in [k for k, entry in _entries.items() if entry[0] == spreadsheet_id]:
+            del _entries[key]
+
+
+def note_feed_poll():
+    """변경 피드를 한 번 성공적으로 확인했을 때 호출합니다."""
+    global _feed_polled_at
+    _feed_polled_at = time.time()
+
+
+def feed_alive() -> bool:
+    """변경 피드가 최근(FEED_STALE_SECONDS 안)에 성공했는지 반환합니다. 아니면 주기적 리비전 확인으로 돌아갑니다."""
+    return time.time() - _feed_polled_at < FEED_STALE_SECONDS
+
+
+def note_change(spreadsheet_id: str):
+    """변경 피드가 알린 시트의 리비전 확인 결과를 버려, 다음 조회에서 다시 확인하고 갱신하도록 합니다."""
+    with _lock:
+        _probes.pop(spreadsheet_id, None)
+
+
+def _store(key, spreadsheet_id: str, current: str | None, value):
+    """_lock 보유 상태에서 호출합니다."""
+    global _dirty
+    _dirty = True
+    _entries[key] = (spreadsheet_id, current, time.time(), value)
+    _entries.move_to_end(key)
+    while len(_entries) > MAX_ENTRIES:
+        _entries.popitem(last=False)
+
+
+def _copy(value, as_of: float | None = None):
+    """호출한 쪽이 고쳐도 공유 캐시 값이 바뀌지 않도록 복사본을 반환합니다. (as_of는 복사본에만 기록)
+
+    DataFrame은 값 배열만 복사하고(문자열 등 원소는 공유), 목록/딕셔너리는 행(list/dict) 단위까지만 복사합니다.
+    캐시 값의 원소는 문자열/숫자 같은 불변 값이므로 deepcopy 없이도 공유 값이 바뀌지 않습니다.
+    """
+    if hasattr(value, "attrs") and hasattr(value, "copy"):
+        copied = value.copy()
+        copied.attrs.pop("as_of", None)
+        if as_of is not None:
+            copied.attrs["as_of"] = as_of
+        return copied
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [list(item) if isinstance(item, list) else dict(item) if isinstance(item, dict) else item for item in value]
+    return value
+
+
+def _refresh(key, spreadsheet_id: str, current: str | None, loader):
+    """백그라운드 스레드에서 loader()로 항목을 갱신합니다. 도중에 bump()되었으면 결과를 버립니다."""
+    with _lock:
+        generation = _bumps.get(spreadsheet_id, 0)
+    try:
+        value = loader()
+    except Exception:
+        value = None
+    with _lock:
+        _refreshing.discard(key)
+        if value is not None and _bumps.get(spreadsheet_id, 0) == generation:
+            _store(key, spreadsheet_id, current, value)
+
+
+def get(key, spreadsheet_id: str, loader, client=None, shared: bool = False):
+    """리비전이 그대로면 캐시된 값의 복사본을 반환합니다. (stale-while-revalidate)
+
+    리비전이 바뀌었으면 이전 값을 바로 반환하고 백그라운드에서 loader()로 갱신합니다.
+    이때 DataFrame이면 복사본의 attrs["as_of"]에 이전 값의 저장 시각(epoch 초)이 들어갑니다.
+    캐시가 비어 있을 때(또는 bump 직후)만 loader()를 기다립니다.
+    key는 캐시 항목을 구분하는 값(예: (스프레드시트 ID, 워크시트 이름))입니다.
+    리비전을 확인할 수 없으면 FALLBACK_TTL_SECONDS가 지난 뒤 갱신합니다.
+    loader가 None을 반환하면(로드 실패) 캐시하지 않고 LoadFailed를 발생시킵니다.
+    shared=True이면 복사하지 않은 공유 값을 그대로 반환합니다. (고치지 않는 호출자만 사용하며 as_of도 붙지 않음,
+    같은 객체가 돌아오면 내용도 같으므로 호출자는 객체 동일성으로 변경 여부를 알 수 있습니다)
+    """
+    hand_out = (lambda value, as_of=None: value) if shared else _copy
+    current = revision(spreadsheet_id, client)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _, cached_revision, stored_at, value = entry
+            _entries.move_to_end(key)
+            if current is not None and cached_revision == current:
+                return hand_out(value)
+            if current is None and time.time() - stored_at < FALLBACK_TTL_SECONDS:
+                return hand_out(value)
+            # 오래된 값을 바로 반환하고 갱신은 한 번만 백그라운드에서 수행
+            if key not in _refreshing:
+                _refreshing.add(key)
+                threading.Thread(
+                    target=_refresh, args=(key, spreadsheet_id, current, loader), name="sheets-cache-refresh", daemon=True
+                ).start()
+            return hand_out(value, as_of=stored_at)
+        generation = _bumps.get(spreadsheet_id, 0)
+
+    def _store_late(late_value):
+        # 화면이 기다리지 못하고 돌아간 로드가 백그라운드에서 끝나면 캐시만 채웁니다
+        with _lock:
+            if late_value is not None and _bumps.get(spreadsheet_id, 0) == generation:
+                _store(key, spreadsheet_id, current, late_value)
+
+    # 같은 항목을 동시에 읽는 세션들은 한 번의 로드 결과를 함께 사용
+    # (재시도는 loader 안의 호출이 담당하고, 여기서는 화면 스레드가 오래 기다리지 않도록만 합니다)
+    value = sheets_singleflight.do(
+        ("sheets_cache", key),
+        lambda: sheets_retry.run(loader, name="sheets_cache.get", on_result=_store_late, max_attempts=1),
+    )
+    if value is None:
+        raise LoadFailed(key)
+    with _lock:
+        _store(key, spreadsheet_id, current, value)
+    return hand_out(value)
+
+
+def freshness_caption(df) -> str | None:
+    """이전 데이터를 보여주는 중이면 '데이터 기준 시각' 문구를, 최신 데이터면 None을 반환합니다."""
+    as_of = getattr(df, "attrs", {}).get("as_of") if df is not None else None
+    if not as_of:
+        return None
+    as_of_text = datetime.fromtimestamp(float(as_of), KST).strftime("%Y-%m-%d %H:%M")
+    return f"🕒 데이터 기준 시각: {as_of_text} (최신 데이터로 갱신 중)"
+
+
+def _remote_revision(current: str | None) -> str | None:
+    """리비전에서 이 프로세스의 쓰기 횟수(+N)를 떼어 Drive 리비전만 남깁니다."""
+    return current.rsplit("+", 1)[0] if current else None
+
+
+def _encode(value):
+    """캐시 값을 JSON으로 기록할 수 있는 형태로 바꿉니다. (DataFrame은 열 형식을 유지하는 table 형식)"""
+    if isinstance(value, pd.DataFrame):
+        return {"__frame__": value.to_json(orient="table", date_format="iso"), "attrs": _encode(dict(value.attrs))}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(item) for item in value]}
+    if isinstance(value, dict):
+        return {"__dict__": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"스냅샷에 기록할 수 없는 값: {type(value).__name__}")
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "__frame__" in value:
+        frame = pd.read_json(io.StringIO(value["__frame__"]), orient="table")
+        frame.attrs.update(_decode(value.get("attrs") or {}))
+        return frame
+    if "__tuple__" in value:
+        return tuple(_decode(item) for item in value["__tuple__"])
+    return {_decode(k): _decode(v) for k, v in value["__dict__"]}
+
+
+def _snapshot_entry(key, spreadsheet_id: str, current: str | None, stored_at: float, value) -> dict | None:
+    """스냅샷에 기록할 항목 하나를 만듭니다. 자격 정보가 담긴 키나 기록할 수 없는 값이면 None."""
+    if isinstance(key, tuple) and key and key[0] in SNAPSHOT_EXCLUDED:
+        return None
+    try:
+        return {
+            "key": _encode(key),
+            "spreadsheet_id": spreadsheet_id,
+            "revision": _remote_revision(current),
+            "stored_at": stored_at,
+            "value": _encode(value),
+        }
+    except (TypeError, ValueError):
+        return None
+
+
+def save_snapshot():
+    """현재 캐시 항목을 디스크 스냅샷으로 기록합니다. (임시 파일에 쓴 뒤 교체)"""
+    global _dirty
+    with _lock:
+        entries = list(_entries.items())
+        _dirty = False
+    with _snapshot_lock:
+        try:
+            records = [_snapshot_entry(key, *entry) for key, entry in entries]
+            document = {"version": SNAPSHOT_VERSION, "entries": [record for record in records if record is not None]}
+            tmp_path = f"{SNAPSHOT_PATH}.tmp"
+            with open(tmp_path, "wb") as f:
+                with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+                    gz.write(json.dumps(document, ensure_ascii=False).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, SNAPSHOT_PATH)
+        except Exception:
+            # 스냅샷은 재시작 가속용이므로 실패해도 캐시 동작에는 영향 없음
+            with _lock:
+                _dirty = True
+
+
+def _load_snapshot() -> list:
+    """스냅샷을 읽어 (키, 스프레드시트 ID, 리비전, 저장 시각, 값) 목록을 반환합니다. 없거나 손상되었거나 버전이 다르면 빈 목록."""
+    try:
+        os.remove(LEGACY_SNAPSHOT_PATH)
+    except OSError:
+        pass
+    try:
+        with gzip.open(SNAPSHOT_PATH, "rb") as f:
+            document = json.loads(f.read().decode("utf-8"))
+    except (OSError, EOFError, ValueError):
+        return []
+    if not isinstance(document, dict) or document.get("version") != SNAPSHOT_VERSION:
+        return []
+    entries = []
+    for record in document.get("entries", []):
+        try:
+            key = _decode(record["key"])
+            if isinstance(key, tuple) and key and key[0] in SNAPSHOT_EXCLUDED:
+                continue
+            entries.append(
+                (key, record["spreadsheet_id"], record["revision"], float(record["stored_at"]), _decode(record["value"]))
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+    return entries
+
+
+def _run_snapshot_worker():
+    while True:
+        time.sleep(SNAPSHOT_INTERVAL_SECONDS)
+        if _dirty:
+            save_snapshot()
+
+
+def _revalidate(spreadsheet_ids: list):
+    """스냅샷에서 복원한 스프레드시트들의 리비전을 미리 확인해 둡니다."""
+    client = sheets_client.get_google_sheets_client()
+    if not client:
+        return
+    for spreadsheet_id in spreadsheet_ids:
+        try:
+            revision(spreadsheet_id, client)
+        except Exception:
+            continue
+
+
+def hydrate():
+    """프로세스 시작 시 한 번 호출합니다. 스냅샷으로 캐시를 채우고 주기적 스냅샷 기록을 시작합니다.
+
+    복원한 항목은 저장 당시의 Drive 리비전을 그대로 가지므로, 시트가 그대로면 바로 사용되고
+    바뀌었으면 get()에서 이전 값을 보여주며 백그라운드에서 갱신합니다.
+    """
+    global _hydrated, _snapshot_worker
+    with _snapshot_lock:
+        if _hydrated:
+            return
+        _hydrated = True
+    entries = _load_snapshot()
+    with _lock:
+        for key, spreadsheet_id, remote, stored_at, value in entries:
+            if key in _entries:
+                continue
+            if hasattr(value, "attrs"):
+                value.attrs.pop("as_of", None)
+            current = f"{remote}+{_bumps.get(spreadsheet_id, 0)}" if remote else None
+            _entries[key] = (spreadsheet_id, current, stored_at, value)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    spreadsheet_ids = sorted({entry[1] for entry in entries})
+    if spreadsheet_ids:
+        threading.Thread(target=_revalidate, args=(spreadsheet_ids,), name="sheets-cache-revalidate", daemon=True).start()
+    _snapshot_worker = threading.Thread(target=_run_snapshot_worker, name="sheets-cache-snapshot", daemon=True)
+    _snapshot_worker.start()
+    atexit.register(lambda: _dirty and save_snapshot())
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import streamlit as st
+import gspread
+from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+
+import sheets_breaker
+import sheets_throttle
+
+# Google Sheets 연동을 위한 설정 (모든 모듈 공통)
+SCOPE = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+SERVICE_ACCOUNT_FILE = "service_account.json"
+
+# keep-alive 커넥션 풀 크기 (동시 로딩 시 커넥션 재사용)
+HTTP_POOL_MAXSIZE = 16
+
+# Spreadsheet/Worksheet 핸들 캐시 유지 시간 (시트 이름 변경/삭제 대비)
+HANDLE_TTL_SECONDS = 600
+
+_lock = threading.RLock()
+# 인증 정보 키 -> 인증된 gspread 클라이언트 (프로세스 전역 공유)
+_clients: dict = {}
+# (클라이언트 id, 스프레드시트 ID) -> (생성 시각, Spreadsheet)
+_spreadsheets: dict = {}
+# (클라이언트 id, 스프레드시트 ID, 워크시트 이름) -> (생성 시각, Worksheet)
+_worksheets: dict = {}
+
+
+def _credentials_key(creds_info: dict) -> str:
+    """서비스 계정 정보로 클라이언트 풀 키를 만듭니다."""
+    raw = json.dumps(creds_info, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _resolve_credentials():
+    """우선순위에 따라 서비스 계정 정보를 찾아 (풀 키, Credentials 생성 함수)를 반환합니다.
+
+    인증 정보가 없거나 형식이 잘못된 경우 None을 반환합니다.
+    """
+    # 방법 0: Streamlit secrets에서 서비스 계정 정보 읽기 (최우선)
+    try:
+        google_sec = st.secrets.get("google") if hasattr(st, "secrets") else None
+    except Exception:
+        google_sec = None
+
+    if google_sec:
+        # 0-a) 전체 JSON 문자열 저장한 경우: google.credentials_json
+        if "credentials_json" in google_sec and google_sec["credentials_json"]:
+            raw = google_sec["credentials_json"]
+            creds_info = json.loads(raw) if isinstance(raw, str) else dict(raw)
+            return _credentials_key(creds_info), lambda: Credentials.from_service_account_info(creds_info, scopes=SCOPE)
+
+        # 0-b) TOML로 키를 중첩(dict) 저장한 경우: google.service_account = { ... }
+        if "service_account" in google_sec and google_sec["service_account"]:
+            creds_info = dict(google_sec["service_account"])  # MappingProxyType 대응
+            return _credentials_key(creds_info), lambda: Credentials.from_service_account_info(creds_info, scopes=SCOPE)
+
+    # 방법 1: Streamlit secrets에서 직접 읽기 (추가 위치 확인)
+    try:
+        if hasattr(st, "secrets"):
+            direct_creds = st.secrets.get("GOOGLE_CREDENTIALS_JSON") or st.secrets.get("google_credentials_json")
+            if direct_creds:
+                try:
+                    creds_info = json.loads(direct_creds) if isinstance(direct_creds, str) else dict(direct_creds)
+                    return _credentials_key(creds_info), lambda: Credentials.from_service_account_info(creds_info, scopes=SCOPE)
+                except json.JSONDecodeError:
+                    st.error("Streamlit secrets의 GOOGLE_CREDENTIALS_JSON이 올바른 JSON 형식이 아닙니다.")
+                    return None
+    except Exception:
+        pass
+
+    # 방법 2: 서비스 계정 JSON 파일 읽기 (파일이 바뀌면 새 클라이언트)
+    if os.path.exists(SERVICE_ACCOUNT_FILE):
+        key = f"file:{os.path.abspath(SERVICE_ACCOUNT_FILE)}:{os.path.getmtime(SERVICE_ACCOUNT_FILE)}"
+        return key, lambda: Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPE)
+
+    # 방법 3: 세션 상태에서 서비스 계정 정보 읽기
+    try:
+        session_creds = st.session_state.get('google_credentials')
+    except Exception:
+        session_creds = None
+    if session_creds:
+        try:
+            creds_info = json.loads(session_creds)
+            return _credentials_key(creds_info), lambda: Credentials.from_service_account_info(creds_info, scopes=SCOPE)
+        except json.JSONDecodeError:
+            st.error("저장된 서비스 계정 정보가 올바른 JSON 형식이 아닙니다.")
+            return None
+
+    # 인증 정보가 없는 경우
+    st.warning("Google Sheets 연동을 위해 서비스 계정 인증 정보가 필요합니다.")
+    return None
+
+
+def http_session(client):
+    """gspread 클라이언트가 사용하는 AuthorizedSession을 반환합니다. (gspread 5/6 호환)"""
+    http_client = getattr(client, "http_client", None)
+    session = getattr(http_client, "session", None) if http_client is not None else None
+    return session or getattr(client, "session", None)
+
+
+def _enable_keep_alive(client):
+    """클라이언트 세션에 keep-alive 커넥션 풀과 호출량 제한을 장착합니다.
+
+    AuthorizedSession은 토큰 만료 전 자동 갱신을 수행하므로 세션을 재사용하면
+    매 호출마다 인증을 다시 할 필요가 없습니다.
+    """
+    session = http_session(client)
+    if session is None:
+        return
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    # 모든 세션/모듈의 Sheets 호출이 프로세스 전역 토큰 버킷을 거치도록 합니다
+    sheets_throttle.install(session)
+    # 할당량 소진(연속 429) 시 바로 실패하도록 회로 차단기를 가장 바깥에 장착
+    sheets_breaker.install(session)
+
+
+def get_google_sheets_client():
+    """Google Sheets 클라이언트를 반환합니다.
+
+    인증 정보별로 한 번만 인증하고, 이후에는 프로세스 전역에서 같은 클라이언트를 재사용합니다.
+    """
+    try:
+        resolved = _resolve_credentials()
+        if not resolved:
+            return None
+        key, make_credentials = resolved
+
+        with _lock:
+            client = _clients.get(key)
+        if client is not None:
+            return client
+
+        client = gspread.authorize(make_credentials())
+        _enable_keep_alive(client)
+        with _lock:
+            # 동시에 생성된 경우 먼저 등록된 클라이언트를 사용
+            client = _clients.setdefault(key, client)
+        return client
+    except Exception as e:
+        st.error(f"Google Sheets 연동 오류: {e}")
+        return None
+
+
+def _fresh(entry) -> bool:
+    return entry is not None and (time.time() - entry[0] < HANDLE_TTL_SECONDS)
+
+
+def open_spreadsheet(spreadsheet_id: str, client=None):
+    """캐시된 Spreadsheet 핸들을 반환합니다. 없으면 한 번만 메타데이터를 조회합니다."""
+    client = client or get_google_sheets_client()
+    if not client:
+        return None
+    key = (id(client), spreadsheet_id)
+    with _lock:
+        entry = _spreadsheets.get(key)
+    if _fresh(entry):
+        return entry[1]
+    spreadsheet = client.open_by_key(spreadsheet_id)
+    with _lock:
+        _spreadsheets[key] = (time.time(), spreadsheet)
+    return spreadsheet
+
+
+def get_worksheet(spreadsheet_id: str, worksheet_name: str | None = None, client=None):
+    """캐시된 Worksheet 핸들을 반환합니다. worksheet_name이 없으면 첫 번째 시트(sheet1)를 사용합니다."""
+    client = client or get_google_sheets_client()
+    if not client:
+        return None
+    key = (id(client), spreadsheet_id, worksheet_name)
+    with _lock:
+        entry = _worksheets.get(key)
+    if _fresh(entry):
+        return entry[1]
+    spreadsheet = open_spreadsheet(spreadsheet_id, client)
+    worksheet = spreadsheet.worksheet(worksheet_name) if worksheet_name else spreadsheet.sheet1
+    with _lock:
+        _worksheets[key] = (time.time(), worksheet)
+    return worksheet
+
+
+def invalidate_handles(spreadsheet_id: str | None = None):
+    """캐시된 핸들을 무효화합니다. spreadsheet_id가 없으면 전체를 비웁니다."""
+    with _lock:
+        if spreadsheet_id is None:
+            _spreadsheets.clear()
+            _worksheets.clear()
+            return
+        for key in [k for k in _spreadsheets if k[1] == spreadsheet_id]:
+            del _spreadsheets[key]
+        for key in [k for k in _worksheets if k[1] == spreadsheet_id]:
+            del _worksheets[key]
@@ -0,0 +1,114 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except Exception:  # 구버전 Streamlit
+    try:
+        from streamlit.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    except Exception:
+        add_script_run_ctx = None
+        get_script_run_ctx = None
+
+# 프로세스 전역 작업자 수 상한 (모든 세션이 공유, Sheets 호출량은 sheets_throttle이 별도로 제한)
+MAX_WORKERS = 8
+# 소스별 기본 제한 시간(초)
+DEFAULT_TIMEOUT_SECONDS = 20.0
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="sheets-fanout")
+        return _executor
+
+
+def _with_script_context(fn, ctx):
+    """작업자 스레드에서 st.session_state/st.* 호출이 가능하도록 호출한 세션의 컨텍스트를 붙입니다."""
+    if ctx is None or add_script_run_ctx is None:
+        return fn
+
+    def runner():
+        thread = threading.current_thread()
+        add_script_run_ctx(thread, ctx)
+        try:
+            return fn()
+        finally:
+            # 풀 스레드가 다른 세션 작업에 재사용되므로 컨텍스트를 떼어냅니다
+            add_script_run_ctx(thread, None)
+
+    return runner
+
+
+def in_worker() -> bool:
+    """현재 스레드가 공용 작업자 풀의 스레드인지 반환합니다."""
+    return threading.current_thread().name.startswith("sheets-fanout")
+
+
+def submit(fn, executor: ThreadPoolExecutor | None = None):
+    """인자 없는 함수 하나를 공용 작업자 풀(또는 주어진 executor)에 제출하고 Future를 반환합니다.
+
+    호출한 세션의 컨텍스트와 contextvars(예: sheets_throttle 우선순위)를 그대로 가져갑니다.
+    """
+    ctx = get_script_run_ctx() if get_script_run_ctx is not None else None
+    return (executor or _get_executor()).submit(contextvars.copy_context().run, _with_script_context(fn, ctx))
+
+
+def _fallback_value(fallbacks: dict | None, key):
+    fallback = (fallbacks or {}).get(key)
+    if callable(fallback):
+        try:
+            return fallback()
+        except Exception:
+            return None
+    return fallback
+
+
+def iter_completed(loaders: dict, timeouts: dict | None = None, fallbacks: dict | None = None,
+                   default_timeout: float = DEFAULT_TIMEOUT_SECONDS):
+    """독립적인 로더들을 동시에 실행하고 끝나는 순서대로 (키, 결과)를 반환합니다.
+
+    loaders: {키: 인자 없는 함수}
+    timeouts: {키: 제한 시간(초)} - 없으면 default_timeout
+    fallbacks: {키: 값 또는 인자 없는 함수} - 예외/시간 초과 시 결과 대신 사용 (없으면 None)
+    시간 초과된 작업은 결과만 버리고 백그라운드에서 끝까지 실행됩니다.
+    """
+    if not loaders:
+        return
+    ctx = get_script_run_ctx() if get_script_run_ctx is not None else None
+    executor = _get_executor()
+    start = time.monotonic()
+    deadlines = {}
+    pending = {}
+    for key, fn in loaders.items():
+        future = executor.submit(_with_script_context(fn, ctx))
+        pending[future] = key
+        deadlines[key] = start + float((timeouts or {}).get(key, default_timeout))
+
+    while pending:
+        next_deadline = min(deadlines[key] for key in pending.values())
+        done, _ = wait(list(pending), timeout=max(0.0, next_deadline - time.monotonic()),
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            key = pending.pop(future)
+            try:
+                yield key, future.result()
+            except Exception:
+                yield key, _fallback_value(fallbacks, key)
+        now = time.monotonic()
+        for future, key in list(pending.items()):
+            if now >= deadlines[key] and not future.done():
+                del pending[future]
+                yield key, _fallback_value(fallbacks, key)
+
+
+def run_all(loaders: dict, timeouts: dict | None = None, fallbacks: dict | None = None,
+            default_timeout: float = DEFAULT_TIMEOUT_SECONDS) -> dict:
+    """iter_completed의 결과를 모두 모아 {키: 결과}로 반환합니다."""
+    return dict(iter_completed(loaders, timeouts, fallbacks, default_timeout))
@@ -0,0 +1,341 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+import sheet_decode
+import sheet_sources
+import sheets_batch
+import sheets_breaker
+import sheets_cache
+import sheets_client
+import snippet_sync
+
+# 로컬 SQLite 미러 파일 (user_cache.json과 같은 위치)
+DB_PATH = "sheets_mirror.db"
+# 백그라운드 동기화 주기(초)
+SYNC_INTERVAL_SECONDS = 120
+# 이 시간 안에 동기화된 미러는 Google Sheets 대신 바로 사용합니다
+FRESH_SECONDS = 300
+
+_write_lock = threading.Lock()
+_worker = None
+_worker_lock = threading.Lock()
+_wakeup = threading.Event()
+# 저장 직후 우선 동기화할 소스 키
+_pending_keys: set = set()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, timeout=10)
+    # 읽기와 동기화 쓰기가 서로 막지 않도록 WAL 사용
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS _mirror_meta ("
+        "source TEXT PRIMARY KEY, header TEXT, checksum TEXT, row_count INTEGER, synced_at REAL)"
+    )
+    return conn
+
+
+def _table(key: str) -> str:
+    return f'"src_{key}"'
+
+
+def _timestamps(values: list) -> list:
+    """시트의 타임스탬프 값들을 정렬 가능한 'YYYY-MM-DD HH:MM:SS' 문자열로 한 번에 바꿉니다. (변환 실패는 None)"""
+    formatted = sheets_batch.to_datetime(values).dt.strftime("%Y-%m-%d %H:%M:%S")
+    return [value if isinstance(value, str) else None for value in formatted]
+
+
+def _checksum(header: list, rows: list) -> str:
+    raw = json.dumps([header, rows], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _store(key: str, header: list, rows: list):
+    """소스 하나의 헤더/행을 미러 테이블로 교체합니다. 내용이 같으면 동기화 시각만 갱신합니다."""
+    source = sheet_sources.SOURCES[key]
+    width = len(header)
+    rows = [(list(row) + [""] * width)[:width] for row in rows]
+    checksum = _checksum(header, rows)
+    now = time.time()
+    with _write_lock:
+        conn = _connect()
+        try:
+            meta = conn.execute("SELECT checksum FROM _mirror_meta WHERE source = ?", (key,)).fetchone()
+            if meta and meta[0] == checksum:
+                conn.execute("UPDATE _mirror_meta SET synced_at = ? WHERE source = ?", (now, key))
+                conn.commit()
+                return
+            # 열 이름은 위치(c0, c1, ...)로 두고 실제 헤더는 메타에 보관 (중복/빈 헤더 대응)
+            columns = [f"c{i}" for i in range(width)]
+            time_idx = header.index(source["time_column"]) if source["time_column"] in header else None
+            name_idx = header.index(source["name_column"]) if source["name_column"] in header else None
+            table = _table(key)
+            with conn:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+                column_sql = "".join(f", {c} TEXT" for c in columns)
+                conn.execute(f"CREATE TABLE {table} (_row INTEGER PRIMARY KEY, _ts TEXT{column_sql})")
+                placeholders = ", ".join("?" for _ in range(width + 2))
+                stamps = _timestamps([row[time_idx] for row in rows]) if time_idx is not None else [None] * len(rows)
+                conn.executemany(
+                    f"INSERT INTO {table} VALUES ({placeholders})",
+                    [[row_number, stamp] + row for row_number, (stamp, row) in enumerate(zip(stamps, rows), start=2)],
+                )
+                if name_idx is not None:
+                    conn.execute(f'CREATE INDEX "idx_{key}_name" ON {table} (c{name_idx})')
+                conn.execute(f'CREATE INDEX "idx_{key}_ts" ON {table} (_ts)')
+                conn.execute(
+                    "INSERT OR REPLACE INTO _mirror_meta (source, header, checksum, row_count, synced_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, json.dumps(header, ensure_ascii=False), checksum, len(rows), now),
+                )
+        finally:
+            conn.close()
+
+
+def sync_source(key: str, client=None):
+    """Google Sheets에서 소스 하나를 읽어 미러를 갱신합니다."""
+    client = client or sheets_client.get_google_sheets_client()
+    if not client:
+        return
+    spreadsheet_id = sheet_sources.spreadsheet_id(key)
+    if not spreadsheet_id:
+        return
+    worksheet_name = sheet_sources.worksheet_name(key)
+    if key == "snippets":
+        # 스니펫 시트는 증분 동기화 상태를 그대로 사용 (새 행만 조회)
+        state = snippet_sync.sync(spreadsheet_id, worksheet_name, client=client)
+        with state["lock"]:
+            header, rows = list(state["header"] or []), list(state["rows"])
+    else:
+        sheet_range = sheets_batch.sheet_range(spreadsheet_id, worksheet_name, client)
+        values = sheets_batch.batch_get_values(spreadsheet_id, [sheet_range], client=client)[0] or []
+        header, rows = (list(values[0]), values[1:]) if values else ([], [])
+    if header:
+        _store(key, header, rows)
+
+
+def sync_all(client=None):
+    """설정된 모든 소스를 동기화합니다. 한 소스가 실패해도 나머지는 계속합니다."""
+    for key in sheet_sources.keys():
+        try:
+            sync_source(key, client=client)
+        except Exception:
+            continue
+
+
+def _run_worker():
+    while True:
+        _wakeup.wait(timeout=SYNC_INTERVAL_SECONDS)
+        triggered = _wakeup.is_set()
+        _wakeup.clear()
+        # 할당량 소진으로 회로가 열려 있으면 기존 미러를 그대로 제공 (닫히면 on_close로 다시 깨어남)
+        if sheets_breaker.is_open():
+            continue
+        with _worker_lock:
+            keys = list(_pending_keys)
+            _pending_keys.clear()
+        try:
+            if keys:
+                for key in keys:
+                    try:
+                        sync_source(key)
+                    except Exception:
+                        # 실패한 소스는 다음 주기에 다시 시도 (그 사이 미러는 오래된 것으로 표시된 채 유지)
+                        with _worker_lock:
+                            _pending_keys.add(key)
+            elif triggered or not sheets_cache.feed_alive():
+                # 변경 피드가 동작 중이면 주기적 전체 동기화 대신 바뀐 소스만 request_sync로 받습니다
+                sync_all()
+        except Exception:
+            continue
+
+
+def start_background_sync():
+    """미러 백그라운드 동기화 스레드를 시작합니다. (프로세스당 한 번)"""
+    global _worker
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_run_worker, name="sheets-mirror-sync", daemon=True)
+        _worker.start()
+    sheets_breaker.on_close(_wakeup.set)
+    # 첫 동기화는 바로 수행
+    _wakeup.set()
+
+
+def request_sync(key: str):
+    """소스 하나를 백그라운드에서 곧바로 다시 동기화하도록 요청합니다."""
+    start_background_sync()
+    with _worker_lock:
+        _pending_keys.add(key)
+    _wakeup.set()
+
+
+def mark_stale(key: str):
+    """시트가 바뀐 것을 알았을 때 호출합니다. 동기화에 성공할 때까지 미러를 오래된 것으로 표시하고 곧바로 다시 동기화합니다."""
+    with _write_lock:
+        conn = _connect()
+        try:
+            conn.execute("UPDATE _mirror_meta SET synced_at = 0 WHERE source = ?", (key,))
+            conn.commit()
+        finally:
+            conn.close()
+    request_sync(key)
+
+
+def invalidate(key: str):
+    """앱에서 시트에 쓴 직후 호출합니다. 공유 캐시를 버리고 미러를 오래된 것으로 표시해 곧바로 다시 동기화합니다."""
+    sheets_cache.bump(sheet_sources.spreadsheet_id(key))
+    mark_stale(key)
+
+
+def touch(keys: list):
+    """변경 피드에서 바뀌지 않았다고 확인된 소스의 synced_at을 지금으로 갱신합니다.
+
+    invalidate로 오래된 것으로 표시된(synced_at = 0) 소스나 아직 미러가 없는 소스는 그대로 둡니다.
+    """
+    keys = list(keys)
+    if not keys:
+        return
+    with _write_lock:
+        conn = _connect()
+        try:
+            conn.execute(
+                f"UPDATE _mirror_meta SET synced_at = ? WHERE synced_at > 0 AND source IN ({','.join('?' * len(keys))})",
+                (time.time(), *keys),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def synced_at(key: str) -> float | None:
+    """소스의 마지막 동기화 시각(epoch 초)을 반환합니다. 미러가 없으면 None."""
+    try:
+        conn = _connect()
+        try:
+            meta = conn.execute("SELECT synced_at FROM _mirror_meta WHERE source = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    return meta[0] if meta else None
+
+
+def is_fresh(key: str, max_age: float = FRESH_SECONDS) -> bool:
+    ts = synced_at(key)
+    return bool(ts) and (time.time() - ts < max_age)
+
+
+def query(key: str, name: str | None = None, since: str | None = None, until: str | None = None) -> pd.DataFrame | None:
+    """미러에서 인덱스를 이용해 행을 조회합니다. 미러가 없으면 None.
+
+    name은 소스의 이름 열, since/until은 'YYYY-MM-DD[ HH:MM:SS]' 형식의 타임스탬프 범위입니다.
+    결과는 worksheet.get_all_records()로 만든 DataFrame과 같은 형태입니다. (sheet_decode 스키마가 있는 소스는 그 열 형식)
+    """
+    try:
+        conn = _connect()
+        try:
+            meta = conn.execute("SELECT header, checksum FROM _mirror_meta WHERE source = ?", (key,)).fetchone()
+            if not meta:
+                return None
+            header = json.loads(meta[0])
+            source = sheet_sources.SOURCES[key]
+            where, params = [], []
+            if name is not None:
+                if source["name_column"] not in header:
+                    return None
+                where.append(f"c{header.index(source['name_column'])} = ?")
+                params.append(str(name))
+            if since:
+                where.append("_ts >= ?")
+                params.append(since)
+            if until:
+                where.append("_ts <= ?")
+                params.append(until)
+            columns = "".join(f", c{i}" for i in range(len(header)))
+            sql = f"SELECT _row{columns} FROM {_table(key)}"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            rows = conn.execute(sql + " ORDER BY _row", params).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    values = [header] + [list(row[1:]) for row in rows]
+    schema = sheet_decode.SCHEMAS.get(key)
+    if schema is not None:
+        # 스니펫/IDP는 시트에서 직접 읽을 때와 같은 열 형식으로 만듭니다
+        df = sheet_decode.frame_from_values(values, schema)
+    else:
+        records = sheets_batch.records_from_values(values)
+        df = pd.DataFrame(records) if records else pd.DataFrame(columns=header)
+    # 미러 체크섬과 조회 조건으로 버전을 붙여 이름 인덱스를 재사용합니다
+    df.attrs["sheet_version"] = f"mirror:{key}:{meta[1]}:{name}:{since}:{until}"
+    # 각 행의 원본 시트 행 번호 (제자리 수정 시 사용)
+    df.attrs["sheet_rows"] = [row[0] for row in rows]
+    return df
+
+
+def patch(key: str, row_number: int, values: dict) -> bool:
+    """앱에서 시트의 한 행을 수정한 직후 미러의 같은 행을 제자리에서 고칩니다.
+
+    values는 {헤더: 값}입니다. 미러에 해당 행이 없으면 False를 반환하며, 이때는 invalidate()를 사용합니다.
+    """
+    try:
+        with _write_lock:
+            conn = _connect()
+            try:
+                meta = conn.execute("SELECT header, checksum FROM _mirror_meta WHERE source = ?", (key,)).fetchone()
+                if not meta:
+                    return False
+                header = json.loads(meta[0])
+                if any(column not in header for column in values):
+                    return False
+                assignments = ", ".join(f"c{header.index(column)} = ?" for column in values)
+                params = [str(value) for value in values.values()]
+                with conn:
+                    cursor = conn.execute(f"UPDATE {_table(key)} SET {assignments} WHERE _row = ?", params + [row_number])
+                    if cursor.rowcount != 1:
+                        conn.rollback()
+                        return False
+                    # 내용이 바뀌었으므로 체크섬(=조회 버전)도 바꿔 이름 인덱스 캐시를 무효화합니다
+                    checksum = _checksum([meta[1], row_number], [params])
+                    conn.execute("UPDATE _mirror_meta SET checksum = ? WHERE source = ?", (checksum, key))
+            finally:
+                conn.close()
+    except sqlite3.Error:
+        return False
+    sheets_cache.bump(sheet_sources.spreadsheet_id(key))
+    return True
+
+
+def read(key: str, loader, name: str | None = None) -> pd.DataFrame | None:
+    """미러가 최신이면 미러에서 읽습니다. (stale-while-revalidate)
+
+    미러가 오래되었으면 미러 내용을 바로 반환하고(df.attrs["as_of"]에 동기화 시각) 백그라운드에서 다시 동기화합니다.
+    미러가 없거나 앱에서 쓴 직후(invalidate)일 때만 loader()로 Google Sheets에서 읽으며,
+    이 읽기가 실패하면(할당량 초과 등) 오래된 미러라도 반환합니다.
+    """
+    import write_queue
+
+    ts = synced_at(key)
+    if ts:
+        df = query(key, name=name)
+        if df is not None:
+            if time.time() - ts >= FRESH_SECONDS:
+                request_sync(key)
+                df.attrs["as_of"] = ts
+            return write_queue.overlay(df, key, name=name)
+    try:
+        df = loader()
+    except Exception:
+        df = None
+    if df is None:
+        df = write_queue.overlay(query(key, name=name), key, name=name)
+    return df
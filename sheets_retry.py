@@ -0,0 +1,201 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+import sheets_breaker
+import sheets_fanout
+import sheets_throttle
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except Exception:  # 구버전 Streamlit
+    try:
+        from streamlit.scriptrunner import get_script_run_ctx
+    except Exception:
+        get_script_run_ctx = None
+
+# 호출 하나에 쓰는 총 시간 상한(초) (첫 시도부터 마지막 재시도까지)
+DEFAULT_DEADLINE_SECONDS = 30.0
+# 재시도를 포함한 최대 시도 횟수
+MAX_ATTEMPTS = 6
+# 지수 백오프 기본 지연(초)과 상한(초) (Retry-After가 없을 때)
+BASE_DELAY_SECONDS = 1.0
+MAX_DELAY_SECONDS = 16.0
+# 화면 렌더링 스레드가 읽기 결과를 기다리는 최대 시간(초), 넘으면 백그라운드에서 계속 시도합니다
+RENDER_WAIT_SECONDS = 5.0
+# 화면 스레드의 쓰기가 재시도 대기에 쓸 수 있는 총 시간(초) (넘으면 대기하지 않고 오류를 보여줍니다)
+RENDER_WRITE_RETRY_SECONDS = 3.0
+# 화면 스레드 대신 재시도를 이어가는 전용 작업자 수 (공용 fan-out 풀을 차지하지 않도록 분리)
+RETRY_WORKERS = 4
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_lock = threading.Lock()
+# 호출 이름 -> 지표
+_metrics: dict = {}
+_executor = None
+
+
+class StillRunning(Exception):
+    """읽기 호출이 RENDER_WAIT_SECONDS 안에 끝나지 않아 화면 스레드가 먼저 돌아왔을 때 발생합니다.
+
+    호출은 실패한 것이 아니라 백그라운드에서 계속 실행 중입니다. (재시도가 있었는지와 무관)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__("Google Sheets 응답이 늦어지고 있습니다. 백그라운드에서 계속 불러오는 중입니다.")
+
+
+def is_retryable_error(error_msg: str) -> bool:
+    """재시도 가능한 오류인지 확인합니다."""
+    msg_lower = error_msg.lower()
+    return ('429' in msg_lower) or ('quota' in msg_lower) or ('rate' in msg_lower and 'limit' in msg_lower)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (sheets_breaker.CircuitOpenError, StillRunning)):
+        # 회로가 열려 있으면 백오프 없이 바로 실패 (캐시/미러로 대체)
+        return False
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status in RETRYABLE_STATUS:
+        return True
+    return is_retryable_error(str(error))
+
+
+def _retry_after(error: Exception) -> float | None:
+    """오류 응답의 Retry-After 헤더(초)를 반환합니다. 없으면 None."""
+    try:
+        value = error.response.headers.get("Retry-After")
+        return max(0.0, float(value)) if value else None
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _backoff(error: Exception, attempt: int) -> float:
+    """다음 시도까지 기다릴 시간(초)입니다.
+
+    서버의 Retry-After가 있으면 그 값을, 없으면 지수 백오프(+지터)를 쓰되
+    프로세스 할당량 버킷(sheets_throttle)이 비어 있으면 토큰이 찰 때까지로 늘립니다.
+    """
+    delay = _retry_after(error)
+    if delay is None:
+        delay = min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * (2 ** attempt)) + random.uniform(0, 0.5)
+    try:
+        quota_wait = max(sheets_throttle.wait_seconds("read"), sheets_throttle.wait_seconds("write"))
+    except Exception:
+        quota_wait = 0.0
+    return max(delay, min(quota_wait, MAX_DELAY_SECONDS))
+
+
+def _record(name: str, **changes):
+    with _lock:
+        metric = _metrics.setdefault(
+            name,
+            {"calls": 0, "retries": 0, "wait_seconds": 0.0, "failures": 0, "deadline_exceeded": 0, "pending": 0},
+        )
+        for field, amount in changes.items():
+            metric[field] += amount
+
+
+def metrics() -> dict:
+    """호출 이름별 지표 {이름: {calls, retries, wait_seconds, failures, deadline_exceeded, pending}}를 반환합니다."""
+    with _lock:
+        return {name: dict(metric) for name, metric in _metrics.items()}
+
+
+def _attempts(fn, name: str, deadline_at: float, max_attempts: int):
+    """현재 스레드에서 fn()을 시도하고, 재시도 가능한 오류면 기한 안에서 기다렸다가 다시 시도합니다."""
+    _record(name, calls=1)
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if not _is_retryable(e):
+                _record(name, failures=1)
+                raise
+            attempt += 1
+            if attempt >= max_attempts:
+                _record(name, failures=1)
+                raise
+            delay = _backoff(e, attempt - 1)
+            if time.monotonic() + delay > deadline_at:
+                # 기한 안에 다시 시도할 수 없으면 기다리지 않고 마지막 오류를 전파
+                _record(name, failures=1, deadline_exceeded=1)
+                raise
+            _record(name, retries=1, wait_seconds=delay)
+            time.sleep(delay)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RETRY_WORKERS, thread_name_prefix="sheets-retry")
+        return _executor
+
+
+def on_render_thread() -> bool:
+    """Streamlit 스크립트(화면 렌더링) 스레드에서 호출되었는지 반환합니다."""
+    if get_script_run_ctx is None or sheets_fanout.in_worker():
+        return False
+    if threading.current_thread().name.startswith("sheets-retry"):
+        return False
+    try:
+        return get_script_run_ctx(suppress_warning=True) is not None
+    except TypeError:  # suppress_warning 인자가 없는 구버전
+        return get_script_run_ctx() is not None
+    except Exception:
+        return False
+
+
+def run(fn, deadline: float | None = None, name: str | None = None, on_result=None,
+        max_attempts: int = MAX_ATTEMPTS, write: bool = False):
+    """인자 없는 fn()을 총 deadline초 안에서 재시도하며 실행합니다.
+
+    화면 렌더링 스레드에서 읽기(write=False)를 호출하면 시도와 대기를 재시도 전용 풀에서 실행하고 최대 RENDER_WAIT_SECONDS만 기다립니다.
+    그 안에 끝나지 않으면 StillRunning을 발생시켜 화면이 캐시된 내용이나 대기 상태를 보여주도록 하고,
+    호출은 기한까지 백그라운드에서 계속되어 성공하면 on_result(결과)를 호출합니다.
+    쓰기(write=True)는 화면 스레드에서도 호출이 끝날 때까지 기다리되(완료되는 쓰기를 실패로 보고하면 사용자가 다시 저장해 중복됨),
+    재시도 대기는 RENDER_WRITE_RETRY_SECONDS 안에서만 하고 넘으면 마지막 오류를 그대로 전파합니다.
+    그 외 스레드(백그라운드 작업)에서는 현재 스레드에서 그대로 재시도합니다.
+    """
+    deadline = DEFAULT_DEADLINE_SECONDS if deadline is None else float(deadline)
+    name = name or getattr(fn, "__name__", "call")
+    render = on_render_thread()
+    if write and render:
+        deadline = min(deadline, RENDER_WRITE_RETRY_SECONDS)
+    deadline_at = time.monotonic() + deadline
+    if write or not render:
+        return _attempts(fn, name, deadline_at, max_attempts)
+
+    future = sheets_fanout.submit(lambda: _attempts(fn, name, deadline_at, max_attempts), executor=_get_executor())
+    try:
+        return future.result(timeout=min(RENDER_WAIT_SECONDS, deadline))
+    except FuturesTimeoutError:
+        if future.done():
+            return future.result()
+    _record(name, pending=1)
+    if on_result is not None:
+        def _deliver(done_future):
+            if done_future.cancelled() or done_future.exception() is not None:
+                return
+            try:
+                on_result(done_future.result())
+            except Exception:
+                pass
+
+        future.add_done_callback(_deliver)
+    raise StillRunning(name)
+
+
+def call(callable_fn, *args, **kwargs):
+    """callable_fn(*args, **kwargs)를 기본 설정(DEFAULT_DEADLINE_SECONDS)으로 재시도하며 실행합니다."""
+    return run(lambda: callable_fn(*args, **kwargs), name=getattr(callable_fn, "__name__", None))
+
+
+def call_write(callable_fn, *args, **kwargs):
+    """쓰기 호출용 call입니다. 화면 스레드에서도 시간 제한 없이 끝날 때까지 기다립니다."""
+    return run(lambda: callable_fn(*args, **kwargs), name=getattr(callable_fn, "__name__", None), write=True)
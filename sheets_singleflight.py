@@ -0,0 +1,49 @@
+import threading
+
+import pandas as pd
+
+import sheets_retry
+
+_lock = threading.Lock()
+# 키 -> 진행 중인 호출 {"done": Event, "result": 결과, "error": 예외}
+_calls: dict = {}
+
+
+def _share(result):
+    """대기하던 호출자에게 돌려줄 결과입니다. DataFrame은 호출자마다 복사본을 줍니다."""
+    if isinstance(result, pd.DataFrame):
+        return result.copy()
+    return result
+
+
+def do(key, fn, timeout: float | None = None):
+    """같은 key로 진행 중인 호출이 있으면 그 결과를 기다려 공유하고, 없으면 fn()을 실행합니다.
+
+    key는 (스프레드시트 ID, 워크시트 이름, 범위)처럼 같은 요청을 구분하는 값입니다.
+    먼저 시작한 호출이 예외로 끝나면 기다리던 호출자들도 같은 예외를 받습니다.
+    기다리는 시간은 timeout초(화면 렌더링 스레드에서는 기본 sheets_retry.RENDER_WAIT_SECONDS)까지이며,
+    넘으면 sheets_retry.StillRunning을 발생시킵니다. (먼저 시작한 호출은 계속 진행)
+    """
+    with _lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = {"done": threading.Event(), "result": None, "error": None}
+    if not leader:
+        if timeout is None and sheets_retry.on_render_thread():
+            timeout = sheets_retry.RENDER_WAIT_SECONDS
+        if not call["done"].wait(timeout):
+            raise sheets_retry.StillRunning(str(key))
+        if call["error"] is not None:
+            raise call["error"]
+        return _share(call["result"])
+    try:
+        call["result"] = fn()
+        return call["result"]
+    except BaseException as e:
+        call["error"] = e
+        raise
+    finally:
+        with _lock:
+            _calls.pop(key, None)
+        call["done"].set()
@@ -0,0 +1,155 @@
+import contextlib
+import contextvars
+import threading
+import time
+from urllib.parse import urlparse
+
+import streamlit as st
+
+# Google Sheets API 사용자(서비스 계정)당 기본 할당량: 분당 읽기 60회, 쓰기 60회
+DEFAULT_READS_PER_MINUTE = 60
+DEFAULT_WRITES_PER_MINUTE = 60
+# 순간 허용량 (한 번에 몰아서 쓸 수 있는 토큰 수)
+DEFAULT_BURST = 10
+# 우선(대화형 저장) 요청용으로 남겨두는 토큰 수: 일반 요청은 이 수량 아래로 토큰을 쓰지 않습니다
+DEFAULT_PRIORITY_RESERVE = 2
+
+SHEETS_HOST = "sheets.googleapis.com"
+
+PRIORITY_HIGH = "high"
+PRIORITY_NORMAL = "normal"
+
+_priority = contextvars.ContextVar("sheets_priority", default=PRIORITY_NORMAL)
+
+_lock = threading.Lock()
+_cond = threading.Condition(_lock)
+# 종류("read"/"write") -> 버킷 상태
+_buckets: dict = {}
+# 종류 -> 대기 중인 우선 요청 수
+_high_waiting: dict = {"read": 0, "write": 0}
+
+
+def _config():
+    """secrets의 [sheets_quota] 설정을 읽습니다. 없으면 기본값을 사용합니다."""
+    try:
+        conf = st.secrets.get("sheets_quota", {}) if hasattr(st, "secrets") else {}
+    except Exception:
+        conf = {}
+    conf = dict(conf or {})
+    return {
+        "read": float(conf.get("reads_per_minute", DEFAULT_READS_PER_MINUTE)),
+        "write": float(conf.get("writes_per_minute", DEFAULT_WRITES_PER_MINUTE)),
+        "burst": float(conf.get("burst", DEFAULT_BURST)),
+        "reserve": float(conf.get("priority_reserve", DEFAULT_PRIORITY_RESERVE)),
+    }
+
+
+def _bucket(kind: str) -> dict:
+    """종류별 버킷을 반환합니다. (_lock 보유 상태에서 호출)"""
+    bucket = _buckets.get(kind)
+    if bucket is None:
+        conf = _config()
+        capacity = max(1.0, conf["burst"])
+        bucket = {
+            "rate": conf[kind] / 60.0,
+            "capacity": capacity,
+            "reserve": min(conf["reserve"], capacity - 1.0),
+            "tokens": capacity,
+            "updated": time.monotonic(),
+        }
+        _buckets[kind] = bucket
+    return bucket
+
+
+def _refill(bucket: dict):
+    now = time.monotonic()
+    elapsed = now - bucket["updated"]
+    if elapsed > 0:
+        bucket["tokens"] = min(bucket["capacity"], bucket["tokens"] + elapsed * bucket["rate"])
+        bucket["updated"] = now
+
+
+def _floor(kind: str, bucket: dict, high: bool) -> float:
+    """토큰을 가져가기 위해 남아 있어야 하는 최소 토큰 수를 반환합니다."""
+    if high:
+        return 0.0
+    # 우선 요청이 대기 중이면 일반 요청은 양보합니다
+    if _high_waiting.get(kind):
+        return bucket["capacity"]
+    return bucket["reserve"]
+
+
+def wait_seconds(kind: str = "read") -> float:
+    """현재 우선순위에서 토큰을 바로 얻을 수 없으면 예상 대기 시간(초)을 반환합니다. 가능하면 0."""
+    high = _priority.get() == PRIORITY_HIGH
+    with _lock:
+        bucket = _bucket(kind)
+        _refill(bucket)
+        needed = _floor(kind, bucket, high) + 1.0 - bucket["tokens"]
+        if needed <= 0:
+            return 0.0
+        return needed / bucket["rate"] if bucket["rate"] > 0 else float("inf")
+
+
+def acquire(kind: str = "read"):
+    """프로세스 전역 버킷에서 토큰 1개를 얻을 때까지 대기합니다."""
+    high = _priority.get() == PRIORITY_HIGH
+    with _cond:
+        if high:
+            _high_waiting[kind] = _high_waiting.get(kind, 0) + 1
+        try:
+            while True:
+                bucket = _bucket(kind)
+                _refill(bucket)
+                floor = _floor(kind, bucket, high)
+                if bucket["tokens"] - 1.0 >= floor:
+                    bucket["tokens"] -= 1.0
+                    return
+                wait = (floor + 1.0 - bucket["tokens"]) / bucket["rate"] if bucket["rate"] > 0 else 1.0
+                # 다른 스레드가 우선 요청을 끝내면 깨어나도록 짧게 나눠 대기
+                _cond.wait(timeout=min(max(wait, 0.01), 1.0))
+        finally:
+            if high:
+                _high_waiting[kind] -= 1
+                _cond.notify_all()
+
+
+@contextlib.contextmanager
+def priority(level: str = PRIORITY_HIGH):
+    """블록 안의 Sheets 호출을 지정한 우선순위로 처리합니다. (대화형 저장은 high)"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _request_kind(method: str, url: str) -> str | None:
+    """요청이 Sheets API 읽기인지 쓰기인지 판별합니다. Sheets API가 아니면 None."""
+    try:
+        host = urlparse(url).hostname or ""
+    except Exception:
+        return None
+    if host != SHEETS_HOST:
+        return None
+    if (method or "GET").upper() == "GET" or url.split("?")[0].endswith(":batchGet"):
+        return "read"
+    return "write"
+
+
+def install(session):
+    """requests 세션의 모든 Sheets API 요청이 버킷을 거치도록 감쌉니다. (중복 설치 방지)"""
+    if session is None or getattr(session, "_sheets_throttled", False):
+        return
+    original_request = session.request
+
+    def throttled_request(method, url, *args, **kwargs):
+        # 토큰 갱신 후 재요청(AuthorizedSession 내부 재귀)은 이미 토큰을 얻은 요청입니다
+        if "_credential_refresh_attempt" not in kwargs:
+            kind = _request_kind(method, url)
+            if kind:
+                acquire(kind)
+        return original_request(method, url, *args, **kwargs)
+
+    session.request = throttled_request
+    session._sheets_throttled = True
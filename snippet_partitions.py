@@ -0,0 +1,286 @@
+import argparse
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+from gspread.utils import ValueInputOption
+
+import sheet_decode
+import sheet_sources
+import sheets_batch
+import sheets_cache
+import sheets_client
+import sheets_mirror
+import snippet_sync
+from sheets_retry import call as _sheets_call_with_retry
+
+# 지난 연도 스니펫을 옮겨 두는 워크시트 이름 접두사 (예: Snippets_2024)
+PARTITION_PREFIX = "Snippets_"
+# 파티션 목록(워크시트 제목)을 다시 조회하지 않고 쓰는 시간(초)
+PARTITIONS_TTL_SECONDS = 600
+# 옮긴 행의 타임스탬프는 RAW 문자열로 기록합니다 (sheets_batch.DATE_FORMATS에 있는 형식)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = sheet_decode.SCHEMAS["snippets"]
+TIME_COLUMN = sheet_sources.SOURCES["snippets"]["time_column"]
+NAME_COLUMN = sheet_sources.SOURCES["snippets"]["name_column"]
+
+_lock = threading.Lock()
+# 스프레드시트 ID -> (조회 시각, {연도: 워크시트 제목})
+_partitions: dict = {}
+
+
+def partition_title(year: int) -> str:
+    return f"{PARTITION_PREFIX}{int(year)}"
+
+
+def _year_of(title: str) -> int | None:
+    suffix = title[len(PARTITION_PREFIX):] if title.startswith(PARTITION_PREFIX) else ""
+    return int(suffix) if suffix.isdigit() else None
+
+
+def partitions(spreadsheet_id: str, client=None, refresh: bool = False) -> dict:
+    """스프레드시트에 있는 연도별 파티션 {연도: 워크시트 제목}을 반환합니다. (PARTITIONS_TTL_SECONDS 동안 캐시)"""
+    with _lock:
+        cached = _partitions.get(spreadsheet_id)
+    if cached is not None and not refresh and time.time() - cached[0] < PARTITIONS_TTL_SECONDS:
+        return dict(cached[1])
+    spreadsheet = sheets_client.open_spreadsheet(spreadsheet_id, client=client)
+    if spreadsheet is None:
+        return {}
+    worksheets = _sheets_call_with_retry(spreadsheet.worksheets)
+    found = {}
+    for worksheet in worksheets:
+        year = _year_of(worksheet.title)
+        if year is not None:
+            found[year] = worksheet.title
+    with _lock:
+        _partitions[spreadsheet_id] = (time.time(), found)
+    return dict(found)
+
+
+def _bound(value) -> pd.Timestamp | None:
+    if value is None or value == "":
+        return None
+    parsed = sheets_batch.to_datetime([value]).iloc[0]
+    return None if pd.isna(parsed) else parsed
+
+
+def years_for(spreadsheet_id: str, since=None, until=None, client=None) -> list:
+    """since~until(포함) 범위에 걸치는 파티션 연도 목록을 반환합니다. 범위가 없으면 모든 파티션입니다."""
+    since, until = _bound(since), _bound(until)
+    return sorted(
+        year for year in partitions(spreadsheet_id, client=client)
+        if (since is None or year >= since.year) and (until is None or year <= until.year)
+    )
+
+
+def partition_values(spreadsheet_id: str, years: list, client=None) -> dict:
+    """파티션들을 batchGet 한 번으로 읽어 {연도: 헤더를 포함한 값 목록}을 반환합니다. (리비전 기반 캐시)"""
+    titles = partitions(spreadsheet_id, client=client)
+    years = [year for year in sorted(years) if year in titles]
+    if not years:
+        return {}
+
+    def _fetch():
+        ranges = [sheets_batch.quote_title(titles[year]) for year in years]
+        values_list = _sheets_call_with_retry(
+            sheets_batch.batch_get_values, spreadsheet_id, ranges, client=client, params=sheets_batch.UNFORMATTED_PARAMS
+        )
+        return dict(zip(years, values_list))
+
+    return sheets_cache.get(("snippet_partitions", spreadsheet_id, tuple(years)), spreadsheet_id, _fetch, client=client)
+
+
+def _within(frame: pd.DataFrame, since, until) -> pd.DataFrame:
+    since, until = _bound(since), _bound(until)
+    if frame.empty or TIME_COLUMN not in frame.columns or (since is None and until is None):
+        return frame
+    stamps = frame[TIME_COLUMN]
+    mask = pd.Series(True, index=frame.index)
+    if since is not None:
+        mask &= stamps >= since
+    if until is not None:
+        # 날짜만 준 경우 그날 끝까지 포함
+        mask &= stamps < (until + pd.Timedelta(days=1) if until == until.normalize() else until + pd.Timedelta(seconds=1))
+    return frame[mask]
+
+
+def read(spreadsheet_id: str, since=None, until=None, client=None, worksheet_name: str | None = None,
+         include_partitions: bool = False) -> pd.DataFrame:
+    """활성 시트와 since~until 범위에 필요한 파티션만 읽어 하나의 DataFrame으로 반환합니다.
+
+    since/until은 'YYYY-MM-DD[ HH:MM:SS]' 또는 datetime이며 없으면 그쪽 범위 제한이 없습니다.
+    둘 다 없으면 미러와 같이 활성 시트만 반환하며, include_partitions=True일 때만 모든 파티션을 함께 읽습니다.
+    활성 시트에는 아직 옮기지 않은 지난 연도 행이 남아 있을 수 있으므로 항상 함께 읽습니다.
+    파티션 행은 활성 시트의 행 번호가 없으므로 파티션을 합친 경우 df.attrs["sheet_rows"]를 두지 않습니다.
+    """
+    client = client or sheets_client.get_google_sheets_client()
+    worksheet_name = worksheet_name or sheet_sources.worksheet_name("snippets")
+    active = snippet_sync.sync_frame(spreadsheet_id, worksheet_name, client=client)
+    if since is None and until is None and not include_partitions:
+        frame = active.copy()
+        frame.attrs = {**active.attrs, "partition_years": []}
+        return frame
+    years = years_for(spreadsheet_id, since, until, client=client)
+    frames = [
+        sheet_decode.frame_from_values(values, SCHEMA)
+        for _, values in sorted(partition_values(spreadsheet_id, years, client=client).items())
+        if values
+    ]
+    frames = [frame for frame in frames + [active] if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    merged = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].copy()
+    merged = sheet_decode.restore_categories(_within(merged, since, until).reset_index(drop=True), frames[-1])
+    merged.attrs = {
+        "sheet_version": f"{active.attrs.get('sheet_version')}:partitions:{','.join(map(str, years))}:{since}:{until}",
+        "partition_years": years,
+    }
+    return merged
+
+
+def row_keys(header: list, rows: list) -> list:
+    """행마다 (타임스탬프, 이름) 키를 만듭니다. 타임스탬프는 한 번에 변환해 TIMESTAMP_FORMAT 문자열로 비교합니다."""
+    if TIME_COLUMN not in header or NAME_COLUMN not in header:
+        return [("", "")] * len(rows)
+    time_index, name_index = header.index(TIME_COLUMN), header.index(NAME_COLUMN)
+    stamps = sheets_batch.to_datetime([row[time_index] if len(row) > time_index else "" for row in rows])
+    stamps = stamps.dt.strftime(TIMESTAMP_FORMAT).fillna("")
+    return [
+        (stamp, str(row[name_index] if len(row) > name_index else "").strip())
+        for stamp, row in zip(stamps, rows)
+    ]
+
+
+def _closed_rows(header: list, rows: list, before_year: int) -> dict:
+    """활성 시트 행 중 before_year보다 이전 연도 행을 {연도: [(시트 행 번호, 행, 키)]}으로 모읍니다."""
+    time_index = header.index(TIME_COLUMN)
+    stamps = sheets_batch.to_datetime([row[time_index] for row in rows])
+    closed: dict = {}
+    for row_number, (stamp, row, key) in enumerate(zip(stamps, rows, row_keys(header, rows)), start=2):
+        if pd.notna(stamp) and stamp.year < before_year:
+            closed.setdefault(stamp.year, []).append((row_number, row, key))
+    return closed
+
+
+def _partition_row(header: list, row: list, key: tuple, keep: list) -> list:
+    """옮길 행: 멱등 키 열을 빼고 타임스탬프는 키의 문자열로 바꿉니다. (RAW로 기록해도 다시 날짜로 읽힘)"""
+    values = list(row)
+    values[header.index(TIME_COLUMN)] = key[0]
+    return [values[i] for i in keep]
+
+
+def _delete_rows(spreadsheet, worksheet, row_numbers: list):
+    """시트 행들을 이어진 구간별 deleteDimension으로, 아래쪽부터 한 번의 batch_update로 지웁니다."""
+    runs = []
+    for row_number in sorted(set(row_numbers)):
+        if runs and runs[-1][1] == row_number - 1:
+            runs[-1][1] = row_number
+        else:
+            runs.append([row_number, row_number])
+    requests = [
+        {
+            "deleteDimension": {
+                "range": {"sheetId": worksheet.id, "dimension": "ROWS", "startIndex": start - 1, "endIndex": end}
+            }
+        }
+        for start, end in reversed(runs)
+    ]
+    if requests:
+        _sheets_call_with_retry(spreadsheet.batch_update, {"requests": requests})
+
+
+def roll(spreadsheet_id: str | None = None, before_year: int | None = None, client=None, dry_run: bool = False,
+         worksheet_name: str | None = None) -> dict:
+    """활성 시트에서 before_year(기본: 올해, KST) 이전 연도 행을 Snippets_{연도} 워크시트로 옮깁니다.
+
+    1) 파티션에 아직 없는 행만 append_rows로 추가하고, 2) 활성 시트를 다시 읽어 파티션에 들어간 행만 지웁니다.
+    중간에 실패해도 다시 실행하면 이미 옮긴 행은 건너뛰고 남은 행을 이어서 처리합니다.
+    한 번에 한 프로세스에서만 실행하세요. (행 번호로 삭제합니다)
+    """
+    spreadsheet_id = spreadsheet_id or sheet_sources.spreadsheet_id("snippets")
+    worksheet_name = worksheet_name or sheet_sources.worksheet_name("snippets")
+    before_year = int(before_year or datetime.now(sheets_cache.KST).year)
+    client = client or sheets_client.get_google_sheets_client()
+    if not client:
+        raise RuntimeError("Google Sheets 클라이언트를 만들 수 없습니다.")
+    stats = {"years": [], "moved": 0, "already_archived": 0, "deleted": 0}
+
+    state = snippet_sync.sync(spreadsheet_id, worksheet_name, client=client, force_full=True)
+    with state["lock"]:
+        header, rows = list(state["header"] or []), list(state["rows"])
+    if TIME_COLUMN not in header:
+        return stats
+    closed = _closed_rows(header, rows, before_year)
+    stats["years"] = sorted(closed)
+    if dry_run or not closed:
+        stats["moved"] = sum(len(entries) for entries in closed.values())
+        return stats
+
+    keep = [i for i, column in enumerate(header) if column != sheets_batch.IDEMPOTENCY_COLUMN]
+    partition_header = [header[i] for i in keep]
+    spreadsheet = sheets_client.open_spreadsheet(spreadsheet_id, client=client)
+    existing = partitions(spreadsheet_id, client=client, refresh=True)
+    archived_keys = set()
+    for year, entries in sorted(closed.items()):
+        moving = [_partition_row(header, row, key, keep) for _, row, key in entries]
+        if year in existing:
+            worksheet = spreadsheet.worksheet(existing[year])
+            values = _sheets_call_with_retry(
+                sheets_batch.batch_get_values, spreadsheet_id, [sheets_batch.quote_title(existing[year])],
+                client=client, params=sheets_batch.UNFORMATTED_PARAMS,
+            )[0] or []
+            present = set(row_keys(list(values[0]), values[1:])) if values else set()
+            missing = [row for row, (_, _, key) in zip(moving, entries) if key not in present]
+            stats["already_archived"] += len(moving) - len(missing)
+            if missing:
+                _sheets_call_with_retry(worksheet.append_rows, missing, value_input_option=ValueInputOption.raw)
+        else:
+            worksheet = _sheets_call_with_retry(
+                spreadsheet.add_worksheet, partition_title(year), rows=len(moving) + 1, cols=len(partition_header)
+            )
+            missing = moving
+            _sheets_call_with_retry(
+                worksheet.append_rows, [partition_header] + moving, value_input_option=ValueInputOption.raw
+            )
+        stats["moved"] += len(missing)
+        archived_keys.update(key for _, _, key in entries)
+    sheets_client.invalidate_handles(spreadsheet_id)
+    partitions(spreadsheet_id, client=client, refresh=True)
+
+    # 옮기는 사이 활성 시트가 바뀌었을 수 있으므로 다시 읽어, 파티션에 들어간 행의 현재 위치만 지웁니다
+    state = snippet_sync.sync(spreadsheet_id, worksheet_name, client=client, force_full=True)
+    with state["lock"]:
+        header, rows = list(state["header"] or []), list(state["rows"])
+    doomed = [
+        row_number
+        for entries in _closed_rows(header, rows, before_year).values()
+        for row_number, _, key in entries
+        if key in archived_keys
+    ]
+    spreadsheet = sheets_client.open_spreadsheet(spreadsheet_id, client=client)
+    _delete_rows(spreadsheet, spreadsheet.worksheet(worksheet_name), doomed)
+    stats["deleted"] = len(doomed)
+    snippet_sync.reset(spreadsheet_id, worksheet_name)
+    sheets_mirror.invalidate("snippets")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="지난 연도 스니펫을 Snippets_{연도} 워크시트로 옮겨 활성 시트를 작게 유지합니다.")
+    parser.add_argument("--before", type=int, default=None, help="이 연도 이전 행을 옮깁니다 (기본: 올해)")
+    parser.add_argument("--dry-run", action="store_true", help="시트를 바꾸지 않고 옮길 행 수만 출력")
+    args = parser.parse_args(argv)
+    stats = roll(before_year=args.before, dry_run=args.dry_run)
+    years = ", ".join(map(str, stats["years"])) or "없음"
+    print(
+        f"대상 연도: {years} / 옮긴 행 {stats['moved']}행, 이미 보관된 행 {stats['already_archived']}행, "
+        f"활성 시트에서 지운 행 {stats['deleted']}행"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
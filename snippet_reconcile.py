@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+import sheet_sources
+import sheets_batch
+import sheets_breaker
+import sheets_client
+import snippet_partitions
+import snippet_sync
+import write_queue
+
+# 예전 버전이 Google Sheets 실패 시 저장하던 로컬 CSV
+CSV_PATH = "daily_snippets.csv"
+# 파일별 마지막으로 모두 반영한 시점의 (수정 시각, 크기) - 바뀌지 않았으면 시트를 다시 읽지 않습니다
+STATE_PATH = "snippet_reconcile.json"
+# 명령줄 실행 시 쓰기 대기열을 비우며 기다리는 최대 시간(초) (남은 행은 앱의 쓰기 대기열이 이어서 반영)
+DRAIN_SECONDS = 120
+
+_lock = threading.Lock()
+_worker = None
+
+
+def _row_keys(rows: list, time_index: int, name_index: int) -> list:
+    """행마다 중복 판정 키 (타임스탬프, 이름)를 만듭니다.
+
+    시트는 날짜를 일련번호로, CSV는 문자열로 주므로 타임스탬프는 한 번에 datetime으로 바꿔 비교하고
+    변환되지 않는 값만 원래 문자열로 비교합니다.
+    """
+    if not rows:
+        return []
+    raw = [row[time_index] if len(row) > time_index else "" for row in rows]
+    parsed = sheets_batch.to_datetime(raw).dt.strftime("%Y-%m-%d %H:%M:%S")
+    return [
+        (stamp if isinstance(stamp, str) else str(value).strip(), str(row[name_index] if len(row) > name_index else "").strip())
+        for stamp, value, row in zip(parsed, raw, rows)
+    ]
+
+
+def _load_state() -> dict:
+    try:
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(state: dict):
+    tmp_path = f"{STATE_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def _file_signature(path: str) -> list | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime, stat.st_size]
+
+
+def read_csv_rows(path: str, header: list) -> list:
+    """CSV를 읽어 시트 헤더 순서에 맞춘 행 목록(문자열)으로 반환합니다.
+
+    CSV 헤더가 모두 시트 헤더에 있으면 이름으로 맞춥니다. 이름이 다른 열이 있으면 예전 저장 방식(시트와 같은 열 순서)으로 보고
+    위치로 맞추되, 양쪽에 모두 있는 이름의 위치가 다르거나 CSV 열이 더 많으면 ValueError로 중단합니다.
+    (이름으로만 맞추면 다른 이름의 열이 빈 칸으로 추가되어 내용이 사라집니다)
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8")
+    columns = [str(column).strip() for column in df.columns]
+    if not set(columns) & set(header):
+        # 헤더 없는 CSV: 첫 줄도 데이터입니다
+        df = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8", header=None)
+        columns = header[:len(df.columns)] + [f"_extra{i}" for i in range(len(df.columns) - len(header))]
+    mismatched = [column for column in columns if column not in header]
+    if mismatched:
+        misplaced = [column for i, column in enumerate(columns) if column in header and header.index(column) != i]
+        if len(columns) > len(header) or misplaced:
+            raise ValueError(
+                f"{path}: 시트 헤더와 맞지 않는 CSV 열이 있어 중단합니다. "
+                f"시트에 없는 열: {mismatched}, 위치가 다른 열: {misplaced}"
+            )
+        # 예전 CSV는 시트와 같은 열 순서로 저장되었으므로 위치로 맞춥니다
+        columns = header[:len(columns)]
+    df.columns = columns
+    return [[str(record.get(column, "")) for column in header] for record in df.to_dict("records")]
+
+
+def _sheet_keys(spreadsheet_id: str, worksheet_name: str, client) -> tuple:
+    """시트 헤더(멱등 키 열 제외)와 시트/연도별 파티션/쓰기 대기열에 이미 있는 (타임스탬프, 이름) 집합을 반환합니다."""
+    state = snippet_sync.sync(spreadsheet_id, worksheet_name, client=client)
+    with state["lock"]:
+        header = list(state["header"] or [])
+        rows = list(state["rows"])
+    if not header:
+        raise RuntimeError("스니펫 시트의 헤더를 읽을 수 없습니다.")
+    source = sheet_sources.SOURCES["snippets"]
+    time_index = header.index(source["time_column"])
+    name_index = header.index(source["name_column"])
+    # 아직 시트에 반영되지 않은 저장 건도 곧 추가되므로 중복으로 봅니다
+    keys = set(_row_keys(rows + write_queue.pending_rows("snippets"), time_index, name_index))
+    # 지난 연도 시트(Snippets_YYYY)로 옮긴 행도 이미 있는 것으로 봅니다
+    years = list(snippet_partitions.partitions(spreadsheet_id, client=client))
+    for values in snippet_partitions.partition_values(spreadsheet_id, years, client=client).values():
+        partition_header = list(values[0]) if values else []
+        if source["time_column"] in partition_header and source["name_column"] in partition_header:
+            keys.update(_row_keys(
+                values[1:], partition_header.index(source["time_column"]), partition_header.index(source["name_column"])
+            ))
+    columns = [column for column in header if column != sheets_batch.IDEMPOTENCY_COLUMN]
+    return columns, keys, time_index, name_index
+
+
+def reconcile(paths: list | None = None, client=None, dry_run: bool = False) -> dict:
+    """CSV 행 중 시트에 없는 것만 쓰기 대기열(write_queue)에 넣고 결과 통계를 반환합니다.
+
+    (타임스탬프, 이름)이 시트나 쓰기 대기열에 이미 있으면 건너뜁니다.
+    시트 반영은 쓰기 대기열이 멱등 키와 함께 하므로, 응답 전 시간 초과 뒤 재시도해도 행이 중복되지 않습니다.
+    """
+    paths = paths or [CSV_PATH]
+    stats = {"csv_rows": 0, "duplicates": 0, "queued": 0}
+    paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        return stats
+    client = client or sheets_client.get_google_sheets_client()
+    if not client:
+        raise RuntimeError("Google Sheets 클라이언트를 만들 수 없습니다.")
+    spreadsheet_id = sheet_sources.spreadsheet_id("snippets")
+    worksheet_name = sheet_sources.worksheet_name("snippets")
+    header, keys, time_index, name_index = _sheet_keys(spreadsheet_id, worksheet_name, client)
+
+    missing = []
+    for path in paths:
+        csv_rows = read_csv_rows(path, header)
+        for row, key in zip(csv_rows, _row_keys(csv_rows, time_index, name_index)):
+            stats["csv_rows"] += 1
+            if key in keys or not any(key):
+                stats["duplicates"] += 1
+                continue
+            keys.add(key)
+            missing.append(row)
+    if dry_run:
+        stats["queued"] = len(missing)
+        return stats
+    # 대기열 로그에 기록(fsync)되면 반영이 보장되므로 바로 완료로 표시합니다
+    write_queue.enqueue_many("snippets", missing)
+    stats["queued"] = len(missing)
+    _mark_done(paths)
+    return stats
+
+
+def _mark_done(paths: list):
+    state = _load_state()
+    for path in paths:
+        state[os.path.abspath(path)] = _file_signature(path)
+    _save_state(state)
+
+
+def needs_reconcile(path: str = CSV_PATH) -> bool:
+    """CSV가 있고 마지막으로 모두 반영한 뒤 바뀌었으면 True입니다."""
+    signature = _file_signature(path)
+    return signature is not None and _load_state().get(os.path.abspath(path)) != signature
+
+
+def _run():
+    global _worker
+    try:
+        reconcile([CSV_PATH])
+    except Exception:
+        pass
+    finally:
+        with _lock:
+            _worker = None
+
+
+def trigger():
+    """반영할 CSV가 있으면 백그라운드에서 한 번 대조합니다. (이미 실행 중이면 무시)"""
+    global _worker
+    if not needs_reconcile(CSV_PATH):
+        return
+    with _lock:
+        if _worker is not None:
+            return
+        _worker = threading.Thread(target=_run, name="snippet-reconcile", daemon=True)
+        _worker.start()
+
+
+def start():
+    """프로세스 시작 시 호출합니다. 지금 한 번, 그리고 회로가 다시 닫힐 때마다 대조합니다."""
+    sheets_breaker.on_close(trigger)
+    trigger()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 스니펫 CSV를 Google Sheets에 중복 없이 반영합니다.")
+    parser.add_argument("paths", nargs="*", default=[CSV_PATH], help=f"가져올 CSV 파일 (기본: {CSV_PATH})")
+    parser.add_argument("--dry-run", action="store_true", help="시트에 쓰지 않고 추가될 행 수만 출력")
+    args = parser.parse_args(argv)
+    try:
+        stats = reconcile(args.paths, dry_run=args.dry_run)
+    except ValueError as e:
+        print(e)
+        return 2
+    remaining = 0
+    if not args.dry_run:
+        deadline = time.monotonic() + DRAIN_SECONDS
+        while write_queue.pending_count() and time.monotonic() < deadline:
+            write_queue.flush_once()
+            time.sleep(1)
+        remaining = write_queue.pending_count()
+    print(
+        f"CSV {stats['csv_rows']}행: 중복 {stats['duplicates']}행, 추가 {stats['queued']}행, 대기열에 남음 {remaining}행"
+    )
+    return 0 if not remaining else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,214 @@
+import hashlib
+import itertools
+import threading
+import time
+
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+import sheet_decode
+import sheets_batch
+import sheets_client
+
+# 중간 행 수정/삭제를 잡기 위한 전체 재검사 주기(초)
+FULL_SCAN_INTERVAL_SECONDS = 30 * 60
+# 최근 기록 보기(recent_frame)에서 기본으로 읽는 마지막 데이터 행 수
+DEFAULT_WINDOW_ROWS = 1000
+# 서식 없는 값(날짜는 일련번호)으로 읽은 뒤 열 형식(타임스탬프는 datetime64, 점수는 Int8 등)을 입히는 스키마
+SCHEMA = sheet_decode.SCHEMAS["snippets"]
+
+_states_lock = threading.Lock()
+# (스프레드시트 ID, 워크시트 이름) -> 동기화 상태
+_states: dict = {}
+# 프로세스 전역 버전 발급기 (reset 이후에도 이전 버전과 겹치지 않도록)
+_versions = itertools.count(1)
+
+
+def _new_state() -> dict:
+    return {
+        "lock": threading.Lock(),
+        "header": None,       # 헤더 행 (1행)
+        "rows": [],           # 데이터 행 (2행부터, 헤더 폭에 맞춰 패딩)
+        "checksum": None,     # 마지막 전체 검사 시점의 내용 해시
+        "last_full_scan": 0.0,
+        "version": 0,         # 내용이 바뀔 때마다 새 번호 발급
+        "frame": None,        # version 기준으로 만든 DataFrame
+        "frame_version": -1,
+    }
+
+
+def _get_state(spreadsheet_id: str, worksheet_name: str) -> dict:
+    key = (spreadsheet_id, worksheet_name)
+    with _states_lock:
+        state = _states.get(key)
+        if state is None:
+            state = _states[key] = _new_state()
+        return state
+
+
+def _pad(row: list, width: int) -> list:
+    row = list(row)
+    if len(row) < width:
+        row += [""] * (width - len(row))
+    return row[:width]
+
+
+def _checksum(header: list, rows: list) -> str:
+    digest = hashlib.sha1()
+    for row in [header] + rows:
+        digest.update("\x1f".join(str(v) for v in row).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def _last_column(width: int) -> str:
+    """헤더 폭에 해당하는 마지막 열 문자를 반환합니다. (예: 15 -> 'O')"""
+    return "".join(ch for ch in rowcol_to_a1(1, max(1, width)) if ch.isalpha())
+
+
+def _full_scan(state: dict, spreadsheet_id: str, worksheet_name: str, client):
+    """시트 전체를 읽어 상태를 다시 만듭니다. 내용이 달라졌으면 버전을 올립니다."""
+    title = sheets_batch.quote_title(worksheet_name)
+    values = sheets_batch.batch_get_values(
+        spreadsheet_id, [title], client=client, params=sheets_batch.UNFORMATTED_PARAMS
+    )[0] or []
+    header = list(values[0]) if values else []
+    width = len(header)
+    rows = [_pad(row, width) for row in values[1:]]
+    checksum = _checksum(header, rows)
+    if checksum != state["checksum"]:
+        state["version"] = next(_versions)
+    state["header"] = header
+    state["rows"] = rows
+    state["checksum"] = checksum
+    state["last_full_scan"] = time.time()
+
+
+def _tail_scan(state: dict, spreadsheet_id: str, worksheet_name: str, client) -> bool:
+    """마지막으로 반영한 행부터 끝까지 읽어 새 행만 덧붙입니다.
+
+    첫 행(앵커)이 기억하고 있는 마지막 행과 다르면 중간 수정/삭제가 있었던 것이므로 False를 반환합니다.
+    """
+    header = state["header"]
+    rows = state["rows"]
+    width = len(header)
+    anchor_row = len(rows) + 1  # 헤더가 1행이므로 마지막 데이터 행 번호
+    anchor = rows[-1] if rows else header
+    tail_range = f"{sheets_batch.quote_title(worksheet_name)}!A{anchor_row}:{_last_column(width)}"
+    values = sheets_batch.batch_get_values(
+        spreadsheet_id, [tail_range], client=client, params=sheets_batch.UNFORMATTED_PARAMS
+    )[0] or []
+    if not values or _pad(values[0], width) != _pad(anchor, width):
+        return False
+    new_rows = [_pad(row, width) for row in values[1:]]
+    if new_rows:
+        rows.extend(new_rows)
+        state["version"] = next(_versions)
+    return True
+
+
+def sync(spreadsheet_id: str, worksheet_name: str = "Sheet1", client=None, force_full: bool = False) -> dict:
+    """스니펫 시트를 동기화하고 상태를 반환합니다.
+
+    평소에는 새로 추가된 행만 가져오고, 주기적으로(또는 앵커 불일치 시) 전체를 다시 읽어 검사합니다.
+    """
+    client = client or sheets_client.get_google_sheets_client()
+    state = _get_state(spreadsheet_id, worksheet_name)
+    # 같은 시트에 대한 동시 동기화는 한 번만 수행
+    with state["lock"]:
+        if not client:
+            return state
+        due = time.time() - state["last_full_scan"] >= FULL_SCAN_INTERVAL_SECONDS
+        if force_full or due or not state["header"]:
+            _full_scan(state, spreadsheet_id, worksheet_name, client)
+        elif not _tail_scan(state, spreadsheet_id, worksheet_name, client):
+            _full_scan(state, spreadsheet_id, worksheet_name, client)
+        return state
+
+
+def sync_frame(spreadsheet_id: str, worksheet_name: str = "Sheet1", client=None, force_full: bool = False) -> pd.DataFrame:
+    """동기화 후 get_all_records()와 같은 열의 DataFrame을 반환합니다. (열 형식은 sheet_decode.SCHEMAS["snippets"])
+
+    DataFrame은 버전이 바뀔 때만 새로 만들며, 호출자마다 복사본을 돌려줍니다.
+    df.attrs["sheet_version"]에 데이터 버전이 들어 있습니다.
+    """
+    state = sync(spreadsheet_id, worksheet_name, client=client, force_full=force_full)
+    with state["lock"]:
+        if state["frame_version"] != state["version"] or state["frame"] is None:
+            header = state["header"] or []
+            state["frame"] = sheet_decode.frame_from_values([header] + state["rows"], SCHEMA) if state["rows"] else pd.DataFrame()
+            state["frame_version"] = state["version"]
+        frame = state["frame"].copy()
+        version = state["version"]
+    frame.attrs["sheet_version"] = f"{spreadsheet_id}:{worksheet_name}:{version}"
+    return frame
+
+
+def _window_frame(header: list, rows: list, start_row: int) -> pd.DataFrame:
+    """헤더와 start_row행부터의 데이터 행으로 DataFrame을 만들고 행 번호와 범위 정보를 attrs에 기록합니다."""
+    frame = sheet_decode.frame_from_values([header] + rows, SCHEMA) if header and rows else pd.DataFrame()
+    frame.attrs["sheet_rows"] = list(range(start_row, start_row + len(frame)))
+    frame.attrs["window_start"] = start_row
+    # 2행(첫 데이터 행)부터 읽었으면 시트 전체를 가진 것입니다
+    frame.attrs["window_complete"] = start_row <= 2
+    return frame
+
+
+def recent_frame(spreadsheet_id: str, worksheet_name: str = "Sheet1", rows: int = DEFAULT_WINDOW_ROWS,
+                 client=None) -> pd.DataFrame:
+    """시트의 마지막 rows개 데이터 행만 DataFrame으로 반환합니다.
+
+    이 프로세스가 이미 전체를 동기화했으면 새 행만 확인한 뒤 그 상태에서 잘라내고,
+    아니면 시트의 행 수(그리드 크기) n을 보고 헤더와 A{n-rows+1}부터 끝까지만 batchGet 한 번으로 읽습니다.
+    (끝 행을 열어 두므로 캐시된 행 수가 오래되었어도 새로 추가된 행까지 받습니다)
+    시트 끝의 빈 행 때문에 모자라면 범위를 두 배씩 넓혀 다시 읽습니다.
+    df.attrs["window_complete"]가 False이면 더 오래된 기록이 남아 있습니다.
+    """
+    client = client or sheets_client.get_google_sheets_client()
+    rows = max(1, int(rows))
+    state = _get_state(spreadsheet_id, worksheet_name)
+    if state["header"] and client:
+        state = sync(spreadsheet_id, worksheet_name, client=client)
+        with state["lock"]:
+            all_rows = state["rows"]
+            start_index = max(0, len(all_rows) - rows)
+            return _window_frame(list(state["header"]), list(all_rows[start_index:]), start_index + 2)
+    if not client:
+        return pd.DataFrame()
+
+    worksheet = sheets_client.get_worksheet(spreadsheet_id, worksheet_name, client=client)
+    last_row = max(2, int(worksheet.row_count))
+    last_column = _last_column(int(worksheet.col_count))
+    title = sheets_batch.quote_title(worksheet_name)
+    span = rows
+    while True:
+        start_row = max(2, last_row - span + 1)
+        header_values, window_values = sheets_batch.batch_get_values(
+            spreadsheet_id, [f"{title}!1:1", f"{title}!A{start_row}:{last_column}"], client=client,
+            params=sheets_batch.UNFORMATTED_PARAMS,
+        )
+        header = list(header_values[0]) if header_values else []
+        width = len(header)
+        # 값 API는 끝의 빈 행을 잘라내므로, 받은 행은 start_row부터 이어집니다
+        window = [_pad(row, width) for row in (window_values or [])]
+        if len(window) >= rows or start_row <= 2:
+            break
+        span *= 2
+    offset = max(0, len(window) - rows)
+    return _window_frame(header, window[offset:], start_row + offset)
+
+
+def data_version(spreadsheet_id: str, worksheet_name: str = "Sheet1") -> int:
+    """마지막 동기화 기준 데이터 버전을 반환합니다. (동기화 전이면 0)"""
+    return _get_state(spreadsheet_id, worksheet_name)["version"]
+
+
+def reset(spreadsheet_id: str | None = None, worksheet_name: str | None = None):
+    """동기화 상태를 버립니다. 다음 호출에서 전체를 다시 읽습니다."""
+    with _states_lock:
+        for key in list(_states):
+            if spreadsheet_id is not None and key[0] != spreadsheet_id:
+                continue
+            if worksheet_name is not None and key[1] != worksheet_name:
+                continue
+            del _states[key]
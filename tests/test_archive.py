@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+import Archive
+import sheet_index
+
+
+def _sheet_frame():
+    df = pd.DataFrame({
+        "타임스탬프": pd.to_datetime(["2023-03-01", "2024-01-02", "2024-02-03", "2025-01-04"]),
+        "이름": ["a", "b", "a", "b"],
+        "오늘할일": ["a1", "b1", "a2", "b2"],
+    })
+    df.attrs["sheet_version"] = "test:archive:partitions"
+    return df
+
+
+def test_older_records_are_filtered_to_the_viewing_user_once(monkeypatch):
+    full = _sheet_frame()
+    # 다른 사용자가 먼저 같은 프레임을 조회해 이름 인덱스가 캐시된 상태
+    sheet_index.rows_for(full, "이름", "a")
+    monkeypatch.setattr(Archive, "st", SimpleNamespace(
+        session_state=SimpleNamespace(google_sheets_connected=True),
+        warning=lambda *args, **kwargs: None,
+    ))
+    monkeypatch.setattr(Archive, "get_snippets_from_google_sheets", lambda *args, **kwargs: full.copy())
+
+    df = Archive.get_snippets_with_fallback(lambda: None, "sid", user_name="b", since="2023-01-01")
+    # 화면에서 하는 사용자 필터
+    user_data = sheet_index.rows_for(df, "이름", "b")
+
+    assert user_data["오늘할일"].tolist() == ["b1", "b2"]
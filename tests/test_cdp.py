@@ -0,0 +1,60 @@
+import pytest
+
+import cdp
+
+
+class FakeWorksheet:
+    def __init__(self, rows):
+        self.rows = rows
+        self.requested = []
+
+    def batch_get(self, ranges):
+        self.requested.append(ranges)
+        result = []
+        for sheet_range in ranges:
+            row_number = int(sheet_range.split(":")[0])
+            row = self.rows[row_number - 1] if row_number <= len(self.rows) else None
+            result.append([row] if row else [])
+        return result
+
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cdp.sheets_mirror, "invalidate", calls.append)
+    return calls
+
+
+def test_columns_come_from_live_header(invalidated):
+    # 빈 헤더와 중복 헤더가 있어 DataFrame의 열 위치와 시트 열 위치가 다릅니다
+    worksheet = FakeWorksheet([
+        ["이름", "", "중장기계획", "중장기계획", " 올해계획 ", "내년계획"],
+        ["홍길동", "x", "old", "dup", "old", "old"],
+    ])
+
+    cells = cdp._live_cells(worksheet, 2, "이름", "홍길동", {"중장기계획": "L", "올해계획": "T", "내년계획": "N"})
+
+    assert cells == [(3, "L"), (5, "T"), (6, "N")]
+    assert invalidated == []
+
+
+def test_shifted_row_is_not_written(invalidated):
+    worksheet = FakeWorksheet([
+        ["이름", "중장기계획"],
+        ["김철수", "other"],
+        ["홍길동", "mine"],
+    ])
+
+    with pytest.raises(ValueError):
+        cdp._live_cells(worksheet, 2, "이름", "홍길동", {"중장기계획": "L"})
+
+    assert invalidated == ["cdp"]
+
+
+def test_missing_column_is_not_written(invalidated):
+    worksheet = FakeWorksheet([["이름", "올해계획"], ["홍길동", "old"]])
+
+    with pytest.raises(ValueError):
+        cdp._live_cells(worksheet, 2, "이름", "홍길동", {"중장기계획": "L"})
+
+    assert invalidated == ["cdp"]
@@ -0,0 +1,48 @@
+import pytest
+
+import drive_changes
+import sheet_sources
+import sheets_mirror
+
+
+@pytest.fixture
+def feed(tmp_path, monkeypatch):
+    path = tmp_path / "feed.jsonl"
+    monkeypatch.setenv(drive_changes.LOCAL_FEED_ENV, str(path))
+    monkeypatch.setattr(drive_changes, "STATE_PATH", str(tmp_path / "drive_changes.json"))
+    monkeypatch.setattr(sheets_mirror, "DB_PATH", str(tmp_path / "mirror.db"))
+    requested = []
+    monkeypatch.setattr(sheets_mirror, "request_sync", requested.append)
+    keys = list(sheet_sources.keys())
+    for key in keys:
+        sheets_mirror._store(key, ["이름"], [["a"]])
+    conn = sheets_mirror._connect()
+    conn.execute("UPDATE _mirror_meta SET synced_at = 1")
+    conn.commit()
+    conn.close()
+    drive_changes.poll_once()
+    return str(path), keys, requested
+
+
+def test_unchanged_sources_are_touched(feed):
+    _, keys, _ = feed
+
+    drive_changes.poll_once()
+
+    assert all(sheets_mirror.synced_at(key) > 1 for key in keys)
+
+
+def test_changed_source_stays_stale_until_synced(feed):
+    path, _, requested = feed
+    changed_id = sheet_sources.spreadsheet_id("idp")
+    assert changed_id
+    changed = [key for key in sheet_sources.keys() if sheet_sources.spreadsheet_id(key) == changed_id]
+    drive_changes.record_local_change(changed_id, path)
+
+    assert sorted(drive_changes.poll_once()) == sorted(changed)
+    assert set(changed) <= set(requested)
+    # 동기화가 실패해 아무것도 저장되지 않은 채 다음 확인이 와도 신선해지지 않아야 합니다
+    drive_changes.poll_once()
+
+    assert all(sheets_mirror.synced_at(key) == 0 for key in changed)
+    assert not sheets_mirror.is_fresh(changed[0])
@@ -0,0 +1,46 @@
+import pandas as pd
+
+import sheet_index
+
+
+def _frame(version):
+    df = pd.DataFrame({"이름": ["a", "b", "a", "c"], "값": [1, 2, 3, 4]})
+    df.attrs["sheet_version"] = version
+    return df
+
+
+def test_rows_for_matches_boolean_filter():
+    df = _frame("test:full")
+
+    assert sheet_index.rows_for(df, "이름", "a")["값"].tolist() == [1, 3]
+    assert sheet_index.rows_for(df, "이름", "없음").empty
+
+
+def test_subset_does_not_reuse_full_frame_positions():
+    df = _frame("test:subset")
+    sheet_index.rows_for(df, "이름", "a")
+
+    subset = sheet_index.rows_for(df, "이름", "a")
+    again = sheet_index.rows_for(subset, "이름", "a")
+
+    assert again["값"].tolist() == [1, 3]
+    assert sheet_index.rows_for(df.iloc[2:], "이름", "c")["값"].tolist() == [4]
+
+
+def test_sorted_frame_does_not_reuse_full_frame_positions():
+    df = _frame("test:sorted")
+    sheet_index.rows_for(df, "이름", "b")
+
+    ordered = df.sort_values("값", ascending=False)
+    reset = ordered.reset_index(drop=True)
+
+    assert sheet_index.rows_for(ordered, "이름", "b")["이름"].tolist() == ["b"]
+    assert sheet_index.rows_for(reset, "이름", "b")["값"].tolist() == [2]
+
+
+def test_copy_of_same_frame_uses_cached_positions():
+    df = _frame("test:copy")
+    sheet_index.rows_for(df, "이름", "a")
+
+    assert sheet_index.rows_for(df.copy(), "이름", "a")["값"].tolist() == [1, 3]
+    assert sheet_index._positions(df.copy(), "이름") is sheet_index._positions(df, "이름")
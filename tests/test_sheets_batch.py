@@ -0,0 +1,21 @@
+import json
+
+import sheet_decode
+import sheets_batch
+
+
+def test_typed_idp_records_are_json_serializable():
+    values = [
+        ["타임스탬프", "이름", "신청비용", "메모"],
+        [45678.5, "홍길동", "₩100,000 (2회)", "도서"],
+        ["", "김철수", "", ""],
+    ]
+    df = sheet_decode.frame_from_values(values, sheet_decode.SCHEMAS["idp"])
+
+    records = sheets_batch.to_records(df)
+
+    assert json.loads(json.dumps(records, ensure_ascii=False)) == records
+    assert records[0]["신청비용"] == 100000
+    assert records[0]["이름"] == "홍길동"
+    assert records[1]["타임스탬프"] == ""
+    assert records[1]["신청비용"] == ""
@@ -0,0 +1,138 @@
+from types import SimpleNamespace
+
+import pytest
+
+import sheets_breaker
+
+SHEETS_URL = f"https://{sheets_breaker.SHEETS_HOST}/v4/spreadsheets/sid"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sheets_breaker, "time", SimpleNamespace(time=clock.time))
+    monkeypatch.setattr(sheets_breaker, "_state", {
+        "state": sheets_breaker.STATE_CLOSED,
+        "failures": 0,
+        "opened_until": 0.0,
+        "open_seconds": sheets_breaker.OPEN_SECONDS,
+        "probing": False,
+    })
+    monkeypatch.setattr(sheets_breaker, "_on_close", [])
+    return clock
+
+
+def _open(times=sheets_breaker.FAILURE_THRESHOLD):
+    for _ in range(times):
+        sheets_breaker.record_failure()
+
+
+def test_opens_after_consecutive_429s(clock):
+    _open(sheets_breaker.FAILURE_THRESHOLD - 1)
+    assert sheets_breaker.state() == sheets_breaker.STATE_CLOSED
+
+    sheets_breaker.record_failure()
+
+    assert sheets_breaker.state() == sheets_breaker.STATE_OPEN
+    assert sheets_breaker.is_open()
+    with pytest.raises(sheets_breaker.CircuitOpenError):
+        sheets_breaker.before_request()
+
+
+def test_success_resets_the_failure_count(clock):
+    _open(sheets_breaker.FAILURE_THRESHOLD - 1)
+    sheets_breaker.record_success()
+    sheets_breaker.record_failure()
+
+    assert sheets_breaker.state() == sheets_breaker.STATE_CLOSED
+
+
+def test_half_open_lets_one_probe_through(clock):
+    _open()
+    clock.now += sheets_breaker.OPEN_SECONDS
+
+    assert not sheets_breaker.is_open()
+    sheets_breaker.before_request()
+    assert sheets_breaker.state() == sheets_breaker.STATE_HALF_OPEN
+    assert sheets_breaker.is_open()
+    with pytest.raises(sheets_breaker.CircuitOpenError):
+        sheets_breaker.before_request()
+
+
+def test_failed_probe_doubles_the_wait(clock):
+    _open()
+    clock.now += sheets_breaker.OPEN_SECONDS
+    sheets_breaker.before_request()
+
+    sheets_breaker.record_failure()
+
+    assert sheets_breaker.state() == sheets_breaker.STATE_OPEN
+    clock.now += sheets_breaker.OPEN_SECONDS
+    assert sheets_breaker.is_open()
+    clock.now += sheets_breaker.OPEN_SECONDS
+    assert not sheets_breaker.is_open()
+
+
+def test_retry_after_extends_the_open_period(clock):
+    _open(sheets_breaker.FAILURE_THRESHOLD - 1)
+    sheets_breaker.record_failure(retry_after=120)
+
+    clock.now += sheets_breaker.OPEN_SECONDS
+    assert sheets_breaker.is_open()
+
+
+def test_successful_probe_closes_and_notifies(clock):
+    closed = []
+    sheets_breaker.on_close(lambda: closed.append(1))
+    _open()
+    clock.now += sheets_breaker.OPEN_SECONDS
+    sheets_breaker.before_request()
+
+    sheets_breaker.record_success()
+
+    assert sheets_breaker.state() == sheets_breaker.STATE_CLOSED
+    assert closed == [1]
+    sheets_breaker.record_success()
+    assert closed == [1]
+
+
+def test_installed_session_trips_on_429_responses(clock):
+    responses = []
+
+    def request(method, url, *args, **kwargs):
+        responses.append(url)
+        return SimpleNamespace(status_code=429, headers={})
+
+    session = SimpleNamespace(request=request)
+    sheets_breaker.install(session)
+    for _ in range(sheets_breaker.FAILURE_THRESHOLD):
+        session.request("GET", SHEETS_URL)
+
+    with pytest.raises(sheets_breaker.CircuitOpenError):
+        session.request("GET", SHEETS_URL)
+    assert len(responses) == sheets_breaker.FAILURE_THRESHOLD
+    # Sheets API가 아닌 요청은 회로와 무관합니다
+    session.request("GET", "https://www.googleapis.com/drive/v3/files")
+    assert len(responses) == sheets_breaker.FAILURE_THRESHOLD + 1
+
+
+def test_network_error_releases_the_probe(clock):
+    def request(method, url, *args, **kwargs):
+        raise ConnectionError("reset")
+
+    session = SimpleNamespace(request=request)
+    sheets_breaker.install(session)
+    _open()
+    clock.now += sheets_breaker.OPEN_SECONDS
+
+    with pytest.raises(ConnectionError):
+        session.request("GET", SHEETS_URL)
+    assert not sheets_breaker.is_open()
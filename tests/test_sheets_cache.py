@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+import sheets_cache
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch, tmp_path):
+    revisions = {"sid": "r1"}
+    monkeypatch.setattr(sheets_cache, "revision", lambda spreadsheet_id, client=None: revisions.get(spreadsheet_id))
+    monkeypatch.setattr(sheets_cache, "SNAPSHOT_PATH", str(tmp_path / "snapshot.json.gz"))
+    monkeypatch.setattr(sheets_cache, "LEGACY_SNAPSHOT_PATH", str(tmp_path / "snapshot"))
+    sheets_cache._entries.clear()
+    yield revisions
+    sheets_cache._entries.clear()
+
+
+def test_callers_get_independent_copies():
+    sheets_cache.get("frame", "sid", lambda: pd.DataFrame({"a": [1, 2]}))
+    sheets_cache.get("rows", "sid", lambda: [["h"], ["v"]])
+
+    frame = sheets_cache.get("frame", "sid", lambda: None)
+    frame.loc[0, "a"] = 99
+    rows = sheets_cache.get("rows", "sid", lambda: None)
+    rows[1][0] = "changed"
+
+    assert sheets_cache.get("frame", "sid", lambda: None)["a"].tolist() == [1, 2]
+    assert sheets_cache.get("rows", "sid", lambda: None) == [["h"], ["v"]]
+
+
+def test_stale_value_marks_only_the_returned_copy(cache, monkeypatch):
+    monkeypatch.setattr(sheets_cache.threading, "Thread", lambda *args, **kwargs: type("T", (), {"start": lambda self: None})())
+    sheets_cache.get("frame", "sid", lambda: pd.DataFrame({"a": [1]}))
+    cache["sid"] = "r2"
+
+    stale = sheets_cache.get("frame", "sid", lambda: pd.DataFrame({"a": [2]}))
+
+    assert "as_of" in stale.attrs
+    assert "as_of" not in sheets_cache._entries["frame"][3].attrs
+
+
+def test_shared_returns_the_cached_object():
+    values = sheets_cache.get("rows", "sid", lambda: [["h"], ["v"]], shared=True)
+
+    assert sheets_cache.get("rows", "sid", lambda: None, shared=True) is values
+
+
+def test_none_from_loader_is_a_miss():
+    with pytest.raises(sheets_cache.LoadFailed):
+        sheets_cache.get("missing", "sid", lambda: None)
+
+    assert "missing" not in sheets_cache._entries
+
+
+def test_snapshot_round_trip_skips_users():
+    frame = pd.DataFrame({"이름": pd.Series(["a"], dtype="category"), "점수": pd.array([3], dtype="Int8")})
+    frame.attrs["sheet_rows"] = [2]
+    sheets_cache.get(("snippets", "sid"), "sid", lambda: frame)
+    sheets_cache.get(("snippet_partitions", "sid", (2023,)), "sid", lambda: {2023: [["이름"], ["a"]]})
+    sheets_cache.get(("users", "sid"), "sid", lambda: [["휴대폰번호", "비밀번호"], ["010", "secret"]])
+
+    sheets_cache.save_snapshot()
+    entries = {key: value for key, _, _, _, value in sheets_cache._load_snapshot()}
+
+    assert ("users", "sid") not in entries
+    assert entries[("snippet_partitions", "sid", (2023,))] == {2023: [["이름"], ["a"]]}
+    restored = entries[("snippets", "sid")]
+    assert restored.dtypes.tolist() == frame.dtypes.tolist()
+    assert restored.attrs["sheet_rows"] == [2]
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+import sheets_retry
+import sheets_singleflight
+
+
+class QuotaError(Exception):
+    def __init__(self):
+        super().__init__("429 quota exceeded")
+
+
+@pytest.fixture
+def render_thread(monkeypatch):
+    monkeypatch.setattr(sheets_retry, "on_render_thread", lambda: True)
+    monkeypatch.setattr(sheets_retry, "_backoff", lambda error, attempt: 0.05)
+
+
+def test_background_call_retries_until_success(monkeypatch):
+    monkeypatch.setattr(sheets_retry, "_backoff", lambda error, attempt: 0)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise QuotaError()
+        return "ok"
+
+    assert sheets_retry.run(flaky, name="test.flaky") == "ok"
+    assert len(attempts) == 3
+
+
+def test_render_write_retries_only_within_short_bound(render_thread, monkeypatch):
+    monkeypatch.setattr(sheets_retry, "RENDER_WRITE_RETRY_SECONDS", 0.2)
+    attempts = []
+
+    def always_limited():
+        attempts.append(threading.current_thread().name)
+        raise QuotaError()
+
+    started = time.monotonic()
+    with pytest.raises(QuotaError):
+        sheets_retry.call_write(always_limited)
+
+    assert time.monotonic() - started < 0.5
+    # 쓰기는 화면 스레드에서 그대로 실행되어 결과를 기다립니다
+    assert set(attempts) == {threading.current_thread().name}
+
+
+def test_slow_render_read_raises_still_running_on_retry_pool(render_thread, monkeypatch):
+    monkeypatch.setattr(sheets_retry, "RENDER_WAIT_SECONDS", 0.05)
+    release = threading.Event()
+    threads, delivered = [], []
+
+    def slow():
+        threads.append(threading.current_thread().name)
+        release.wait(2)
+        return "late"
+
+    with pytest.raises(sheets_retry.StillRunning) as raised:
+        sheets_retry.run(slow, name="test.slow", on_result=delivered.append)
+    release.set()
+
+    assert "429" not in str(raised.value) and "quota" not in str(raised.value)
+    for _ in range(100):
+        if delivered:
+            break
+        time.sleep(0.01)
+    assert delivered == ["late"]
+    assert threads[0].startswith("sheets-retry")
+
+
+def test_singleflight_follower_does_not_wait_forever(render_thread, monkeypatch):
+    monkeypatch.setattr(sheets_retry, "RENDER_WAIT_SECONDS", 0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def leader_call():
+        started.set()
+        release.wait(2)
+        return "shared"
+
+    leader = threading.Thread(target=lambda: sheets_singleflight.do("test.key", leader_call, timeout=5))
+    leader.start()
+    started.wait(1)
+    try:
+        with pytest.raises(sheets_retry.StillRunning):
+            sheets_singleflight.do("test.key", lambda: "follower")
+    finally:
+        release.set()
+        leader.join()
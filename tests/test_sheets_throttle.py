@@ -0,0 +1,101 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import sheets_throttle
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sheets_throttle, "time", SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(sheets_throttle, "_config", lambda: {"read": 60.0, "write": 60.0, "burst": 4.0, "reserve": 2.0})
+    monkeypatch.setattr(sheets_throttle, "_buckets", {})
+    monkeypatch.setattr(sheets_throttle, "_high_waiting", {"read": 0, "write": 0})
+    return clock
+
+
+def test_normal_requests_leave_the_priority_reserve(clock):
+    sheets_throttle.acquire("read")
+    sheets_throttle.acquire("read")
+
+    # 4개 중 2개는 우선 요청용으로 남겨 둡니다
+    assert sheets_throttle.wait_seconds("read") == pytest.approx(1.0)
+    with sheets_throttle.priority():
+        assert sheets_throttle.wait_seconds("read") == 0.0
+        sheets_throttle.acquire("read")
+        sheets_throttle.acquire("read")
+        assert sheets_throttle.wait_seconds("read") == pytest.approx(1.0)
+
+
+def test_tokens_refill_at_the_configured_rate(clock):
+    for _ in range(2):
+        sheets_throttle.acquire("write")
+    assert sheets_throttle.wait_seconds("write") > 0
+
+    clock.now += 1.0
+
+    assert sheets_throttle.wait_seconds("write") == 0.0
+    # 읽기와 쓰기는 서로 다른 버킷입니다
+    assert sheets_throttle.wait_seconds("read") == 0.0
+
+
+def test_waiting_priority_request_makes_normal_requests_yield(clock):
+    bucket = sheets_throttle._bucket("read")
+    sheets_throttle._high_waiting["read"] = 1
+
+    assert sheets_throttle.wait_seconds("read") > 0
+    with sheets_throttle.priority():
+        assert sheets_throttle.wait_seconds("read") == 0.0
+    assert bucket["tokens"] == 4.0
+
+
+def test_priority_is_scoped_to_the_block(clock):
+    with sheets_throttle.priority():
+        assert sheets_throttle._priority.get() == sheets_throttle.PRIORITY_HIGH
+    assert sheets_throttle._priority.get() == sheets_throttle.PRIORITY_NORMAL
+
+
+def test_request_kind():
+    base = f"https://{sheets_throttle.SHEETS_HOST}/v4/spreadsheets/sid"
+    assert sheets_throttle._request_kind("GET", f"{base}/values/A1") == "read"
+    assert sheets_throttle._request_kind("POST", f"{base}/values:batchGet?ranges=A1") == "read"
+    assert sheets_throttle._request_kind("POST", f"{base}/values:batchUpdate") == "write"
+    assert sheets_throttle._request_kind("GET", "https://www.googleapis.com/drive/v3/files") is None
+
+
+def test_install_takes_a_token_per_sheets_request(clock, monkeypatch):
+    taken = []
+    monkeypatch.setattr(sheets_throttle, "acquire", taken.append)
+    session = SimpleNamespace(request=lambda method, url, *args, **kwargs: "response")
+
+    sheets_throttle.install(session)
+    sheets_throttle.install(session)
+    session.request("GET", f"https://{sheets_throttle.SHEETS_HOST}/v4/spreadsheets/sid")
+    session.request("GET", "https://www.googleapis.com/drive/v3/files")
+    session.request("POST", f"https://{sheets_throttle.SHEETS_HOST}/v4/x", _credential_refresh_attempt=1)
+
+    assert taken == ["read"]
+
+
+def test_acquire_blocks_until_refill(monkeypatch):
+    monkeypatch.setattr(sheets_throttle, "_config", lambda: {"read": 600.0, "write": 600.0, "burst": 1.0, "reserve": 0.0})
+    monkeypatch.setattr(sheets_throttle, "_buckets", {})
+    sheets_throttle.acquire("read")
+    done = threading.Event()
+
+    worker = threading.Thread(target=lambda: (sheets_throttle.acquire("read"), done.set()))
+    worker.start()
+    worker.join(2)
+
+    # 초당 10개 속도이므로 0.1초쯤 기다린 뒤 얻습니다
+    assert done.is_set()
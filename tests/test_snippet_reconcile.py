@@ -0,0 +1,73 @@
+import pytest
+
+import snippet_reconcile
+
+LEGACY_HEADER = [
+    "타임스탬프", "이름", "몸상태", "마음상태", "상태이유", "개선방안",
+    "전일업무", "전일만족도", "좋았던점", "아쉬웠던점", "배웠던점",
+    "향후시도", "바라는점", "동료칭찬", "오늘할일",
+]
+
+
+def _sheet_header():
+    # 시트는 같은 순서지만 일부 열 이름이 다릅니다
+    header = list(LEGACY_HEADER)
+    header[6] = "[Look-back] 전날 한 일"
+    header[13] = "[Praise] 동료 칭찬"
+    return header
+
+
+def _write_csv(path, header, rows):
+    lines = [",".join(header)] + [",".join(row) for row in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_legacy_header_is_mapped_by_position(tmp_path):
+    row = ["2024-01-09 12:00:00", "홍길동", "3", "4", "피곤", "휴식", "보고서 작성", "5",
+           "좋음", "아쉬움", "배움", "시도", "바람", "동료에게 감사", "회의"]
+    csv_path = tmp_path / "daily_snippets.csv"
+    _write_csv(csv_path, LEGACY_HEADER, [row])
+
+    rows = snippet_reconcile.read_csv_rows(str(csv_path), _sheet_header())
+
+    assert rows == [row]
+
+
+def test_same_names_in_other_order_are_mapped_by_name(tmp_path):
+    csv_path = tmp_path / "daily_snippets.csv"
+    _write_csv(csv_path, ["이름", "타임스탬프"], [["홍길동", "2024-01-09 12:00:00"]])
+
+    rows = snippet_reconcile.read_csv_rows(str(csv_path), ["타임스탬프", "이름", "몸상태"])
+
+    assert rows == [["2024-01-09 12:00:00", "홍길동", ""]]
+
+
+def test_unmatched_header_refuses_to_run(tmp_path):
+    csv_path = tmp_path / "daily_snippets.csv"
+    _write_csv(csv_path, ["이름", "타임스탬프", "메모"], [["홍길동", "2024-01-09 12:00:00", "x"]])
+
+    with pytest.raises(ValueError, match="메모"):
+        snippet_reconcile.read_csv_rows(str(csv_path), ["타임스탬프", "이름", "몸상태"])
+
+
+def test_missing_rows_go_through_the_write_queue(tmp_path, monkeypatch):
+    header = ["타임스탬프", "이름", "오늘할일"]
+    csv_path = tmp_path / "daily_snippets.csv"
+    _write_csv(csv_path, header, [
+        ["2024-01-09 12:00:00", "홍길동", "이미 있음"],
+        ["2024-01-10 12:00:00", "홍길동", "새 행"],
+    ])
+    queued = []
+    monkeypatch.setattr(snippet_reconcile, "STATE_PATH", str(tmp_path / "state.json"))
+    monkeypatch.setattr(snippet_reconcile.sheets_client, "get_google_sheets_client", lambda: object())
+    monkeypatch.setattr(
+        snippet_reconcile, "_sheet_keys",
+        lambda *args: (header, {("2024-01-09 12:00:00", "홍길동")}, 0, 1),
+    )
+    monkeypatch.setattr(snippet_reconcile.write_queue, "enqueue_many", lambda source, rows: queued.append((source, rows)))
+
+    stats = snippet_reconcile.reconcile([str(csv_path)])
+
+    assert stats == {"csv_rows": 2, "duplicates": 1, "queued": 1}
+    assert queued == [("snippets", [["2024-01-10 12:00:00", "홍길동", "새 행"]])]
+    assert not snippet_reconcile.needs_reconcile(str(csv_path))
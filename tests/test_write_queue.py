@@ -0,0 +1,180 @@
+import pytest
+from gspread.exceptions import WorksheetNotFound
+
+import sheets_batch
+import write_queue
+
+KEY = sheets_batch.IDEMPOTENCY_COLUMN
+
+
+class FakeWorksheet:
+    title = "Sheet1"
+
+    def __init__(self, header):
+        self.rows = [list(header)]
+        self.col_count = max(len(header), 1)
+        self.fail_after_append = False
+        self.append_calls = 0
+
+    def row_values(self, row):
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def add_cols(self, count):
+        self.col_count += count
+
+    def update_cell(self, row, col, value):
+        line = self.rows[row - 1]
+        line.extend([""] * (col - len(line)))
+        line[col - 1] = value
+
+    def hide_columns(self, start, end):
+        pass
+
+    def col_values(self, col):
+        return [row[col - 1] if len(row) >= col else "" for row in self.rows]
+
+    def append_rows(self, rows):
+        self.append_calls += 1
+        self.rows.extend(list(row) for row in rows)
+        if self.fail_after_append:
+            self.fail_after_append = False
+            # 서버에는 반영됐지만 응답을 받지 못한 경우
+            raise TimeoutError("read timed out")
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_queue, "WAL_PATH", str(tmp_path / "wal.jsonl"))
+    monkeypatch.setattr(write_queue.sheets_cache, "bump", lambda spreadsheet_id: None)
+    monkeypatch.setattr(write_queue.sheets_mirror, "invalidate", lambda source: None)
+    monkeypatch.setattr(write_queue.sheets_breaker, "is_open", lambda: False)
+    monkeypatch.setattr(write_queue, "start", lambda: None)
+    monkeypatch.setattr(write_queue, "_pending", [])
+    monkeypatch.setattr(write_queue, "_dead", [])
+    monkeypatch.setattr(write_queue, "_backoff", {})
+    monkeypatch.setattr(write_queue, "_unconfirmed", set())
+    monkeypatch.setattr(write_queue, "_key_columns", {})
+    monkeypatch.setattr(write_queue, "_loaded", False)
+    worksheet = FakeWorksheet(["타임스탬프", "이름", KEY])
+    monkeypatch.setattr(write_queue.sheets_client, "get_worksheet", lambda *args, **kwargs: worksheet)
+    return worksheet
+
+
+def _restart(monkeypatch):
+    """프로세스 재시작처럼 메모리 상태를 비우고 로그에서 다시 복구합니다."""
+    monkeypatch.setattr(write_queue, "_pending", [])
+    monkeypatch.setattr(write_queue, "_dead", [])
+    monkeypatch.setattr(write_queue, "_unconfirmed", set())
+    monkeypatch.setattr(write_queue, "_loaded", False)
+
+
+def _data_rows(worksheet):
+    return worksheet.rows[1:]
+
+
+def test_flush_appends_rows_with_idempotency_key(queue, monkeypatch):
+    entry_id = write_queue.enqueue("snippets", ["2024-01-09 12:00:00", "홍길동"])
+
+    assert write_queue.pending_rows("snippets") == [["2024-01-09 12:00:00", "홍길동"]]
+    assert write_queue.flush_once() == 1
+    assert _data_rows(queue) == [["2024-01-09 12:00:00", "홍길동", entry_id]]
+    _restart(monkeypatch)
+    assert write_queue.pending_count() == 0
+
+
+def test_replayed_entries_are_checked_before_resending(queue, monkeypatch):
+    entry_id = write_queue.enqueue("snippets", ["2024-01-09 12:00:00", "홍길동"])
+    # 재시작 전에 보내서 이미 시트에 있는 항목
+    queue.rows.append(["2024-01-09 12:00:00", "홍길동", entry_id])
+    _restart(monkeypatch)
+
+    assert write_queue.pending_count() == 1
+    assert write_queue.flush_once() == 1
+    assert queue.append_calls == 0
+    assert len(_data_rows(queue)) == 1
+
+
+def test_timeout_after_applied_append_does_not_duplicate(queue):
+    write_queue.enqueue("snippets", ["2024-01-09 12:00:00", "홍길동"])
+    queue.fail_after_append = True
+
+    assert write_queue.flush_once() == 0
+    assert write_queue.pending_count() == 1
+    write_queue._backoff.clear()
+    assert write_queue.flush_once() == 1
+
+    assert queue.append_calls == 1
+    assert len(_data_rows(queue)) == 1
+
+
+def test_transient_failure_backs_off_and_keeps_entry(queue, monkeypatch):
+    write_queue.enqueue("snippets", ["2024-01-09 12:00:00", "홍길동"])
+    monkeypatch.setattr(queue, "append_rows", lambda rows: (_ for _ in ()).throw(ConnectionError("reset")))
+
+    assert write_queue.flush_once() == 0
+    assert write_queue.pending_count() == 1
+    assert write_queue.dead_letters() == []
+    assert write_queue._backoff
+
+
+def test_permanent_failure_moves_to_dead_letters(queue, monkeypatch):
+    def missing(*args, **kwargs):
+        raise WorksheetNotFound("Sheet1")
+
+    monkeypatch.setattr(write_queue.sheets_client, "get_worksheet", missing)
+    write_queue.enqueue("snippets", ["2024-01-09 12:00:00", "홍길동"])
+
+    assert write_queue.flush_once() == 0
+    assert write_queue.pending_count() == 0
+    assert "WorksheetNotFound" in write_queue.dead_letters()[0]["error"]
+
+    _restart(monkeypatch)
+    assert write_queue.pending_count() == 0
+    assert len(write_queue.dead_letters()) == 1
+
+    assert write_queue.retry_dead() == 1
+    assert write_queue.pending_count() == 1
+    _restart(monkeypatch)
+    assert write_queue.pending_count() == 1
+    assert write_queue.dead_letters() == []
+
+
+def test_discarded_dead_letters_stay_discarded(queue, monkeypatch):
+    monkeypatch.setattr(write_queue.sheets_client, "get_worksheet", lambda *a, **k: (_ for _ in ()).throw(WorksheetNotFound("x")))
+    write_queue.enqueue("snippets", ["a", "b"])
+    write_queue.flush_once()
+
+    assert write_queue.discard_dead() == 1
+    _restart(monkeypatch)
+    assert write_queue.dead_letters() == []
+    assert write_queue.pending_count() == 0
+
+
+def test_missing_key_column_is_created(queue):
+    queue.rows = [["타임스탬프", "이름"]]
+    queue.col_count = 2
+    entry_id = write_queue.enqueue("snippets", ["2024-01-09 12:00:00", "홍길동"])
+
+    write_queue.flush_once()
+
+    assert queue.rows[0] == ["타임스탬프", "이름", KEY]
+    assert _data_rows(queue) == [["2024-01-09 12:00:00", "홍길동", entry_id]]
+
+
+def test_empty_header_is_not_appended_without_key(queue):
+    queue.rows = [[]]
+    write_queue.enqueue("snippets", ["2024-01-09 12:00:00", "홍길동"])
+
+    write_queue.flush_once()
+
+    assert queue.append_calls == 0
+    assert "MissingHeader" in write_queue.dead_letters()[0]["error"]
+
+
+def test_open_circuit_leaves_queue_untouched(queue, monkeypatch):
+    monkeypatch.setattr(write_queue.sheets_breaker, "is_open", lambda: True)
+    write_queue.enqueue("snippets", ["a", "b"])
+
+    assert write_queue.flush_once() == 0
+    assert queue.append_calls == 0
+    assert write_queue.pending_count() == 1
@@ -0,0 +1,218 @@
+import hashlib
+import threading
+
+from gspread.utils import fill_gaps, rowcol_to_a1
+
+import sheet_sources
+import sheets_batch
+import sheets_cache
+import sheets_client
+import sheets_mirror
+import sheets_throttle
+
+# 통일된 사용자 정보 키 -> 시트 헤더
+FIELDS = {
+    "phone": "휴대폰번호",
+    "password": "비밀번호",
+    "name": "이름(본명)",
+    "email": "회사메일",
+    "role": "권한",
+    "timestamp": "타임스탬프",
+    "display": "표시여부",
+}
+
+_lock = threading.Lock()
+# 마지막으로 만든 디렉터리 (시트 내용이 바뀔 때만 다시 만듭니다)
+_directory: dict | None = None
+
+
+def normalize_phone(value) -> str:
+    """비교용 휴대폰번호: 숫자만 남기고 앞자리 0을 제거합니다. (시트에서 0이 빠진 경우 대응)"""
+    return "".join(ch for ch in str(value or "") if ch.isdigit()).lstrip("0")
+
+
+def _build(values: list) -> dict:
+    """시트 값으로 레코드 목록과 휴대폰번호/이메일/이름 인덱스를 만듭니다.
+
+    값은 숫자로 바꾸지 않고 문자열 그대로 둡니다. (비밀번호 등의 앞자리 0 보존)
+    """
+    rows = fill_gaps(values) if values else []
+    header = [str(h) for h in rows[0]] if rows else []
+    records, row_numbers = [], []
+    by_phone, by_email, by_name = {}, {}, {}
+    for row_number, row in enumerate(rows[1:], start=2):
+        record = dict(zip(header, row))
+        position = len(records)
+        records.append(record)
+        row_numbers.append(row_number)
+        phone = normalize_phone(record.get(FIELDS["phone"]))
+        if phone:
+            by_phone.setdefault(phone, []).append(position)
+        email = str(record.get(FIELDS["email"], "")).strip()
+        if email:
+            by_email.setdefault(email, position)
+        name = str(record.get(FIELDS["name"], "")).strip()
+        if name:
+            by_name.setdefault(name, position)
+    return {
+        "header": header,
+        "records": records,
+        "row_numbers": row_numbers,
+        "by_phone": by_phone,
+        "by_email": by_email,
+        "by_name": by_name,
+    }
+
+
+def _checksum(values: list) -> str:
+    digest = hashlib.sha1()
+    for row in values:
+        digest.update("\x1f".join(str(v) for v in row).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def load(client=None, retry=None) -> dict | None:
+    """사용자 디렉터리를 반환합니다.
+
+    시트 값(FIELDS에 있는 열만)은 리비전 기반 공유 캐시(sheets_cache)에서 가져오며, 값이 바뀌었을 때만 인덱스를 다시 만듭니다.
+    읽기에 실패하면 마지막 디렉터리를 반환합니다.
+    """
+    global _directory
+    with _lock:
+        directory = _directory
+    client = client or sheets_client.get_google_sheets_client()
+    if not client:
+        return directory
+    spreadsheet_id = sheet_sources.spreadsheet_id("users")
+    call = retry or (lambda fn, *args, **kwargs: fn(*args, **kwargs))
+
+    def _fetch_values():
+        # 로그인/대상자 목록에 쓰는 열(FIELDS)만 읽습니다
+        return call(
+            sheets_batch.projected_values, spreadsheet_id, sheet_sources.worksheet_name("users"),
+            list(FIELDS.values()), client=client,
+        ) or []
+
+    try:
+        # 값은 읽기만 하므로 복사하지 않은 공유 값을 받아 같은 객체면 인덱스를 다시 만들지 않습니다
+        values = sheets_cache.get(("users", spreadsheet_id), spreadsheet_id, _fetch_values, client=client, shared=True)
+    except Exception:
+        if directory is None:
+            raise
+        return directory
+
+    with _lock:
+        if _directory is not None and _directory["values"] is values:
+            return _directory
+        checksum = _checksum(values)
+        if _directory is None or _directory["checksum"] != checksum:
+            _directory = _build(values)
+            _directory["checksum"] = checksum
+        _directory["values"] = values
+        return _directory
+
+
+def invalidate():
+    """다음 조회에서 사용자 시트를 다시 읽도록 합니다."""
+    sheets_cache.bump(sheet_sources.spreadsheet_id("users"))
+
+
+def records(client=None, retry=None) -> list:
+    """사용자 시트의 모든 레코드를 반환합니다. (FIELDS에 있는 열만, 값은 문자열)"""
+    directory = load(client=client, retry=retry)
+    return list(directory["records"]) if directory else []
+
+
+def to_user_info(record: dict) -> dict:
+    """시트 레코드를 통일된 키의 사용자 정보로 변환합니다."""
+    info = {key: str(record.get(column, "")).strip() for key, column in FIELDS.items()}
+    info["role"] = info["role"] or "user"
+    return info
+
+
+def find_by_phone(phone: str, password: str | None = None, client=None, retry=None) -> dict | None:
+    """휴대폰번호(와 비밀번호)로 사용자 레코드를 찾습니다."""
+    directory = load(client=client, retry=retry)
+    if not directory:
+        return None
+    for position in directory["by_phone"].get(normalize_phone(phone), []):
+        record = directory["records"][position]
+        if password is None or str(record.get(FIELDS["password"], "")).strip() == str(password).strip():
+            return record
+    return None
+
+
+def find_phone(email: str | None = None, name: str | None = None, client=None, retry=None) -> str | None:
+    """이메일 우선, 없으면 이름으로 사용자를 찾아 휴대폰번호를 반환합니다."""
+    directory = load(client=client, retry=retry)
+    if not directory:
+        return None
+    position = None
+    if email:
+        position = directory["by_email"].get(str(email).strip())
+    if position is None and name:
+        position = directory["by_name"].get(str(name).strip())
+    if position is None:
+        return None
+    return str(directory["records"][position].get(FIELDS["phone"], "")).strip() or None
+
+
+def update_user(phone: str, values: dict, client=None, retry=None) -> bool:
+    """휴대폰번호로 찾은 사용자 행의 필드들을 batch_update 한 번으로 수정합니다. (RAW 기록으로 앞자리 0 보존)
+
+    values는 {통일된 키: 값} (예: {"email": ..., "password": ...})입니다.
+    성공하면 로컬 디렉터리와 미러의 같은 행도 제자리에서 고칩니다.
+    """
+    directory = load(client=client, retry=retry)
+    if not directory:
+        return False
+    positions = directory["by_phone"].get(normalize_phone(phone), [])
+    if not positions:
+        return False
+    position = positions[0]
+    row_number = directory["row_numbers"][position]
+    header = directory["header"]
+    changes = {FIELDS[key]: value for key, value in values.items() if FIELDS.get(key) in header}
+    if not changes:
+        return True
+
+    client = client or sheets_client.get_google_sheets_client()
+    if not client:
+        return False
+    call = retry or (lambda fn, *args, **kwargs: fn(*args, **kwargs))
+
+    def _update():
+        spreadsheet_id = sheet_sources.spreadsheet_id("users")
+        worksheet_name = sheet_sources.worksheet_name("users")
+        # 디렉터리는 일부 열만 가지므로 실제 열 위치는 시트 헤더에서 찾습니다
+        sheet_header = sheets_batch.header_row(spreadsheet_id, worksheet_name, client=client)
+        if any(column not in sheet_header for column in changes):
+            sheet_header = sheets_batch.header_row(spreadsheet_id, worksheet_name, client=client, refresh=True)
+        worksheet = sheets_client.get_worksheet(spreadsheet_id, worksheet_name, client=client)
+        worksheet.batch_update(
+            [
+                {"range": rowcol_to_a1(row_number, sheet_header.index(column) + 1), "values": [[value]]}
+                for column, value in changes.items()
+            ]
+        )
+
+    with sheets_throttle.priority():
+        call(_update)
+
+    with _lock:
+        record = directory["records"][position]
+        for column, value in changes.items():
+            old_value = str(record.get(column, "")).strip()
+            record[column] = value
+            if column == FIELDS["email"]:
+                if directory["by_email"].get(old_value) == position:
+                    del directory["by_email"][old_value]
+                if str(value).strip():
+                    directory["by_email"].setdefault(str(value).strip(), position)
+        # 시트 내용이 바뀌었으므로 다음 조회 때 인덱스를 다시 만들도록 체크섬을 비웁니다
+        directory["checksum"] = None
+        directory["values"] = None
+    if not sheets_mirror.patch("users", row_number, changes):
+        sheets_mirror.invalidate("users")
+    return True
@@ -0,0 +1,406 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+import pandas as pd
+from gspread.exceptions import SpreadsheetNotFound, WorksheetNotFound
+from gspread.utils import numericise_all
+
+import sheet_decode
+import sheet_sources
+import sheets_batch
+import sheets_breaker
+import sheets_cache
+import sheets_client
+import sheets_mirror
+import sheets_retry
+import sheets_throttle
+
+# 시트 쓰기 선기록(write-ahead) 로그: 한 줄에 JSON 하나 (append / commit)
+WAL_PATH = "write_ahead_log.jsonl"
+# 한 번의 append_rows로 보낼 최대 행 수
+FLUSH_BATCH_SIZE = 100
+# 새 행이 없을 때 재확인 주기(초)
+FLUSH_INTERVAL_SECONDS = 2
+# 실패한 시트는 이 간격부터 두 배씩 늘려 최대 MAX_BACKOFF_SECONDS까지 기다렸다가 재시도
+BASE_BACKOFF_SECONDS = 2
+MAX_BACKOFF_SECONDS = 120
+# 모두 반영된 로그가 이 크기를 넘으면 비웁니다
+COMPACT_BYTES = 256 * 1024
+# 다시 보내도 성공하지 않는 오류의 상태 코드 (잘못된 범위, 권한 없음, 삭제된 시트)
+PERMANENT_STATUS = {400, 403, 404}
+
+_lock = threading.Lock()
+_wakeup = threading.Event()
+# 아직 시트에 반영되지 않은 항목 (기록 순서 유지)
+_pending: list = []
+# 재시도해도 반영할 수 없어 보류한 항목 (설정 페이지에서 다시 시도하거나 버립니다)
+_dead: list = []
+_loaded = False
+_flusher = None
+# (스프레드시트 ID, 워크시트) -> (다음 시도 시각, 현재 대기 초)
+_backoff: dict = {}
+# 시트에 보냈지만 반영 여부를 확인하지 못한 항목 ID (응답 전 시간 초과, 재시작 전 전송 등)
+_unconfirmed: set = set()
+# (스프레드시트 ID, 워크시트) -> 멱등 키 열 번호(1부터)
+_key_columns: dict = {}
+
+
+class MissingHeader(Exception):
+    """워크시트 첫 행에 헤더가 없어 멱등 키 열을 둘 위치를 정할 수 없을 때 발생합니다. (항목은 보류 목록으로 이동)"""
+
+
+def _write_lines(entries: list):
+    """로그에 항목들을 덧붙이고 디스크에 fsync합니다. (_lock 보유 상태에서 호출)"""
+    with open(WAL_PATH, "a", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _load():
+    """로그를 읽어 commit 표시가 없는 항목을 대기열(보류 표시가 있으면 보류 목록)로 복구합니다. (_lock 보유 상태에서 호출)"""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    if not os.path.exists(WAL_PATH):
+        return
+    appends, dead = {}, {}
+    with open(WAL_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # 기록 도중 중단된 마지막 줄은 무시
+                continue
+            op, ids = entry.get("op"), entry.get("ids", [])
+            if op == "append":
+                appends[entry["id"]] = entry
+            elif op == "commit":
+                for entry_id in ids:
+                    appends.pop(entry_id, None)
+                    dead.pop(entry_id, None)
+            elif op == "dead":
+                dead.update((entry_id, {"error": entry.get("error"), "failed_at": entry.get("failed_at")}) for entry_id in ids)
+            elif op == "retry":
+                for entry_id in ids:
+                    dead.pop(entry_id, None)
+    for entry_id, entry in appends.items():
+        if entry_id in dead:
+            _dead.append({**entry, **dead[entry_id]})
+        else:
+            _pending.append(entry)
+    # 중단 전에 이미 보냈을 수 있으므로 다시 보내기 전에 시트의 멱등 키로 확인합니다
+    _unconfirmed.update(e["id"] for e in _pending)
+
+
+def _compact():
+    """대기/보류 항목이 없고 로그가 커졌으면 로그를 비웁니다. (_lock 보유 상태에서 호출)"""
+    if _pending or _dead:
+        return
+    try:
+        if os.path.getsize(WAL_PATH) > COMPACT_BYTES:
+            with open(WAL_PATH, "w", encoding="utf-8") as f:
+                f.flush()
+                os.fsync(f.fileno())
+    except OSError:
+        pass
+
+
+def enqueue(source: str, row: list) -> str:
+    """행을 로그에 기록(fsync)한 뒤 곧바로 반환합니다. 시트 반영은 백그라운드에서 이루어집니다.
+
+    source는 sheet_sources의 키(snippets, idp, oneon1 등)입니다.
+    반환값(항목 ID)은 시트의 숨김 열에 멱등 키로 함께 기록되어, 재시도해도 행이 중복되지 않습니다.
+    """
+    return enqueue_many(source, [row])[0]
+
+
+def enqueue_many(source: str, rows: list) -> list:
+    """여러 행을 한 번의 fsync로 로그에 기록하고 항목 ID 목록을 반환합니다. (enqueue와 같은 방식으로 반영)"""
+    if not rows:
+        return []
+    spreadsheet_id = sheet_sources.spreadsheet_id(source)
+    worksheet = sheet_sources.worksheet_name(source)
+    queued_at = time.time()
+    entries = [
+        {
+            "op": "append",
+            "id": uuid.uuid4().hex,
+            "source": source,
+            "spreadsheet_id": spreadsheet_id,
+            "worksheet": worksheet,
+            "row": list(row),
+            "queued_at": queued_at,
+        }
+        for row in rows
+    ]
+    with _lock:
+        _load()
+        _write_lines(entries)
+        _pending.extend(entries)
+    # 대기 행이 읽기 결과에 바로 붙도록 해당 시트 캐시를 무효화
+    sheets_cache.bump(spreadsheet_id)
+    start()
+    _wakeup.set()
+    return [entry["id"] for entry in entries]
+
+
+def pending_rows(source: str) -> list:
+    """아직 시트에 반영되지 않은 source의 행 목록을 반환합니다."""
+    with _lock:
+        _load()
+        return [list(e["row"]) for e in _pending if e["source"] == source]
+
+
+def pending_count() -> int:
+    with _lock:
+        _load()
+        return len(_pending)
+
+
+def dead_letters() -> list:
+    """반영할 수 없어 보류한 항목 목록 [{id, source, worksheet, row, error, failed_at}]을 반환합니다."""
+    with _lock:
+        _load()
+        return [
+            {field: e.get(field) for field in ("id", "source", "worksheet", "row", "error", "failed_at")}
+            for e in _dead
+        ]
+
+
+def retry_dead(ids: list | None = None) -> int:
+    """보류한 항목(ids가 없으면 전부)을 대기열로 되돌립니다. (시트/권한 문제를 고친 뒤 사용) 되돌린 수를 반환합니다."""
+    with _lock:
+        _load()
+        entries = [e for e in _dead if ids is None or e["id"] in ids]
+        if not entries:
+            return 0
+        moved = {e["id"] for e in entries}
+        _write_lines([{"op": "retry", "ids": sorted(moved), "retried_at": time.time()}])
+        _dead[:] = [e for e in _dead if e["id"] not in moved]
+        for entry in entries:
+            _pending.append({k: v for k, v in entry.items() if k not in ("error", "failed_at")})
+            _backoff.pop((entry["spreadsheet_id"], entry["worksheet"]), None)
+            _key_columns.pop((entry["spreadsheet_id"], entry["worksheet"]), None)
+    _wakeup.set()
+    return len(entries)
+
+
+def discard_dead(ids: list | None = None) -> int:
+    """보류한 항목(ids가 없으면 전부)을 버립니다. 버린 수를 반환합니다."""
+    with _lock:
+        _load()
+        discarded = {e["id"] for e in _dead if ids is None or e["id"] in ids}
+        if not discarded:
+            return 0
+        _write_lines([{"op": "commit", "ids": sorted(discarded), "committed_at": time.time(), "discarded": True}])
+        _dead[:] = [e for e in _dead if e["id"] not in discarded]
+        _unconfirmed.difference_update(discarded)
+        _compact()
+    return len(discarded)
+
+
+def overlay(df: pd.DataFrame | None, source: str, name: str | None = None, name_column: str | None = None) -> pd.DataFrame | None:
+    """시트에서 읽은 DataFrame 뒤에 아직 반영되지 않은 행을 붙여 반환합니다.
+
+    name이 있으면 name_column(기본: 소스의 이름 열) 값이 같은 행만 붙입니다.
+    """
+    with _lock:
+        _load()
+        entries = [e for e in _pending if e["source"] == source]
+    if not entries or df is None or len(df.columns) == 0:
+        return df
+    columns = list(df.columns)
+    name_column = name_column or sheet_sources.SOURCES.get(source, {}).get("name_column")
+    records = []
+    for entry in entries:
+        row = (list(entry["row"]) + [""] * len(columns))[:len(columns)]
+        record = dict(zip(columns, numericise_all([str(v) for v in row])))
+        if name is not None and name_column in record and str(record[name_column]) != str(name):
+            continue
+        records.append(record)
+    if not records:
+        return df
+    pending = pd.DataFrame(records, columns=columns)
+    # 대기 행의 문자열도 시트에서 읽은 열 형식(datetime64, Int8, category 등)으로 맞춥니다
+    pending = sheet_decode.conform(pending, df)
+    merged = sheet_decode.restore_categories(pd.concat([df, pending], ignore_index=True), df)
+    merged.attrs = dict(df.attrs)
+    if merged.attrs.get("sheet_version"):
+        merged.attrs["sheet_version"] += f"+pending:{entries[-1]['id']}"
+    return merged
+
+
+def _next_batch():
+    """재시도 대기 중이 아닌 시트 하나의 (키, 항목 목록)을 고릅니다."""
+    now = time.time()
+    with _lock:
+        for entry in _pending:
+            key = (entry["spreadsheet_id"], entry["worksheet"])
+            if _backoff.get(key, (0, 0))[0] > now:
+                continue
+            batch = [e for e in _pending if (e["spreadsheet_id"], e["worksheet"]) == key]
+            return key, batch[:FLUSH_BATCH_SIZE]
+    return None, []
+
+
+def _key_column(worksheet, key) -> int:
+    """멱등 키 열 번호를 반환합니다. 헤더에 없으면 마지막 열 뒤에 만들고 숨깁니다.
+
+    헤더가 비어 있으면 중복 확인 없이 보내지 않도록 MissingHeader로 이번 반영을 실패시킵니다.
+    """
+    with _lock:
+        if key in _key_columns:
+            return _key_columns[key]
+    header = worksheet.row_values(1)
+    if not header:
+        raise MissingHeader(f"{worksheet.title}: 첫 행에 헤더가 없어 멱등 키 열을 만들 수 없습니다.")
+    if sheets_batch.IDEMPOTENCY_COLUMN in header:
+        column = header.index(sheets_batch.IDEMPOTENCY_COLUMN) + 1
+    else:
+        column = len(header) + 1
+        if worksheet.col_count < column:
+            worksheet.add_cols(column - worksheet.col_count)
+        worksheet.update_cell(1, column, sheets_batch.IDEMPOTENCY_COLUMN)
+        try:
+            worksheet.hide_columns(column - 1, column)
+        except Exception:
+            # 숨기기는 보기 편의용이므로 실패해도 진행 (읽을 때는 항상 열을 버립니다)
+            pass
+    with _lock:
+        _key_columns[key] = column
+    return column
+
+
+def _keyed_row(entry: dict, column: int) -> list:
+    """행 뒤(멱등 키 열)에 항목 ID를 붙입니다."""
+    row = list(entry["row"])
+    return (row + [""] * column)[:column - 1] + [entry["id"]]
+
+
+def _landed_ids(worksheet, column: int) -> set:
+    """시트에 이미 기록된 멱등 키 집합을 반환합니다. (열 하나만 읽음)"""
+    return {value for value in worksheet.col_values(column)[1:] if value}
+
+
+def _commit(key, entries: list):
+    """반영이 확인된 항목에 commit 표시를 남기고 대기열에서 뺍니다."""
+    ids = {e["id"] for e in entries}
+    with _lock:
+        _write_lines([{"op": "commit", "ids": sorted(ids), "committed_at": time.time()}])
+        _pending[:] = [e for e in _pending if e["id"] not in ids]
+        _unconfirmed.difference_update(ids)
+        _backoff.pop(key, None)
+        _compact()
+    for source in {e["source"] for e in entries}:
+        try:
+            sheets_mirror.invalidate(source)
+        except Exception:
+            pass
+
+
+def _is_permanent(error: Exception) -> bool:
+    """다시 보내도 성공하지 않을 오류(잘못된 범위, 삭제된 시트, 권한 없음, 헤더 없음)인지 반환합니다."""
+    if isinstance(error, (SpreadsheetNotFound, WorksheetNotFound, MissingHeader)):
+        return True
+    if sheets_retry.is_retryable_error(str(error)):
+        # 403 rateLimitExceeded 등 할당량 오류는 백오프 후 재시도
+        return False
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status in PERMANENT_STATUS
+
+
+def _bury(key, entries: list, error: Exception):
+    """반영할 수 없는 항목에 보류 표시를 남기고 대기열에서 보류 목록으로 옮깁니다."""
+    ids = {e["id"] for e in entries}
+    failed_at = time.time()
+    message = f"{type(error).__name__}: {error}"
+    with _lock:
+        _write_lines([{"op": "dead", "ids": sorted(ids), "error": message, "failed_at": failed_at}])
+        _pending[:] = [e for e in _pending if e["id"] not in ids]
+        _dead.extend({**e, "error": message, "failed_at": failed_at} for e in entries)
+        _backoff.pop(key, None)
+        # 시트가 지워졌다 다시 만들어졌을 수 있으므로 멱등 키 열은 다음에 다시 확인
+        _key_columns.pop(key, None)
+
+
+def flush_once() -> int:
+    """대기 중인 행을 시트별로 append_rows 한 번씩 보내고 반영된 행 수를 반환합니다.
+
+    한 번 보냈지만 결과를 확인하지 못한 항목이 있으면, 다시 보내기 전에 시트의 멱등 키 열을 읽어
+    이미 반영된 항목은 commit 처리만 하고 나머지만 보냅니다.
+    재시도해도 성공하지 않을 오류면 해당 항목을 보류 목록(dead_letters)으로 옮기고, 그 외 오류는 백오프 후 재시도합니다.
+    """
+    flushed = 0
+    # 할당량 소진으로 회로가 열려 있으면 대기 (닫히면 on_close로 다시 깨어남)
+    if sheets_breaker.is_open():
+        return flushed
+    while True:
+        # 실패한 시트는 대기 시각이 걸리므로 남은 시트가 모두 대기 중이면 끝납니다
+        key, batch = _next_batch()
+        if not batch:
+            break
+        spreadsheet_id, worksheet_name = key
+        try:
+            worksheet = sheets_client.get_worksheet(spreadsheet_id, worksheet_name)
+            if worksheet is None:
+                raise RuntimeError("Google Sheets 클라이언트를 만들 수 없습니다.")
+            with sheets_throttle.priority():
+                column = _key_column(worksheet, key)
+                with _lock:
+                    needs_check = any(e["id"] in _unconfirmed for e in batch)
+                if needs_check:
+                    landed = _landed_ids(worksheet, column)
+                    already = [e for e in batch if e["id"] in landed]
+                    if already:
+                        _commit(key, already)
+                        flushed += len(already)
+                    batch = [e for e in batch if e["id"] not in landed]
+                if batch:
+                    with _lock:
+                        _unconfirmed.update(e["id"] for e in batch)
+                    worksheet.append_rows([_keyed_row(e, column) for e in batch])
+        except Exception as e:
+            if _is_permanent(e):
+                _bury(key, batch, e)
+                continue
+            with _lock:
+                delay = min(MAX_BACKOFF_SECONDS, max(BASE_BACKOFF_SECONDS, _backoff.get(key, (0, 0))[1] * 2))
+                _backoff[key] = (time.time() + delay + random.uniform(0, 0.5), delay)
+            continue
+        if batch:
+            _commit(key, batch)
+            flushed += len(batch)
+    return flushed
+
+
+def _run_flusher():
+    while True:
+        _wakeup.wait(timeout=FLUSH_INTERVAL_SECONDS)
+        _wakeup.clear()
+        try:
+            flush_once()
+        except Exception:
+            continue
+
+
+def start():
+    """로그를 복구하고 백그라운드 플러셔를 시작합니다. (프로세스당 한 번)"""
+    global _flusher
+    with _lock:
+        _load()
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_run_flusher, name="sheets-write-behind", daemon=True)
+        _flusher.start()
+    sheets_breaker.on_close(_wakeup.set)
+    _wakeup.set()